@@ -0,0 +1,115 @@
+"""
+Async variants of the cart API (``/api/async/...``) for ASGI deployments.
+
+Same payloads and responses as CartDetailView / AddToCartView /
+RemoveFromCartView, written as plain async Django views on the async ORM so a
+worker can keep many shoppers in flight while their queries are pending.
+JWT only, like the rest of the API, so there is no session/CSRF handling.
+"""
+import json
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse, QueryDict
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_http_methods
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.settings import api_settings
+
+from config.db_router import use_primary
+from inventory.services import OutOfStock
+from products.models import Product
+from users.authentication import AsyncJWTAuthentication
+from .models import Cart
+from .services import add_item, remove_item
+from .serializers import CartItemSerializer, CartSerializer
+
+authentication = AsyncJWTAuthentication()
+json_renderer = api_settings.DEFAULT_RENDERER_CLASSES[0]()
+
+
+def api_response(data, status=200, **kwargs):
+    # The API's JSON renderer, so decimals and dates render exactly like the sync views.
+    return HttpResponse(json_renderer.render(data), status=status, content_type="application/json", **kwargs)
+
+
+def jwt_required(view):
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        try:
+            result = await authentication.aauthenticate(request)
+        except AuthenticationFailed as e:  # InvalidToken is a subclass
+            return api_response(e.detail, status=401, headers={"WWW-Authenticate": authentication.authenticate_header(request)})
+        if result is None:
+            return api_response(
+                {"detail": "Authentication credentials were not provided."},
+                status=401,
+                headers={"WWW-Authenticate": authentication.authenticate_header(request)},
+            )
+        request.user, request.auth = result
+        return await view(request, *args, **kwargs)
+
+    return csrf_exempt(wrapper)
+
+
+def request_data(request):
+    if request.content_type == "application/json":
+        try:
+            return json.loads(request.body or b"{}")
+        except ValueError:
+            return None
+    if request.method == "POST":
+        return request.POST
+    return QueryDict(request.body)
+
+
+async def get_cart(user):
+    cart = await Cart.objects.filter(user=user).order_by("pk").afirst()
+    return cart or await Cart.objects.acreate(user=user)
+
+
+@use_primary
+@require_http_methods(["GET"])
+@jwt_required
+async def cart_detail(request):
+    cart = await Cart.objects.afor_user(request.user)
+    return api_response(CartSerializer(cart).data)
+
+
+@require_http_methods(["POST"])
+@jwt_required
+async def add_to_cart(request):
+    data = request_data(request)
+    if data is None:
+        return api_response({"error": "Invalid JSON"}, status=400)
+    try:
+        product_id = int(data.get("product"))
+        quantity = int(data.get("quantity", 1))
+    except (TypeError, ValueError):
+        return api_response({"error": "product and quantity must be integers"}, status=400)
+    if quantity < 1:
+        return api_response({"error": "quantity must be at least 1"}, status=400)
+
+    product = await Product.objects.filter(pk=product_id).afirst()
+    if product is None:
+        return api_response({"error": "Product not found"}, status=404)
+    cart = await get_cart(request.user)
+
+    # Reservation and cart line change in one transaction, which the async ORM can't open.
+    try:
+        item = await sync_to_async(add_item)(cart, product, quantity)
+    except OutOfStock as e:
+        return api_response({"error": str(e)}, status=400)
+    return api_response(CartItemSerializer(item).data)
+
+
+@require_http_methods(["DELETE"])
+@jwt_required
+async def remove_from_cart(request):
+    data = request_data(request)
+    if data is None:
+        return api_response({"error": "Invalid JSON"}, status=400)
+    cart = await Cart.objects.filter(user=request.user).order_by("pk").afirst()
+    if cart is None or not await sync_to_async(remove_item)(cart, data.get("product")):
+        return api_response({"error": "Item not found in cart"}, status=404)
+    return api_response({"success": "Item removed"})
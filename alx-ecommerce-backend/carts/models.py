@@ -1,7 +1,55 @@
+from decimal import Decimal
+
 from django.db import models
+from django.db.models import DecimalField, ExpressionWrapper, F, Prefetch, Sum
+from django.db.models.functions import Coalesce
 from django.conf import settings
 from products.models import Product
 
+
+def line_total_expression(prefix=""):
+    """price × quantity for a cart item, optionally reached through ``prefix`` (e.g. "items__")."""
+    return ExpressionWrapper(
+        F(f"{prefix}product__price") * F(f"{prefix}quantity"),
+        output_field=DecimalField(max_digits=12, decimal_places=2),
+    )
+
+
+class CartQuerySet(models.QuerySet):
+    def with_totals(self):
+        """Annotate ``subtotal`` and prefetch items (with products and ``line_total``): two queries per cart lookup."""
+        return self.annotate(
+            subtotal=Coalesce(
+                Sum(line_total_expression("items__")),
+                Decimal("0.00"),
+                output_field=DecimalField(max_digits=12, decimal_places=2),
+            )
+        ).prefetch_related(Prefetch("items", queryset=CartItem.objects.with_line_totals()))
+
+    def for_user(self, user):
+        """The user's cart with totals, creating an empty one if needed."""
+        cart = self.with_totals().filter(user=user).order_by("pk").first()
+        if cart is None:
+            cart = self.create(user=user)
+            cart.subtotal = Decimal("0.00")
+            cart._prefetched_objects_cache = {"items": CartItem.objects.none()}
+        return cart
+
+    async def afor_user(self, user):
+        """Async counterpart of for_user()."""
+        cart = await self.with_totals().filter(user=user).order_by("pk").afirst()
+        if cart is None:
+            cart = await self.acreate(user=user)
+            cart.subtotal = Decimal("0.00")
+            cart._prefetched_objects_cache = {"items": CartItem.objects.none()}
+        return cart
+
+
+class CartItemQuerySet(models.QuerySet):
+    def with_line_totals(self):
+        return self.select_related("product").annotate(line_total=line_total_expression())
+
+
 class Cart(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     created_at = models.DateTimeField(auto_now_add=True)
@@ -9,10 +57,15 @@ class Cart(models.Model):
 
     tax = models.DecimalField(max_digits=10, decimal_places=2, default=0)  
 
+    objects = CartQuerySet.as_manager()
+
     def __str__(self):
         return f"Cart {self.id} - {self.user.username}"
 
     def total_price(self):
+        # Use the SQL-computed subtotal when loaded through Cart.objects.with_totals().
+        if hasattr(self, "subtotal"):
+            return self.subtotal
         return sum(item.total_price() for item in self.items.all())
 
     @property
@@ -26,8 +79,17 @@ class CartItem(models.Model):
     product = models.ForeignKey(Product, on_delete=models.CASCADE)
     quantity = models.PositiveIntegerField(default=1)
 
+    objects = CartItemQuerySet.as_manager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["cart", "product"], name="unique_cart_item_product"),
+        ]
+
     def __str__(self):
         return f"{self.quantity} × {self.product.name}"
 
     def total_price(self):
+        if hasattr(self, "line_total"):
+            return self.line_total
         return self.product.price * self.quantity
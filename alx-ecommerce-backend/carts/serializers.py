@@ -28,4 +28,4 @@ class CartSerializer(serializers.ModelSerializer):
         fields = ["id", "user", "items", "total_price"]
 
     def get_total_price(self, obj):
-        return sum(item.total_price() for item in obj.items.all())
+        return obj.total_price()
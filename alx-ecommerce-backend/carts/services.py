@@ -0,0 +1,116 @@
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from inventory.services import release, reserve, reserve_many
+from products.models import Product
+from .models import CartItem
+
+BATCH_OPERATIONS = ("add", "set", "remove")
+MAX_BATCH_OPERATIONS = 100
+
+
+def add_item(cart, product, quantity):
+    """
+    Reserve ``quantity`` of ``product`` and add it to ``cart``.
+
+    Raises inventory.services.OutOfStock when it can't be held. The quantity is
+    incremented in SQL so concurrent adds of the same product don't lose updates.
+    """
+    if quantity < 1:
+        raise ValueError("quantity must be at least 1")
+    with transaction.atomic():
+        reserve(cart, product, quantity)
+        items = CartItem.objects.filter(cart=cart, product=product)
+        if not items.update(quantity=F("quantity") + quantity):
+            try:
+                with transaction.atomic():
+                    CartItem.objects.create(cart=cart, product=product, quantity=quantity)
+            except IntegrityError:
+                items.update(quantity=F("quantity") + quantity)
+    return CartItem.objects.with_line_totals().get(cart=cart, product=product)
+
+
+def remove_item(cart, product_id):
+    """Drop a product from ``cart`` and give its held stock back; False if it wasn't there."""
+    with transaction.atomic():
+        deleted, _ = CartItem.objects.filter(cart=cart, product_id=product_id).delete()
+        release(cart, [product_id])
+    return bool(deleted)
+
+
+def clear(cart):
+    with transaction.atomic():
+        cart.items.all().delete()
+        release(cart)
+
+
+def parse_operations(operations):
+    """Validate batch operations into ``(op, product_id, quantity)``; raises ValueError."""
+    if not isinstance(operations, list) or not operations:
+        raise ValueError("operations must be a non-empty list")
+    if len(operations) > MAX_BATCH_OPERATIONS:
+        raise ValueError(f"At most {MAX_BATCH_OPERATIONS} operations per request")
+    parsed = []
+    for index, operation in enumerate(operations):
+        try:
+            op = operation["op"]
+            if op not in BATCH_OPERATIONS:
+                raise ValueError(f"op must be one of {', '.join(BATCH_OPERATIONS)}")
+            product_id = int(operation["product"])
+            quantity = 0 if op == "remove" else int(operation.get("quantity", 1))
+            if quantity < (1 if op == "add" else 0):
+                raise ValueError("quantity out of range")
+        except (KeyError, TypeError, ValueError) as e:
+            raise ValueError(f"operations[{index}]: {e}")
+        parsed.append((op, product_id, quantity))
+    return parsed
+
+
+def apply_batch(cart, operations):
+    """
+    Apply add / set / remove ``operations`` to ``cart`` in one transaction.
+
+    The operations are folded into a final quantity per product first, so the
+    query count doesn't depend on how many there are: one lookup for all
+    products, one for the current lines, stock holds adjusted in bulk (see
+    inventory.services), one upsert and one delete for the lines. Raises
+    ValueError for invalid input and OutOfStock, changing nothing, when a
+    quantity can't be held.
+    """
+    parsed = parse_operations(operations)
+    products = Product.objects.in_bulk({product_id for _, product_id, _ in parsed})
+    missing = sorted({product_id for _, product_id, _ in parsed} - set(products))
+    if missing:
+        raise ValueError(f"Unknown product(s): {', '.join(map(str, missing))}")
+
+    with transaction.atomic():
+        current = dict(
+            CartItem.objects.filter(cart=cart, product_id__in=products).values_list("product_id", "quantity")
+        )
+        final = dict(current)
+        for op, product_id, quantity in parsed:
+            final[product_id] = final.get(product_id, 0) + quantity if op == "add" else quantity
+        changed = {product_id: quantity for product_id, quantity in final.items() if quantity != current.get(product_id, 0)}
+        if not changed:
+            return
+
+        # Lowered lines give their holds back and re-hold the new quantity; raised lines hold the difference.
+        lowered = [product_id for product_id, quantity in changed.items() if quantity < current.get(product_id, 0)]
+        if lowered:
+            release(cart, lowered)
+        holds = {
+            products[product_id]: quantity if product_id in lowered else quantity - current.get(product_id, 0)
+            for product_id, quantity in changed.items()
+        }
+        holds = {product: quantity for product, quantity in holds.items() if quantity}
+        if holds:
+            reserve_many(cart, holds)
+
+        kept = [CartItem(cart=cart, product_id=product_id, quantity=quantity) for product_id, quantity in changed.items() if quantity]
+        if kept:
+            CartItem.objects.bulk_create(
+                kept, update_conflicts=True, unique_fields=["cart", "product"], update_fields=["quantity"]
+            )
+        removed = [product_id for product_id, quantity in changed.items() if not quantity]
+        if removed:
+            CartItem.objects.filter(cart=cart, product_id__in=removed).delete()
@@ -1,3 +1,142 @@
+from decimal import Decimal
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import User
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from products.models import Category, Product
+from inventory.models import StockReservation
+from .models import Cart, CartItem
+
+
+class CartDetailQueryCountTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("shopper", password="pass")
+        self.cart = Cart.objects.create(user=self.user)
+        self.category = Category.objects.create(name="Books")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def add_items(self, count):
+        for i in range(count):
+            product = Product.objects.create(
+                name=f"Book {i}", price=Decimal("2.50"), stock=10, category=self.category
+            )
+            CartItem.objects.create(cart=self.cart, product=product, quantity=2)
+
+    def test_query_count_does_not_grow_with_items(self):
+        self.add_items(1)
+        with self.assertNumQueries(2):
+            self.client.get("/api/cart/")
+        self.add_items(20)
+        with self.assertNumQueries(2):
+            response = self.client.get("/api/cart/")
+        self.assertEqual(len(response.data["items"]), 21)
+        self.assertEqual(Decimal(str(response.data["total_price"])), Decimal("105.00"))
+        self.assertEqual(Decimal(str(response.data["items"][0]["total_price"])), Decimal("5.00"))
+
+    def test_empty_cart_is_created(self):
+        self.cart.delete()
+        response = self.client.get("/api/cart/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["items"], [])
+        self.assertEqual(Cart.objects.filter(user=self.user).count(), 1)
+
+
+class CartBatchTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("shopper")
+        category = Category.objects.create(name="Games")
+        self.products = [
+            Product.objects.create(name=f"Game {i}", price=Decimal("10.00"), stock=5, category=category)
+            for i in range(10)
+        ]
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def batch(self, *operations):
+        return self.client.post("/api/cart/batch/", {"operations": list(operations)}, format="json")
+
+    def test_query_count_does_not_grow_with_operations(self):
+        self.batch({"op": "add", "product": self.products[0].pk})
+        counts = []
+        for products in (self.products[:1], self.products):
+            with CaptureQueriesContext(connection) as queries:
+                response = self.batch(*[{"op": "add", "product": p.pk, "quantity": 2} for p in products])
+            self.assertEqual(response.status_code, 200)
+            counts.append(len(queries))
+        self.assertEqual(counts[0], counts[1])
+        self.assertEqual(len(response.data["items"]), 10)
+
+    def test_operations_apply_in_order_and_hold_stock(self):
+        first, second, third = self.products[:3]
+        self.batch({"op": "add", "product": first.pk, "quantity": 4}, {"op": "add", "product": third.pk})
+        response = self.batch(
+            {"op": "set", "product": first.pk, "quantity": 1},
+            {"op": "add", "product": second.pk, "quantity": 2},
+            {"op": "add", "product": second.pk},
+            {"op": "remove", "product": third.pk},
+        )
+        quantities = {item["product"]: item["quantity"] for item in response.data["items"]}
+        self.assertEqual(quantities, {first.pk: 1, second.pk: 3})
+        self.assertEqual(
+            list(Product.objects.filter(pk__in=[first.pk, second.pk, third.pk]).order_by("pk").values_list("stock", flat=True)),
+            [4, 2, 5],
+        )
+        self.assertEqual(sum(StockReservation.objects.values_list("quantity", flat=True)), 4)
+
+    def test_failed_batch_changes_nothing(self):
+        first, second = self.products[:2]
+        response = self.batch({"op": "add", "product": first.pk}, {"op": "add", "product": second.pk, "quantity": 6})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn(second.name, response.data["error"])
+        self.assertFalse(CartItem.objects.exists())
+        self.assertEqual(Product.objects.get(pk=first.pk).stock, 5)
+
+        for operation in ({"op": "drop", "product": first.pk}, {"op": "add", "product": 0}, {"op": "add", "product": first.pk, "quantity": 0}):
+            self.assertEqual(self.batch(operation).status_code, 400)
+
+
+class AsyncCartApiTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("async-shopper", password="pass")
+        self.category = Category.objects.create(name="Games")
+        self.product = Product.objects.create(name="Chess", price=Decimal("12.00"), stock=5, category=self.category)
+        token = RefreshToken.for_user(self.user).access_token
+        self.headers = {"Authorization": f"Bearer {token}"}
+        self.api = APIClient()
+        self.api.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+
+    async def test_matches_sync_views(self):
+        added = await self.async_client.post(
+            "/api/async/add/", {"product": self.product.pk, "quantity": 2},
+            content_type="application/json", headers=self.headers,
+        )
+        self.assertEqual(added.status_code, 200)
+        added = await self.async_client.post(
+            "/api/async/add/", {"product": self.product.pk}, content_type="application/json", headers=self.headers,
+        )
+        self.assertEqual(added.json()["quantity"], 3)
+
+        detail = await self.async_client.get("/api/async/cart/", headers=self.headers)
+        sync_detail = await sync_to_async(self.api.get)("/api/cart/")
+        self.assertEqual(detail.json(), sync_detail.json())
+
+        removed = await self.async_client.delete(
+            "/api/async/remove/", {"product": self.product.pk}, content_type="application/json", headers=self.headers,
+        )
+        self.assertEqual(removed.json(), {"success": "Item removed"})
+        missing = await self.async_client.delete(
+            "/api/async/remove/", {"product": self.product.pk}, content_type="application/json", headers=self.headers,
+        )
+        self.assertEqual(missing.status_code, 404)
 
-# Create your tests here.
+    async def test_requires_valid_token(self):
+        response = await self.async_client.get("/api/async/cart/")
+        self.assertEqual(response.status_code, 401)
+        response = await self.async_client.get("/api/async/cart/", headers={"Authorization": "Bearer nope"})
+        self.assertEqual(response.status_code, 401)
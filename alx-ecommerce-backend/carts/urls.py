@@ -1,11 +1,16 @@
 from django.urls import path
-from .views import CartDetailView, AddToCartView, RemoveFromCartView
+from .views import CartBatchView, CartDetailView, AddToCartView, RemoveFromCartView
 from django.urls import path
-from . import views
+from . import async_views, views
 
 urlpatterns = [
     path("cart/", CartDetailView.as_view(), name="cart-detail"),
     path("add/", AddToCartView.as_view(), name="add-to-cart"),
     path("remove/", RemoveFromCartView.as_view(), name="remove-from-cart"),
+    path("cart/batch/", CartBatchView.as_view(), name="cart-batch"),
     path("add/<int:product_id>/", views.add_to_cart, name="add_to_cart"),
+    # Async variants for ASGI workers, same payloads and responses.
+    path("async/cart/", async_views.cart_detail, name="async-cart-detail"),
+    path("async/add/", async_views.add_to_cart, name="async-add-to-cart"),
+    path("async/remove/", async_views.remove_from_cart, name="async-remove-from-cart"),
 ]
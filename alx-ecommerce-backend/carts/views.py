@@ -5,9 +5,12 @@ from .serializers import CartSerializer, CartItemSerializer
 from products.models import Product
 
 from django.shortcuts import redirect, get_object_or_404
+from django.contrib import messages
 from django.contrib.auth.decorators import login_required
+from inventory.services import OutOfStock
 from products.models import Product
-from .models import Cart, CartItem
+from .models import Cart
+from .services import add_item, apply_batch, remove_item
 
 @login_required
 def add_to_cart(request, product_id):
@@ -16,22 +19,21 @@ def add_to_cart(request, product_id):
 
     if request.method == "POST":
         quantity = int(request.POST.get("quantity", 1))
-        cart_item, created = CartItem.objects.get_or_create(cart=cart, product=product)
-        if not created:
-            cart_item.quantity += quantity
-        else:
-            cart_item.quantity = quantity
-        cart_item.save()
+        try:
+            add_item(cart, product, quantity)
+        except (OutOfStock, ValueError) as e:
+            messages.error(request, str(e))
 
     return redirect("cart_page")  
 
 class CartDetailView(generics.RetrieveAPIView):
     serializer_class = CartSerializer
     permission_classes = [permissions.IsAuthenticated]
+    # Creates the cart on first use and shows held stock: always fresh.
+    db_routing = "primary"
 
     def get_object(self):
-        cart, _ = Cart.objects.get_or_create(user=self.request.user)
-        return cart
+        return Cart.objects.for_user(self.request.user)
 
 
 class AddToCartView(generics.CreateAPIView):
@@ -41,21 +43,20 @@ class AddToCartView(generics.CreateAPIView):
     def post(self, request, *args, **kwargs):
         cart, _ = Cart.objects.get_or_create(user=request.user)
         product_id = request.data.get("product")
-        quantity = int(request.data.get("quantity", 1))
+        try:
+            quantity = int(request.data.get("quantity", 1))
+        except (TypeError, ValueError):
+            return Response({"error": "quantity must be an integer"}, status=400)
 
         try:
             product = Product.objects.get(id=product_id)
         except Product.DoesNotExist:
             return Response({"error": "Product not found"}, status=404)
 
-        cart_item, created = CartItem.objects.get_or_create(
-            cart=cart,
-            product=product,
-            defaults={"quantity": quantity, "price": product.price},
-        )
-        if not created:
-            cart_item.quantity += quantity
-            cart_item.save()
+        try:
+            cart_item = add_item(cart, product, quantity)
+        except (OutOfStock, ValueError) as e:
+            return Response({"error": str(e)}, status=400)
 
         serializer = CartItemSerializer(cart_item)
         return Response(serializer.data)
@@ -69,9 +70,26 @@ class RemoveFromCartView(generics.DestroyAPIView):
         cart, _ = Cart.objects.get_or_create(user=request.user)
         product_id = request.data.get("product")
 
-        try:
-            item = CartItem.objects.get(cart=cart, product_id=product_id)
-            item.delete()
+        if remove_item(cart, product_id):
             return Response({"success": "Item removed"})
-        except CartItem.DoesNotExist:
-            return Response({"error": "Item not found in cart"}, status=404)
+        return Response({"error": "Item not found in cart"}, status=404)
+
+
+class CartBatchView(generics.GenericAPIView):
+    """
+    Apply several cart changes at once and return the updated cart.
+
+    Body: ``{"operations": [{"op": "add" | "set" | "remove", "product": id, "quantity": n}, ...]}``,
+    applied in order and all or nothing.
+    """
+    serializer_class = CartSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request, *args, **kwargs):
+        cart, _ = Cart.objects.get_or_create(user=request.user)
+        try:
+            apply_batch(cart, request.data.get("operations"))
+        except (OutOfStock, ValueError) as e:
+            return Response({"error": str(e)}, status=400)
+        cart = Cart.objects.with_totals().get(pk=cart.pk)
+        return Response(CartSerializer(cart).data)
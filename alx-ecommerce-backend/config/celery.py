@@ -0,0 +1,27 @@
+"""
+Celery application for background work (``celery -A config worker -B``).
+
+Configuration comes from the CELERY_* Django settings. Without a
+CELERY_BROKER_URL the tasks run eagerly in-process, so local development and
+the test suite need no broker or worker.
+"""
+import os
+
+from celery import Celery
+from django.db import InterfaceError, OperationalError
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+
+app = Celery('config')
+app.config_from_object('django.conf:settings', namespace='CELERY')
+app.autodiscover_tasks()
+
+# Retry policy for tasks touching the database: transient connection or lock
+# errors are retried with jittered exponential backoff. Tasks using it must be
+# idempotent, as they may also be redelivered (acks_late).
+DB_RETRY = {
+    'autoretry_for': (OperationalError, InterfaceError),
+    'retry_backoff': True,
+    'retry_jitter': True,
+    'max_retries': 5,
+}
@@ -0,0 +1,92 @@
+"""
+Negotiated response compression.
+
+CompressionMiddleware extends Django's GZipMiddleware (random padding against
+BREACH, weak ETags, streaming support) with a size threshold
+(COMPRESSION_MIN_SIZE bytes), Accept-Encoding q-values and Brotli, preferred
+when the ``brotli`` package is installed and the client accepts it.
+Already-compressed content types (images, gzip downloads) are left alone.
+"""
+from django.conf import settings
+from django.middleware.gzip import GZipMiddleware
+from django.utils.cache import patch_vary_headers
+
+try:
+    import brotli
+except ImportError:  # optional: gzip only
+    brotli = None
+
+PRECOMPRESSED_TYPES = ("image/", "video/", "audio/", "application/gzip", "application/zip", "application/x-gzip")
+
+
+def supported_encodings():
+    return ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def negotiate(accept_encoding, supported=None):
+    """The preferred encoding of ``supported`` the Accept-Encoding header allows, or None."""
+    supported = supported or supported_encodings()
+    weights = {}
+    for part in accept_encoding.split(","):
+        coding, _, params = part.strip().partition(";")
+        quality = 1.0
+        if params.strip().startswith("q="):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                quality = 0.0
+        if coding:
+            weights[coding.strip().lower()] = quality
+    best, best_quality = None, 0.0
+    for coding in supported:  # in server preference order, so ties go to the first
+        quality = weights.get(coding, weights.get("*", 0.0))
+        if quality > best_quality:
+            best, best_quality = coding, quality
+    return best
+
+
+class CompressionMiddleware(GZipMiddleware):
+    def process_response(self, request, response):
+        min_size = getattr(settings, "COMPRESSION_MIN_SIZE", 1024)
+        if not response.streaming and len(response.content) < min_size:
+            return response
+        if response.has_header("Content-Encoding"):
+            return response
+        if response.get("Content-Type", "").startswith(PRECOMPRESSED_TYPES):
+            return response
+
+        patch_vary_headers(response, ("Accept-Encoding",))
+        encoding = negotiate(request.META.get("HTTP_ACCEPT_ENCODING", ""))
+        if encoding == "br" and not (response.streaming and response.is_async):
+            return self.brotli_response(response)
+        if encoding in ("br", "gzip"):
+            # Async streams only get gzip, which GZipMiddleware handles.
+            return super().process_response(request, response)
+        return response
+
+    def brotli_response(self, response):
+        quality = getattr(settings, "COMPRESSION_BROTLI_QUALITY", 5)
+        if response.streaming:
+            content = response.streaming_content
+
+            def compressed():
+                compressor = brotli.Compressor(quality=quality)
+                for chunk in content:
+                    data = compressor.process(chunk)
+                    if data:
+                        yield data
+                yield compressor.finish()
+
+            response.streaming_content = compressed()
+            del response.headers["Content-Length"]
+        else:
+            data = brotli.compress(response.content, quality=quality)
+            if len(data) >= len(response.content):
+                return response
+            response.content = data
+            response.headers["Content-Length"] = str(len(data))
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            response.headers["ETag"] = "W/" + etag
+        response.headers["Content-Encoding"] = "br"
+        return response
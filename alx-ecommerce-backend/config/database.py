@@ -0,0 +1,84 @@
+"""
+Database profile from the environment (used by config/settings.py).
+
+DB_ENGINE=sqlite (default): a single-node SQLite file (DB_NAME, default
+db.sqlite3) tuned for concurrent use. Transactions take the write lock up
+front (IMMEDIATE), so two writers queue on the busy timeout instead of failing
+on a lock upgrade. WAL journaling lets readers run while a writer commits;
+it is opt-in because the journal mode is stored in the database file itself
+(switching would rewrite the checked-in development db.sqlite3), so set
+DB_SQLITE_JOURNAL_MODE=WAL on servers. The pragmas trade fsyncs and memory
+for speed: synchronous=NORMAL is durable in WAL mode except on power loss.
+    DB_SQLITE_JOURNAL_MODE     unset keeps the file's mode; WAL, or DELETE to switch back
+    DB_SQLITE_TRANSACTION_MODE IMMEDIATE (DEFERRED is Django's default)
+    DB_SQLITE_BUSY_TIMEOUT     seconds a writer waits for the lock, 20
+    DB_SQLITE_CACHE_MB         page cache per connection, 64
+    DB_SQLITE_MMAP_MB          memory-mapped I/O, 256
+
+DB_ENGINE=postgresql: DB_NAME / DB_USER / DB_PASSWORD / DB_HOST / DB_PORT,
+with persistent connections (DB_CONN_MAX_AGE seconds, default 60) that are
+health-checked before reuse. DB_POOL_MAX_SIZE > 0 switches to Django's
+connection pool instead (needs psycopg 3 with psycopg[pool]; psycopg2 only
+supports persistent connections), sized DB_POOL_MIN_SIZE..DB_POOL_MAX_SIZE,
+waiting up to DB_POOL_TIMEOUT seconds for a free connection. Size it to
+about the worker's threads; the database's max_connections must cover every
+worker's pool.
+"""
+import os
+
+from django.core.exceptions import ImproperlyConfigured
+
+
+def database_settings(base_dir, env=os.environ):
+    engine = env.get("DB_ENGINE", "sqlite").lower()
+    if engine == "sqlite":
+        return sqlite_settings(base_dir, env)
+    if engine in ("postgresql", "postgres"):
+        return postgresql_settings(env)
+    raise ImproperlyConfigured(f"DB_ENGINE must be sqlite or postgresql, not {engine!r}")
+
+
+def sqlite_settings(base_dir, env=os.environ):
+    journal_mode = env.get("DB_SQLITE_JOURNAL_MODE", "").upper()
+    pragmas = [f"PRAGMA journal_mode={journal_mode}"] if journal_mode else []
+    pragmas += [
+        f"PRAGMA synchronous={'NORMAL' if journal_mode == 'WAL' else 'FULL'}",
+        f"PRAGMA cache_size=-{int(env.get('DB_SQLITE_CACHE_MB', 64)) * 1024}",
+        f"PRAGMA mmap_size={int(env.get('DB_SQLITE_MMAP_MB', 256)) * 1024 * 1024}",
+        "PRAGMA temp_store=MEMORY",
+    ]
+    return {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": env.get("DB_NAME") or base_dir / "db.sqlite3",
+        "CONN_MAX_AGE": int(env.get("DB_CONN_MAX_AGE", 60)),
+        "CONN_HEALTH_CHECKS": True,
+        "OPTIONS": {
+            "timeout": float(env.get("DB_SQLITE_BUSY_TIMEOUT", 20)),
+            "transaction_mode": env.get("DB_SQLITE_TRANSACTION_MODE", "IMMEDIATE").upper(),
+            "init_command": ";".join(pragmas),
+        },
+    }
+
+
+def postgresql_settings(env=os.environ):
+    database = {
+        "ENGINE": "django.db.backends.postgresql",
+        "NAME": env.get("DB_NAME", "ecommerce"),
+        "USER": env.get("DB_USER", ""),
+        "PASSWORD": env.get("DB_PASSWORD", ""),
+        "HOST": env.get("DB_HOST", "localhost"),
+        "PORT": env.get("DB_PORT", "5432"),
+        "CONN_MAX_AGE": int(env.get("DB_CONN_MAX_AGE", 60)),
+        "CONN_HEALTH_CHECKS": True,
+        "OPTIONS": {"connect_timeout": int(env.get("DB_CONNECT_TIMEOUT", 5))},
+    }
+    pool_max_size = int(env.get("DB_POOL_MAX_SIZE", 0))
+    if pool_max_size:
+        # The pool manages connection reuse; Django rejects it combined with CONN_MAX_AGE.
+        database["CONN_MAX_AGE"] = 0
+        database["OPTIONS"]["pool"] = {
+            "min_size": int(env.get("DB_POOL_MIN_SIZE", 2)),
+            "max_size": pool_max_size,
+            "timeout": float(env.get("DB_POOL_TIMEOUT", 10)),
+        }
+    return database
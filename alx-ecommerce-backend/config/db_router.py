@@ -0,0 +1,191 @@
+"""
+Read-replica routing with read-your-writes stickiness.
+
+ReplicaRoutingMiddleware opens a routing scope per request. Reads of safe
+(GET/HEAD/OPTIONS) requests go to one of settings.DATABASE_REPLICAS, picked
+once per request; everything else, and any read in a transaction or after the
+request wrote, goes to the primary. A client that wrote is pinned to the
+primary for DATABASE_REPLICA_PIN_SECONDS so its carts and orders read fresh
+while replicas catch up. The pin travels with the client: a cookie for
+browsers and an X-DB-Primary-Until response header that API clients send
+back. Clients that don't echo the header are also pinned by their
+Authorization header in the DATABASE_REPLICA_PIN_CACHE_ALIAS cache, which
+must be shared by all workers. Deciding never needs a query.
+
+Views override the default with the ``use_primary`` / ``use_replica``
+decorators (or a ``db_routing`` class attribute): "primary" always reads the
+primary, "replica" reads a replica even when pinned, for lag-tolerant reports.
+Outside a request (tasks, commands) reads stay on the primary unless wrapped
+in ``routing("replica")``.
+
+Locally, SQLite files listed in DATABASE_REPLICA_FILES stand in for replicas;
+``manage.py sync_replicas`` copies the primary into them.
+"""
+import hashlib
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, connections
+
+PIN_COOKIE = "db_primary_until"
+PIN_HEADER = "X-DB-Primary-Until"
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+_active_scope = ContextVar("db_routing_scope", default=None)
+
+
+def replicas():
+    return list(getattr(settings, "DATABASE_REPLICAS", []))
+
+
+def pin_seconds():
+    return getattr(settings, "DATABASE_REPLICA_PIN_SECONDS", 5)
+
+
+class RoutingScope:
+    def __init__(self, mode="auto", pinned=False):
+        self.mode = mode  # "auto", "primary" or "replica"
+        self.pinned = pinned
+        self.wrote = False
+        self.replica = None
+
+    def read_alias(self):
+        aliases = replicas()
+        if not aliases or self.mode == "primary":
+            return DEFAULT_DB_ALIAS
+        if self.mode == "auto" and (self.pinned or self.wrote):
+            return DEFAULT_DB_ALIAS
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            # Reads inside a transaction must see its writes.
+            return DEFAULT_DB_ALIAS
+        if self.replica not in aliases:
+            self.replica = random.choice(aliases)
+        return self.replica
+
+
+@contextmanager
+def routing(mode):
+    """Route the reads in this block: "primary", "replica" or "auto"."""
+    token = _active_scope.set(RoutingScope(mode))
+    try:
+        yield
+    finally:
+        _active_scope.reset(token)
+
+
+def read_alias():
+    """The alias reads go to right now, e.g. to bind a streamed queryset with ``.using()``."""
+    scope = _active_scope.get()
+    return scope.read_alias() if scope is not None else DEFAULT_DB_ALIAS
+
+
+def use_primary(view):
+    view.db_routing = "primary"
+    return view
+
+
+def use_replica(view):
+    view.db_routing = "replica"
+    return view
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        return read_alias()
+
+    def db_for_write(self, model, **hints):
+        scope = _active_scope.get()
+        if scope is not None:
+            scope.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same data as the primary.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db not in replicas()
+
+
+def pin_cache():
+    return caches[getattr(settings, "DATABASE_REPLICA_PIN_CACHE_ALIAS", "default")]
+
+
+def pin_key(request):
+    credentials = request.META.get("HTTP_AUTHORIZATION")
+    if not credentials:
+        return None
+    return "db:pin:" + hashlib.sha256(credentials.encode()).hexdigest()
+
+
+def is_pinned(request):
+    for until in (request.COOKIES.get(PIN_COOKIE), request.headers.get(PIN_HEADER)):
+        try:
+            if until and float(until) > time.time():
+                return True
+        except ValueError:
+            pass
+    key = pin_key(request)
+    return key is not None and pin_cache().get(key) is not None
+
+
+class ReplicaRoutingMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        scope = self.start(request)
+        token = _active_scope.set(scope)
+        try:
+            response = self.get_response(request)
+        finally:
+            _active_scope.reset(token)
+        return self.finish(request, response, scope)
+
+    async def __acall__(self, request):
+        scope = self.start(request)
+        token = _active_scope.set(scope)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _active_scope.reset(token)
+        return self.finish(request, response, scope)
+
+    def start(self, request):
+        if not replicas():
+            return RoutingScope("primary")
+        if request.method not in SAFE_METHODS:
+            return RoutingScope("primary")
+        return RoutingScope(pinned=is_pinned(request))
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        scope = _active_scope.get()
+        view_class = getattr(view_func, "cls", None) or getattr(view_func, "view_class", None)
+        mode = getattr(view_func, "db_routing", None) or getattr(view_class, "db_routing", None)
+        if scope is None or not mode or scope.mode == "primary":
+            # Unsafe requests stay on the primary whatever the view says.
+            return None
+        scope.mode = mode
+        return None
+
+    def finish(self, request, response, scope):
+        if replicas() and (scope.wrote or request.method not in SAFE_METHODS):
+            until = time.time() + pin_seconds()
+            response.set_cookie(PIN_COOKIE, f"{until:.3f}", max_age=pin_seconds(), httponly=True, samesite="Lax")
+            response[PIN_HEADER] = f"{until:.3f}"
+            key = pin_key(request)
+            if key is not None:
+                pin_cache().set(key, until, timeout=pin_seconds())
+        return response
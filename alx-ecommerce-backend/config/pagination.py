@@ -0,0 +1,109 @@
+import json
+import operator
+from functools import reduce
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination
+
+
+class KeysetPagination(CursorPagination):
+    """
+    Cursor (keyset) pagination: no COUNT(*) and no OFFSET, so deep pages cost the
+    same as the first one.
+
+    The queryset's own ordering is followed (OrderingFilter's ``?ordering=``, the
+    view's ``ordering`` or e.g. search relevance), with the primary key appended
+    as a tie-breaker. The cursor holds the values of every ordering field of the
+    row at the page boundary, and the next page is the rows after that tuple
+    (``price > p OR (price = p AND pk > k)``), so ties never need an offset and
+    rows added or removed elsewhere don't shift the pages. Clients may pick
+    ``?page_size=`` up to ``max_page_size``.
+    """
+    ordering = "pk"
+    page_size_query_param = "page_size"
+    max_page_size = 100
+
+    def get_ordering(self, request, queryset, view):
+        ordering = [field for field in queryset.query.order_by if isinstance(field, str)]
+        if not ordering:
+            ordering = list(super().get_ordering(request, queryset, view))
+        if not any(field.lstrip("-") in ("pk", "id") for field in ordering):
+            ordering.append("-pk" if ordering[0].startswith("-") else "pk")
+        return tuple(ordering)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request)
+        if self.cursor is not None:
+            # Positions are unique (the pk is part of them), so links never carry an offset.
+            self.cursor = self.cursor._replace(offset=0)
+        reverse = self.cursor is not None and self.cursor.reverse
+        current_position = None if self.cursor is None else self.cursor.position
+
+        if reverse:
+            queryset = queryset.order_by(*[
+                field[1:] if field.startswith("-") else f"-{field}" for field in self.ordering
+            ])
+        else:
+            queryset = queryset.order_by(*self.ordering)
+        if current_position is not None:
+            queryset = queryset.filter(self.after(current_position, reverse))
+
+        # One extra row tells whether there is a page after this one.
+        try:
+            results = list(queryset[:self.page_size + 1])
+        except (TypeError, ValueError, ValidationError):
+            # A position value that doesn't fit its field.
+            raise NotFound(self.invalid_cursor_message)
+        self.page = results[:self.page_size]
+        has_following = len(results) > len(self.page)
+        following_position = (
+            self._get_position_from_instance(results[-1], self.ordering) if has_following else None
+        )
+
+        if reverse:
+            self.page.reverse()
+            self.has_next, self.next_position = current_position is not None, current_position
+            self.has_previous, self.previous_position = has_following, following_position
+        else:
+            self.has_next, self.next_position = has_following, following_position
+            self.has_previous, self.previous_position = current_position is not None, current_position
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+        return self.page
+
+    def after(self, position, reverse):
+        """
+        Rows past ``position`` in the page direction: a lexicographic comparison
+        of the ordering fields, spelled out as OR-ed prefixes for the ORM.
+        """
+        try:
+            values = json.loads(position)
+        except ValueError:
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(values, list) or len(values) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+
+        conditions, equal = [], {}
+        for field, value in zip(self.ordering, values):
+            name = field.lstrip("-")
+            lookup = "lt" if field.startswith("-") != reverse else "gt"
+            conditions.append(Q(**equal, **{f"{name}__{lookup}": value}))
+            equal[name] = value
+        return reduce(operator.or_, conditions)
+
+    def _get_position_from_instance(self, instance, ordering):
+        # Exact text forms (str() of Decimal / datetime) so no row is skipped on the way back.
+        values = [
+            instance[field.lstrip("-")] if isinstance(instance, dict) else getattr(instance, field.lstrip("-"))
+            for field in ordering
+        ]
+        return json.dumps(values, default=str)
@@ -1,7 +1,10 @@
+import os
 from pathlib import Path
 from django.conf import settings
 from django.conf.urls.static import static
 
+from .database import database_settings
+
 # Base directory of the project
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -18,6 +21,7 @@ INSTALLED_APPS = [
     'products',
     'orders',
     'carts',
+    'inventory',
 
     # Django default apps
     'django.contrib.admin',
@@ -33,11 +37,18 @@ INSTALLED_APPS = [
     'drf_yasg',
     'django_filters',
     'widget_tweaks',
+    'django_celery_results',
 ]
 
 # Middleware
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    # gzip / Brotli for responses over COMPRESSION_MIN_SIZE, see config/compression.py
+    'config.compression.CompressionMiddleware',
+    # Reads to replicas, writes and recent writers to the primary, see config/db_router.py
+    'config.db_router.ReplicaRoutingMiddleware',
+    # Per-request query count / DB time / N+1 stats, see dashboard/instrumentation.py
+    'dashboard.instrumentation.QueryInstrumentationMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -48,6 +59,12 @@ MIDDLEWARE = [
 
 ROOT_URLCONF = 'config.urls'
 
+# Smaller responses aren't worth compressing
+COMPRESSION_MIN_SIZE = int(os.environ.get('COMPRESSION_MIN_SIZE', 1024))
+
+# Requests kept per route for the /dashboard/metrics/ percentiles
+INSTRUMENTATION_WINDOW = 1000
+
 # Templates
 TEMPLATES = [
     {
@@ -67,12 +84,97 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'config.wsgi.application'
 
-# Database configuration
-DATABASES = {
+# Database configuration: SQLite (WAL opt-in) or PostgreSQL (persistent / pooled
+# connections), chosen by DB_ENGINE and friends, see config/database.py
+DATABASES = {'default': database_settings(BASE_DIR)}
+if DATABASES['default']['ENGINE'].endswith('sqlite3'):
+    # File-backed test database: the in-memory one shares a cache whose table
+    # locks fail instead of waiting, which breaks the concurrency tests.
+    DATABASES['default']['TEST'] = {'NAME': BASE_DIR / 'test_db.sqlite3'}
+
+# Read replicas (config/db_router.py): same settings as the primary on other
+# hosts (DATABASE_REPLICA_HOSTS) or, locally, SQLite files standing in for
+# replicas (DATABASE_REPLICA_FILES; refresh them with manage.py sync_replicas).
+DATABASE_REPLICAS = []
+for key, env in (('HOST', 'DATABASE_REPLICA_HOSTS'), ('NAME', 'DATABASE_REPLICA_FILES')):
+    for value in filter(None, os.environ.get(env, '').split(',')):
+        alias = f'replica{len(DATABASE_REPLICAS) + 1}'
+        DATABASES[alias] = {
+            **DATABASES['default'],
+            key: BASE_DIR / value.strip() if key == 'NAME' else value.strip(),
+            'TEST': {'MIRROR': 'default'},
+        }
+        DATABASE_REPLICAS.append(alias)
+DATABASE_ROUTERS = ['config.db_router.ReplicaRouter']
+# How long a client reads from the primary after writing, and the cache alias
+# holding API clients' pins (must be shared by all workers, see CACHES)
+DATABASE_REPLICA_PIN_SECONDS = int(os.environ.get('DATABASE_REPLICA_PIN_SECONDS', 5))
+DATABASE_REPLICA_PIN_CACHE_ALIAS = os.environ.get('DATABASE_REPLICA_PIN_CACHE_ALIAS', 'default')
+
+# Caches
+# "default" holds read-replica pins and other short-lived state; "catalog" holds
+# versioned product/category API responses (products.cache). Local memory by
+# default; set CACHE_BACKEND / CACHE_LOCATION and CATALOG_CACHE_BACKEND /
+# CATALOG_CACHE_LOCATION to a shared backend (e.g.
+# django.core.cache.backends.redis.RedisCache) in production.
+CACHES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
-    }
+        'BACKEND': os.environ.get('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('CACHE_LOCATION', ''),
+    },
+    'catalog': {
+        'BACKEND': os.environ.get('CATALOG_CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('CATALOG_CACHE_LOCATION', 'catalog'),
+        'TIMEOUT': int(os.environ.get('CATALOG_CACHE_TIMEOUT', 300)),
+    },
+}
+if CACHES['catalog']['BACKEND'].endswith('LocMemCache'):
+    # Evict a third of the entries once the per-process cache is full.
+    CACHES['catalog']['OPTIONS'] = {'MAX_ENTRIES': 5000, 'CULL_FREQUENCY': 3}
+CATALOG_CACHE_ALIAS = 'catalog'
+CATALOG_CACHE_TIMEOUT = CACHES['catalog']['TIMEOUT']
+
+# JWT user cache (users.cache): per-process LRU, optionally backed by a shared
+# cache alias from CACHES so workers share warm entries
+AUTH_USER_CACHE_SIZE = int(os.environ.get('AUTH_USER_CACHE_SIZE', 10000))
+AUTH_USER_CACHE_TTL = int(os.environ.get('AUTH_USER_CACHE_TTL', 60))
+AUTH_USER_CACHE_ALIAS = os.environ.get('AUTH_USER_CACHE_ALIAS') or None
+
+# Product image derivatives (products.images): max width/height per size,
+# output format and quality
+PRODUCT_IMAGE_SIZES = {'thumbnail': 160, 'card': 480, 'detail': 1200}
+PRODUCT_IMAGE_FORMAT = os.environ.get('PRODUCT_IMAGE_FORMAT', 'WEBP')
+PRODUCT_IMAGE_QUALITY = int(os.environ.get('PRODUCT_IMAGE_QUALITY', 80))
+
+# Inventory: shards per product for flash sales and how long a cart holds its stock
+INVENTORY_SHARDS = int(os.environ.get('INVENTORY_SHARDS', 8))
+CART_RESERVATION_SECONDS = int(os.environ.get('CART_RESERVATION_SECONDS', 15 * 60))
+
+# Order archival (orders.archive): finished orders placed more than this many
+# days ago move to the archive tables
+ORDER_ARCHIVE_AFTER_DAYS = int(os.environ.get('ORDER_ARCHIVE_AFTER_DAYS', 365))
+
+# Celery (config/celery.py). Without a CELERY_BROKER_URL tasks run eagerly
+# in-process; CELERY_TASK_ALWAYS_EAGER=0 with the default memory:// broker
+# queues them in-process for tests without external services.
+CELERY_BROKER_URL = os.environ.get('CELERY_BROKER_URL', 'memory://')
+CELERY_TASK_ALWAYS_EAGER = os.environ.get(
+    'CELERY_TASK_ALWAYS_EAGER', str('CELERY_BROKER_URL' not in os.environ)
+).lower() in ('1', 'true', 'yes')
+CELERY_TASK_EAGER_PROPAGATES = True
+CELERY_TASK_STORE_EAGER_RESULT = True
+CELERY_RESULT_BACKEND = os.environ.get('CELERY_RESULT_BACKEND', 'django-db')
+CELERY_RESULT_EXTENDED = True
+# Tasks are idempotent, so redeliver rather than lose them if a worker dies.
+CELERY_TASK_ACKS_LATE = True
+CELERY_TASK_REJECT_ON_WORKER_LOST = True
+CELERY_WORKER_PREFETCH_MULTIPLIER = 1
+# Image work gets its own worker pool: celery -A config worker -Q images
+CELERY_TASK_ROUTES = {
+    'products.tasks.generate_image_derivatives': {'queue': 'images'},
+}
+CELERY_BEAT_SCHEDULE = {
+    'reconcile-inventory': {'task': 'inventory.tasks.reconcile_inventory', 'schedule': 60.0},
 }
 
 # Password validation
@@ -102,8 +204,18 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 # Django REST Framework & JWT Settings
 REST_FRAMEWORK = {
+    # orjson-backed JSON (config/renderers.py, config/parsers.py)
+    'DEFAULT_RENDERER_CLASSES': (
+        'config.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+    'DEFAULT_PARSER_CLASSES': (
+        'config.parsers.ORJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ),
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'users.authentication.CachedJWTAuthentication',
     ),
     'DEFAULT_FILTER_BACKENDS': [
         'django_filters.rest_framework.DjangoFilterBackend',
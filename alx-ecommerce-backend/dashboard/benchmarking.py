@@ -0,0 +1,37 @@
+"""Helpers shared by the bench management commands."""
+import os
+import tempfile
+from contextlib import contextmanager
+
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+
+@contextmanager
+def bench_database(file_backed=False, profile=None):
+    """
+    Run the block against a fresh test database that is destroyed afterwards.
+
+    The test database is the settings' TEST NAME (test_db.sqlite3 for
+    SQLite); ``file_backed`` puts it in a private temporary file instead, so a
+    bench never clobbers or inherits the file a test run is using.
+    ``profile`` temporarily overrides connection settings (CONN_MAX_AGE,
+    OPTIONS, ...) of the configured engine, see config/database.py.
+    """
+    setup_test_environment()
+    old_name = connection.settings_dict["NAME"]
+    old_test_name = connection.settings_dict["TEST"].get("NAME")
+    # Threads' connections share this dict, so the overrides reach all of them.
+    old_profile = {key: connection.settings_dict.get(key) for key in profile or {}}
+    connection.settings_dict.update(profile or {})
+    if file_backed and connection.vendor == "sqlite":
+        connection.settings_dict["TEST"]["NAME"] = os.path.join(tempfile.mkdtemp(), "bench.sqlite3")
+    # Never touch the real database: everything runs in a fresh test database.
+    connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        connection.settings_dict["TEST"]["NAME"] = old_test_name
+        connection.settings_dict.update(old_profile)
+        teardown_test_environment()
@@ -0,0 +1,57 @@
+import csv
+import zlib
+
+
+class Echo:
+    """File-like object whose write() just returns the value, for csv.writer streaming."""
+
+    def write(self, value):
+        return value
+
+
+def stream_lines(lines, compress=False, chunk_size=64 * 1024):
+    """
+    Yield already rendered text ``lines`` as bytes in chunks of roughly
+    ``chunk_size``. With ``compress`` the output is a gzip stream.
+    """
+    compressor = zlib.compressobj(wbits=31) if compress else None  # 31 = gzip container
+    buffer = []
+    size = 0
+
+    def flush():
+        data = "".join(buffer).encode("utf-8")
+        buffer.clear()
+        return compressor.compress(data) if compressor else data
+
+    for line in lines:
+        buffer.append(line)
+        size += len(line)
+        if size >= chunk_size:
+            size = 0
+            chunk = flush()
+            if chunk:
+                yield chunk
+    chunk = flush()
+    if compressor:
+        chunk += compressor.flush()
+    if chunk:
+        yield chunk
+
+
+def stream_csv(header, rows, compress=False, chunk_size=64 * 1024):
+    """
+    Yield CSV output for ``rows`` in chunks of roughly ``chunk_size`` bytes.
+
+    ``rows`` should be a lazy iterable (e.g. ``QuerySet.iterator()``) so memory
+    stays flat regardless of export size. With ``compress`` the output is a
+    gzip stream.
+    """
+    writer = csv.writer(Echo())
+
+    def lines():
+        if header:
+            yield writer.writerow(header)
+        for row in rows:
+            yield writer.writerow(row)
+
+    return stream_lines(lines(), compress=compress, chunk_size=chunk_size)
@@ -0,0 +1,194 @@
+"""
+Per-request SQL and latency instrumentation.
+
+QueryInstrumentationMiddleware counts and times every query a request runs,
+fingerprints the SQL to spot repeated statements (N+1 patterns), reports the
+numbers in a ``Server-Timing`` header and feeds per-route samples into the
+in-process ``metrics`` registry exposed by dashboard.views.metrics_view.
+
+Time spent iterating a streaming response happens after the middleware returns
+and is not included.
+
+The active recorder lives in a context variable and every connection gets a
+dispatching execute wrapper when it is opened, so queries are attributed to
+the right request for async views too, whose ORM calls run on a worker thread.
+"""
+import re
+import threading
+import time
+from collections import Counter, defaultdict, deque
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+_IN_LIST = re.compile(r"\(\s*%s(?:\s*,\s*%s)*\s*\)")
+_NUMBER = re.compile(r"\b\d+\b")
+
+
+def fingerprint(sql):
+    """Normalise SQL so the same statement with different parameters compares equal."""
+    return _NUMBER.sub("?", _IN_LIST.sub("(...)", sql))
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+class QueryRecorder:
+    """Database execute_wrapper collecting query count, time and fingerprints."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.fingerprints = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+            self.fingerprints[fingerprint(sql)] += 1
+
+    def duplicates(self):
+        return {sql: seen for sql, seen in self.fingerprints.items() if seen > 1}
+
+
+_active_recorder = ContextVar("query_recorder", default=None)
+
+
+def record_queries(execute, sql, params, many, context):
+    """Execute wrapper forwarding to the recorder of the current request, if any."""
+    recorder = _active_recorder.get()
+    if recorder is None:
+        return execute(sql, params, many, context)
+    return recorder(execute, sql, params, many, context)
+
+
+def install_query_hook(sender, connection, **kwargs):
+    """connection_created receiver, see DashboardConfig.ready()."""
+    if record_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_queries)
+
+
+class RouteMetrics:
+    """Sliding window of the last ``window`` requests of one route."""
+
+    MAX_DUPLICATES = 20
+
+    def __init__(self, window):
+        self.requests = 0
+        self.view_ms = deque(maxlen=window)
+        self.db_ms = deque(maxlen=window)
+        self.queries = deque(maxlen=window)
+        self.duplicate_requests = 0
+        self.duplicates = Counter()
+
+    def add(self, view_ms, recorder):
+        self.requests += 1
+        self.view_ms.append(view_ms)
+        self.db_ms.append(recorder.duration * 1000)
+        self.queries.append(recorder.count)
+        duplicates = recorder.duplicates()
+        if duplicates:
+            self.duplicate_requests += 1
+            self.duplicates.update(duplicates)
+            if len(self.duplicates) > self.MAX_DUPLICATES:
+                self.duplicates = Counter(dict(self.duplicates.most_common(self.MAX_DUPLICATES)))
+
+    def summary(self):
+        def stats(samples):
+            values = sorted(samples)
+            return {
+                "p50": round(percentile(values, 0.50), 2),
+                "p95": round(percentile(values, 0.95), 2),
+                "p99": round(percentile(values, 0.99), 2),
+                "max": round(values[-1], 2) if values else 0,
+            }
+
+        return {
+            "requests": self.requests,
+            "view_ms": stats(self.view_ms),
+            "db_ms": stats(self.db_ms),
+            "queries": stats(self.queries),
+            "duplicate_query_requests": self.duplicate_requests,
+            "top_duplicates": [
+                {"sql": sql, "count": count} for sql, count in self.duplicates.most_common(5)
+            ],
+        }
+
+
+class MetricsRegistry:
+    def __init__(self, window=1000):
+        self.window = window
+        self._lock = threading.Lock()
+        self._routes = defaultdict(lambda: RouteMetrics(self.window))
+
+    def record(self, route, view_ms, recorder):
+        with self._lock:
+            self._routes[route].add(view_ms, recorder)
+
+    def snapshot(self):
+        with self._lock:
+            return {route: metrics.summary() for route, metrics in sorted(self._routes.items())}
+
+    def reset(self):
+        with self._lock:
+            self._routes.clear()
+
+
+metrics = MetricsRegistry(getattr(settings, "INSTRUMENTATION_WINDOW", 1000))
+
+
+class QueryInstrumentationMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        recorder = QueryRecorder()
+        token = _active_recorder.set(recorder)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _active_recorder.reset(token)
+        return self.finish(request, response, recorder, start)
+
+    async def __acall__(self, request):
+        recorder = QueryRecorder()
+        token = _active_recorder.set(recorder)
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _active_recorder.reset(token)
+        return self.finish(request, response, recorder, start)
+
+    def finish(self, request, response, recorder, start):
+        view_ms = (time.perf_counter() - start) * 1000
+
+        match = getattr(request, "resolver_match", None)
+        route = (match.view_name or match.route) if match else "unresolved"
+        metrics.record(route, view_ms, recorder)
+
+        duplicates = sum(seen - 1 for seen in recorder.duplicates().values())
+        timings = [
+            f'db;dur={recorder.duration * 1000:.2f};desc="{recorder.count} queries"',
+            f"view;dur={view_ms:.2f}",
+        ]
+        if duplicates:
+            timings.append(f'dup;desc="{duplicates} duplicate queries"')
+        response["Server-Timing"] = ", ".join(timings)
+        return response
@@ -0,0 +1,153 @@
+import json
+import statistics
+import time
+import tracemalloc
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from carts.models import Cart, CartItem
+from dashboard.benchmarking import bench_database
+from products.datagen import DatasetGenerator
+from products.models import Product
+
+
+class Command(BaseCommand):
+    help = "Seed a throwaway test database and benchmark the hot request paths"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--size", type=int, default=1000, help="Number of products and of orders to seed")
+        parser.add_argument("--repeat", type=int, default=10, help="Timed runs per scenario")
+        parser.add_argument("--seed", type=int, default=42, help="Random seed for the generated dataset")
+        parser.add_argument("--scenario", action="append", help="Only run these scenarios (repeatable)")
+        parser.add_argument("--output", help="Write the JSON results to this file")
+        parser.add_argument("--baseline", help="Compare against results saved by an earlier --output")
+        parser.add_argument(
+            "--tolerance", type=float, default=0.2,
+            help="Allowed median slowdown vs. the baseline before flagging a regression (0.2 = 20%%)",
+        )
+        parser.add_argument("--fail-on-regression", action="store_true", help="Exit with an error on regressions")
+
+    def handle(self, *args, **options):
+        with bench_database():
+            results = self.run(options)
+
+        report = json.dumps(results, indent=2)
+        self.stdout.write(report)
+        if options["output"]:
+            with open(options["output"], "w") as f:
+                f.write(report)
+        if options["baseline"]:
+            regressions = self.compare(results, options["baseline"], options["tolerance"])
+            if regressions and options["fail_on_regression"]:
+                raise CommandError(f"{len(regressions)} benchmark regression(s)")
+
+    def run(self, options):
+        size = options["size"]
+        self.stderr.write(f"Seeding {size} products / orders...")
+        DatasetGenerator(seed=options["seed"]).generate(
+            categories=max(5, size // 1000), products=size, users=max(10, size // 100),
+            carts=max(10, size // 100), orders=size,
+        )
+        # Plenty of stock so repeated checkouts never run out.
+        Product.objects.update(stock=10 ** 6)
+        products = list(Product.objects.order_by("pk")[:11])
+        staff = User.objects.create_superuser("bench-admin", password="bench")
+        shopper = User.objects.create_user("bench-shopper", password="bench")
+        cart = Cart.objects.create(user=shopper)
+
+        web = APIClient()
+        web.force_login(staff)
+        api = APIClient()
+        api.credentials(HTTP_AUTHORIZATION=f"Bearer {RefreshToken.for_user(shopper).access_token}")
+
+        def fill_cart():
+            cart.items.all().delete()
+            CartItem.objects.bulk_create(CartItem(cart=cart, product=product) for product in products[:10])
+
+        fill_cart()
+
+        scenarios = {
+            "shop_page": (lambda: web.get("/dashboard/shop/"), None),
+            "product_list_api": (lambda: api.get("/api/products/"), None),
+            "product_search_api": (lambda: api.get("/api/products/?search=wireless lap"), None),
+            "cart_detail": (lambda: api.get("/api/cart/"), None),
+            "add_to_cart": (lambda: api.post("/api/add/", {"product": products[-1].pk, "quantity": 1}), None),
+            "checkout": (lambda: api.post("/api/checkout/"), fill_cart),
+            "admin_dashboard": (lambda: web.get("/dashboard/"), None),
+            "reports": (lambda: web.get("/dashboard/dashboard/reports/"), None),
+            "orders_csv_export": (lambda: web.get("/dashboard/orders/export/"), None),
+        }
+        selected = options["scenario"] or list(scenarios)
+        unknown = set(selected) - set(scenarios)
+        if unknown:
+            raise CommandError(f"Unknown scenario(s): {', '.join(sorted(unknown))}")
+
+        results = {"size": options["size"], "repeat": options["repeat"], "scenarios": {}}
+        for name in selected:
+            request, setup = scenarios[name]
+            self.stderr.write(f"Running {name}...")
+            results["scenarios"][name] = self.measure(request, setup, options["repeat"])
+        return results
+
+    def measure(self, request, setup, repeat):
+        def call():
+            if setup:
+                setup()
+            start = time.perf_counter()
+            with CaptureQueriesContext(connection) as queries:
+                response = request()
+                if response.streaming:
+                    for _ in response.streaming_content:
+                        pass
+            elapsed = (time.perf_counter() - start) * 1000
+            if response.status_code >= 400:
+                raise CommandError(f"{response.status_code} response: {response.content[:200]!r}")
+            return elapsed, len(queries)
+
+        timings, query_counts = [], []
+        for _ in range(repeat):
+            elapsed, queries = call()
+            timings.append(elapsed)
+            query_counts.append(queries)
+
+        # Separate run for memory, tracemalloc would skew the timings.
+        tracemalloc.start()
+        try:
+            call()
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+        return {
+            "first_ms": round(timings[0], 2),
+            "median_ms": round(statistics.median(timings), 2),
+            "min_ms": round(min(timings), 2),
+            "max_ms": round(max(timings), 2),
+            "queries": max(query_counts),
+            "peak_memory_kb": round(peak / 1024, 1),
+        }
+
+    def compare(self, results, baseline_path, tolerance):
+        with open(baseline_path) as f:
+            baseline = json.load(f)["scenarios"]
+        regressions = []
+        self.stderr.write(f"{'scenario':<22}{'median ms':>22}{'queries':>14}")
+        for name, current in results["scenarios"].items():
+            previous = baseline.get(name)
+            if previous is None:
+                continue
+            slower = current["median_ms"] > previous["median_ms"] * (1 + tolerance)
+            more_queries = current["queries"] > previous["queries"]
+            flag = "  REGRESSION" if slower or more_queries else ""
+            if flag:
+                regressions.append(name)
+            self.stderr.write(
+                f"{name:<22}{previous['median_ms']:>10} -> {current['median_ms']:<9}"
+                f"{previous['queries']:>5} -> {current['queries']:<5}{flag}"
+            )
+        return regressions
@@ -0,0 +1,201 @@
+import asyncio
+import json
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import ThreadSensitiveContext
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.conf import settings
+from django.db import close_old_connections, connection
+from django.db.backends.signals import connection_created
+from django.test import AsyncClient, Client
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from config.database import sqlite_settings
+from carts.models import Cart
+from dashboard.benchmarking import bench_database
+from products.datagen import DatasetGenerator
+from products.models import Product
+
+
+def cart_detail(products, n):
+    return "get", "/api/cart/", "/api/async/cart/", None
+
+
+def add_to_cart(products, n):
+    return "post", "/api/add/", "/api/async/add/", {"product": products[n % len(products)], "quantity": 1}
+
+
+def remove_from_cart(products, n):
+    return "delete", "/api/remove/", "/api/async/remove/", {"product": products[n % len(products)]}
+
+
+def mixed(products, n):
+    # Mostly reads with a write every fourth request, where readers and writers contend.
+    return add_to_cart(products, n) if n % 4 == 0 else cart_detail(products, n)
+
+
+# Each builds (method, sync path, async path, payload) for request number n.
+SCENARIOS = {
+    "cart_detail": cart_detail,
+    "add_to_cart": add_to_cart,
+    "remove_from_cart": remove_from_cart,
+    "mixed": mixed,
+}
+
+
+def db_profiles():
+    """Connection settings per --db-profile; "configured" keeps settings.DATABASES as is."""
+    base_dir = settings.BASE_DIR
+    rollback = {
+        # SQLite and Django defaults: rollback journal, deferred transactions, 5 s busy timeout.
+        "DB_SQLITE_JOURNAL_MODE": "DELETE", "DB_SQLITE_TRANSACTION_MODE": "DEFERRED",
+        "DB_SQLITE_BUSY_TIMEOUT": "5", "DB_CONN_MAX_AGE": "0",
+    }
+    keys = ("CONN_MAX_AGE", "CONN_HEALTH_CHECKS", "OPTIONS")
+    return {
+        "configured": None,
+        "sqlite-wal": {key: sqlite_settings(base_dir, {"DB_SQLITE_JOURNAL_MODE": "WAL"})[key] for key in keys},
+        "sqlite-rollback": {key: sqlite_settings(base_dir, rollback)[key] for key in keys},
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare concurrent throughput of the cart API: sync views on a threaded WSGI worker "
+        "vs. the async views on the ASGI handler"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=500, help="Requests per scenario and mode")
+        parser.add_argument("--concurrency", type=int, default=50, help="Requests in flight on the ASGI worker")
+        parser.add_argument("--threads", type=int, default=4, help="Threads of the WSGI worker (e.g. gunicorn --threads)")
+        parser.add_argument(
+            "--db-latency-ms", type=float, default=0,
+            help="Simulated network round trip added to every query (a local SQLite file has none)",
+        )
+        parser.add_argument("--scenario", action="append", help="Only run these scenarios (repeatable)")
+        parser.add_argument(
+            "--db-profile", action="append", choices=list(db_profiles()),
+            help="Database settings to compare (repeatable): configured (default) or a SQLite journal profile",
+        )
+        parser.add_argument("--no-asgi", action="store_true", help="Only run the WSGI worker")
+        parser.add_argument("--output", help="Write the JSON results to this file")
+
+    def handle(self, *args, **options):
+        selected = options["scenario"] or list(SCENARIOS)
+        unknown = set(selected) - set(SCENARIOS)
+        if unknown:
+            raise CommandError(f"Unknown scenario(s): {', '.join(sorted(unknown))}")
+
+        latency = options["db_latency_ms"] / 1000
+
+        def delay(execute, sql, params, many, context):
+            time.sleep(latency)
+            return execute(sql, params, many, context)
+
+        def add_delay(sender, connection, **kwargs):
+            connection.execute_wrappers.append(delay)
+
+        profiles = options["db_profile"] or ["configured"]
+        if connection.vendor != "sqlite" and set(profiles) != {"configured"}:
+            raise CommandError("The sqlite-* profiles need DB_ENGINE=sqlite")
+
+        results = {key: options[key] for key in ("requests", "concurrency", "threads", "db_latency_ms")}
+        results["profiles"] = {}
+        if latency:
+            connection_created.connect(add_delay)
+        try:
+            for profile in profiles:
+                self.stderr.write(f"Profile {profile} ({connection.vendor})")
+                with bench_database(file_backed=True, profile=db_profiles()[profile]):
+                    results["profiles"][profile] = self.run(selected, options)
+        finally:
+            connection_created.disconnect(add_delay)
+
+        report = json.dumps(results, indent=2)
+        self.stdout.write(report)
+        if options["output"]:
+            with open(options["output"], "w") as f:
+                f.write(report)
+
+    def run(self, selected, options):
+        DatasetGenerator(seed=42).generate(categories=5, products=200, users=0, carts=0, orders=0)
+        Product.objects.update(stock=10 ** 6)
+        products = list(Product.objects.order_by("pk").values_list("pk", flat=True)[:50])
+        # One shopper per in-flight request so writers don't all queue on the same cart.
+        shoppers = max(options["concurrency"], options["threads"])
+        users = [User.objects.create_user(f"bench-shopper-{i}") for i in range(shoppers)]
+        # Carts up front: concurrent first requests of one shopper would race to create one.
+        Cart.objects.bulk_create(Cart(user=user) for user in users)
+        tokens = [str(RefreshToken.for_user(user).access_token) for user in users]
+        connection.close()
+
+        results = {"scenarios": {}}
+        for name in selected:
+            scenario = SCENARIOS[name]
+
+            def request(n, asgi):
+                method, sync_path, async_path, payload = scenario(products, n)
+                kwargs = {"headers": {"Authorization": f"Bearer {tokens[n % len(tokens)]}"}}
+                if payload:
+                    kwargs.update(data=payload, content_type="application/json")
+                return method, async_path if asgi else sync_path, kwargs
+
+            self.stderr.write(f"Running {name}...")
+            results["scenarios"][name] = {"wsgi": self.run_wsgi(request, options)}
+            if not options["no_asgi"]:
+                results["scenarios"][name]["asgi"] = asyncio.run(self.run_asgi(request, options))
+        return results
+
+    def run_wsgi(self, request, options):
+        local = threading.local()
+
+        def call(n):
+            if not hasattr(local, "client"):
+                # Failed requests count as errors instead of stopping the run.
+                local.client = Client(raise_request_exception=False)
+            method, path, kwargs = request(n, asgi=False)
+            start = time.perf_counter()
+            # The test client skips the handler's connection housekeeping; do it as a
+            # real worker would, so CONN_MAX_AGE (persistent connections) takes effect.
+            close_old_connections()
+            response = getattr(local.client, method)(path, **kwargs)
+            close_old_connections()
+            return response.status_code, time.perf_counter() - start
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(options["threads"]) as pool:
+            outcomes = list(pool.map(call, range(options["requests"])))
+        return self.summarize(outcomes, time.perf_counter() - start)
+
+    async def run_asgi(self, request, options):
+        client = AsyncClient(raise_request_exception=False)
+        counter = iter(range(options["requests"]))
+        outcomes = []
+
+        async def shopper():
+            for n in counter:
+                method, path, kwargs = request(n, asgi=True)
+                start = time.perf_counter()
+                # Like the ASGI handler: each request gets its own thread for sync ORM work.
+                async with ThreadSensitiveContext():
+                    response = await getattr(client, method)(path, **kwargs)
+                outcomes.append((response.status_code, time.perf_counter() - start))
+
+        start = time.perf_counter()
+        await asyncio.gather(*(shopper() for _ in range(options["concurrency"])))
+        return self.summarize(outcomes, time.perf_counter() - start)
+
+    def summarize(self, outcomes, elapsed):
+        latencies = sorted(seconds * 1000 for _, seconds in outcomes)
+        errors = sum(1 for status, _ in outcomes if status >= 500 or status in (401, 403))
+        return {
+            "requests_per_second": round(len(outcomes) / elapsed, 1),
+            "p50_ms": round(statistics.median(latencies), 2),
+            "p95_ms": round(latencies[int(0.95 * (len(latencies) - 1))], 2),
+            "errors": errors,
+        }
@@ -0,0 +1,79 @@
+import io
+import json
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.utils.text import compress_string
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from config import compression
+from config.parsers import ORJSONParser
+from config.renderers import ORJSONRenderer
+from dashboard.benchmarking import bench_database
+from orders.models import Order
+from orders.serializers import OrderSerializer
+from products.datagen import DatasetGenerator
+from products.models import Product
+from products.serializers import ProductSerializer
+
+
+def timed(func, repeat):
+    """Median milliseconds of ``repeat`` calls and the last result."""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        samples.append((time.perf_counter() - start) * 1000)
+    return round(statistics.median(samples), 3), result
+
+
+class Command(BaseCommand):
+    help = "Benchmark JSON encode/parse time and bytes on the wire for product and order list payloads"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--size", type=int, default=1000, help="Products / orders per payload")
+        parser.add_argument("--repeat", type=int, default=20, help="Timed runs per measurement")
+        parser.add_argument("--output", help="Write the JSON results to this file")
+
+    def handle(self, *args, **options):
+        with bench_database():
+            results = self.run(options)
+        report = json.dumps(results, indent=2)
+        self.stdout.write(report)
+        if options["output"]:
+            with open(options["output"], "w") as f:
+                f.write(report)
+
+    def run(self, options):
+        size, repeat = options["size"], options["repeat"]
+        self.stderr.write(f"Seeding {size} products / orders...")
+        DatasetGenerator(seed=42).generate(categories=10, products=size, users=20, orders=size)
+        payloads = {
+            # What ProductViewSet / OrderViewSet list pages serialize, at --size rows.
+            "products": ProductSerializer(Product.objects.order_by("pk")[:size], many=True).data,
+            "orders": OrderSerializer(
+                Order.objects.prefetch_related("items").order_by("pk")[:size], many=True
+            ).data,
+        }
+        results = {"size": size, "repeat": repeat, "payloads": {}}
+        for name, data in payloads.items():
+            self.stderr.write(f"Measuring {name}...")
+            results["payloads"][name] = self.measure(data, repeat)
+        return results
+
+    def measure(self, data, repeat):
+        result = {"encode_ms": {}, "parse_ms": {}, "bytes": {}, "compress_ms": {}}
+        for name, renderer in (("drf", JSONRenderer()), ("orjson", ORJSONRenderer())):
+            result["encode_ms"][name], body = timed(lambda: renderer.render(data), repeat)
+        for name, parser in (("drf", JSONParser()), ("orjson", ORJSONParser())):
+            result["parse_ms"][name], _ = timed(lambda: parser.parse(io.BytesIO(body)), repeat)
+
+        result["bytes"]["identity"] = len(body)
+        result["compress_ms"]["gzip"], compressed = timed(lambda: compress_string(body, max_random_bytes=100), repeat)
+        result["bytes"]["gzip"] = len(compressed)
+        if compression.brotli is not None:
+            result["compress_ms"]["br"], compressed = timed(lambda: compression.brotli.compress(body, quality=5), repeat)
+            result["bytes"]["br"] = len(compressed)
+        return result
@@ -0,0 +1,26 @@
+import sqlite3
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from config.db_router import replicas
+
+
+class Command(BaseCommand):
+    help = "Copy the SQLite primary into the SQLite files standing in for read replicas (DATABASE_REPLICA_FILES)"
+
+    def handle(self, *args, **options):
+        primary = connections[DEFAULT_DB_ALIAS]
+        if primary.vendor != "sqlite":
+            raise CommandError("Only SQLite stand-in replicas can be synced; real replicas replicate themselves")
+        if not replicas():
+            raise CommandError("No replicas configured, set DATABASE_REPLICA_FILES")
+        primary.ensure_connection()
+        for alias in replicas():
+            target = connections[alias].settings_dict["NAME"]
+            connections[alias].close()
+            # The online backup API gives a consistent copy even while the primary is written to.
+            with sqlite3.connect(target) as destination:
+                primary.connection.backup(destination)
+            destination.close()
+            self.stdout.write(self.style.SUCCESS(f"{alias}: copied to {target}"))
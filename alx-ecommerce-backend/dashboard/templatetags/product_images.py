@@ -0,0 +1,16 @@
+from django import template
+
+from products import images
+
+register = template.Library()
+
+
+@register.filter
+def image_url(product, size):
+    """``{{ product|image_url:"card" }}``: pre-sized image URL, the original until it is generated."""
+    return images.derivative_url(product, size)
+
+
+@register.filter
+def image_srcset(product):
+    return images.srcset(product)
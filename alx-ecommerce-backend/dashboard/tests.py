@@ -1,3 +1,290 @@
-from django.test import TestCase
+import gzip
+import io
+import re
+from datetime import timedelta
+from decimal import Decimal
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection, router, transaction
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils.timezone import now
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from carts.models import Cart, CartItem
+from config.compression import CompressionMiddleware, negotiate
+from config.database import sqlite_settings
+from config.db_router import PIN_COOKIE, PIN_HEADER, ReplicaRoutingMiddleware, use_primary, use_replica
+from config.parsers import ORJSONParser
+from config.renderers import ORJSONRenderer
+from orders.models import Order
+from products.cache import get_cache
+from products.models import Category, Product
+from .instrumentation import metrics
+from .views import start_of_day
+
+HOT_TABLES = {"products_product", "orders_order", "carts_cartitem"}
+
+
+def full_scans(plan):
+    """Hot tables read by a full table scan in an EXPLAIN output (SQLite or PostgreSQL)."""
+    if connection.vendor == "postgresql":
+        tables = re.findall(r"Seq Scan on (\w+)", plan)
+    else:
+        tables = re.findall(r"\bSCAN (\w+)\b(?! USING)", plan)
+    return sorted(set(tables) & HOT_TABLES)
+
+
+class HotQueryPlanTests(TestCase):
+    """EXPLAIN the hot dashboard / shop / cart queries against a seeded database."""
+
+    @classmethod
+    def setUpTestData(cls):
+        categories = Category.objects.bulk_create(Category(name=f"Category {i}") for i in range(10))
+        products = Product.objects.bulk_create(
+            Product(
+                name=f"Product {i}", price=Decimal(i % 500), stock=i % 7,
+                category=categories[i % len(categories)],
+            )
+            for i in range(3000)
+        )
+        users = User.objects.bulk_create(User(username=f"user{i}") for i in range(50))
+        statuses = [choice for choice, _ in Order.STATUS_CHOICES]
+        Order.objects.bulk_create(
+            Order(user=users[i % len(users)], status=statuses[i % len(statuses)]) for i in range(3000)
+        )
+        carts = Cart.objects.bulk_create(Cart(user=user) for user in users)
+        CartItem.objects.bulk_create(
+            CartItem(cart=cart, product=products[(i * 37 + j) % len(products)])
+            for i, cart in enumerate(carts) for j in range(10)
+        )
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+        cls.user = users[0]
+        cls.cart = carts[0]
+        cls.product = products[0]
+
+    def hot_queries(self):
+        in_stock = Product.objects.filter(stock__gt=0)
+        since = start_of_day(now().date() - timedelta(days=7))
+        return {
+            "shop by price": in_stock.order_by("price")[:20],
+            "shop by name": in_stock.order_by("name")[:20],
+            "shop category by price": in_stock.filter(category__name="Category 3").order_by("-price")[:20],
+            "shop category max price": in_stock.filter(category__name="Category 3", price__lte=100).order_by("price")[:20],
+            "low stock count": Product.objects.filter(stock__gt=0, stock__lte=10).values("pk"),
+            "recent orders": Order.objects.select_related("user").order_by("-created_at")[:5],
+            "orders since": Order.objects.filter(created_at__gte=since).order_by("-created_at")[:5],
+            "orders by status": Order.objects.filter(status="Pending").values("pk"),
+            "customer orders": Order.objects.filter(user=self.user).order_by("-created_at")[:10],
+            "cart item lookup": CartItem.objects.filter(cart=self.cart, product=self.product),
+            "cart items": CartItem.objects.filter(cart=self.cart),
+        }
+
+    def test_hot_queries_use_indexes(self):
+        for name, queryset in self.hot_queries().items():
+            with self.subTest(name):
+                plan = queryset.explain()
+                self.assertEqual(full_scans(plan), [], f"{name} falls back to a full scan:\n{plan}")
+
+
+@override_settings(DATABASE_REPLICAS=["replica1"])
+class ReplicaRoutingTests(SimpleTestCase):
+    """Routing decisions only: the replica alias is never queried here."""
+
+    # No wrapping test transaction, which would route every read to the primary.
+    databases = {"default"}
+
+    def setUp(self):
+        cache.clear()
+        self.factory = RequestFactory()
+
+    def call(self, method="get", view=None, writes=False, **extra):
+        seen = {}
+
+        def default_view(request):
+            seen["before"] = router.db_for_read(Product)
+            if writes:
+                router.db_for_write(Product)
+            seen["after"] = router.db_for_read(Product)
+            with transaction.atomic():
+                seen["atomic"] = router.db_for_read(Product)
+            return HttpResponse()
+
+        view = view(default_view) if view else default_view
+        middleware = ReplicaRoutingMiddleware(lambda request: middleware.process_view(request, view, (), {}) or view(request))
+        request = getattr(self.factory, method)("/", **extra)
+        response = middleware(request)
+        return seen, response
+
+    def test_safe_reads_go_to_a_replica_until_the_request_writes(self):
+        seen, response = self.call()
+        self.assertEqual((seen["before"], seen["after"], seen["atomic"]), ("replica1", "replica1", "default"))
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+
+        seen, response = self.call(writes=True)
+        self.assertEqual((seen["before"], seen["after"]), ("replica1", "default"))
+        self.assertIn(PIN_COOKIE, response.cookies)
+
+    def test_writers_are_pinned_to_the_primary(self):
+        seen, response = self.call("post")
+        self.assertEqual(seen["before"], "default")
+        self.factory.cookies[PIN_COOKIE] = response.cookies[PIN_COOKIE].value
+        self.assertEqual(self.call()[0]["before"], "default")
+        del self.factory.cookies[PIN_COOKIE]
+
+        # API clients without cookies are pinned by their credentials.
+        self.call("post", HTTP_AUTHORIZATION="Bearer one")
+        self.assertEqual(self.call(HTTP_AUTHORIZATION="Bearer one")[0]["before"], "default")
+        self.assertEqual(self.call(HTTP_AUTHORIZATION="Bearer two")[0]["before"], "replica1")
+
+    def test_api_pin_survives_another_workers_cache(self):
+        _, response = self.call("post", HTTP_AUTHORIZATION="Bearer one")
+        # The next read lands on a worker whose local cache never saw the write.
+        cache.clear()
+        self.assertEqual(self.call(HTTP_AUTHORIZATION="Bearer one")[0]["before"], "replica1")
+        pinned = {"HTTP_AUTHORIZATION": "Bearer one", "HTTP_X_DB_PRIMARY_UNTIL": response[PIN_HEADER]}
+        self.assertEqual(self.call(**pinned)[0]["before"], "default")
+
+    def test_view_overrides(self):
+        self.assertEqual(self.call(view=use_primary)[0]["before"], "default")
+        self.call("post", HTTP_AUTHORIZATION="Bearer one")
+        self.assertEqual(self.call(view=use_replica, HTTP_AUTHORIZATION="Bearer one")[0]["before"], "replica1")
+        self.assertEqual(self.call("post", view=use_replica)[0]["before"], "default")
+
+
+class JSONWireTests(SimpleTestCase):
+    def test_renderer_matches_stock_output(self):
+        data = {
+            "price": Decimal("19.90"),
+            "created_at": now().replace(microsecond=0),
+            "items": [{"quantity": 2, "name": "caf\u00e9"}],
+            "empty": None,
+        }
+        ours = ORJSONRenderer().render(data)
+        self.assertEqual(JSONParser().parse(io.BytesIO(ours)), JSONParser().parse(io.BytesIO(JSONRenderer().render(data))))
+        self.assertEqual(ORJSONRenderer().render(None), b"")
+
+    def test_parser(self):
+        self.assertEqual(ORJSONParser().parse(io.BytesIO(b'{"quantity": 3}')), {"quantity": 3})
+        with self.assertRaises(ParseError):
+            ORJSONParser().parse(io.BytesIO(b'{"quantity": '))
+
+    def test_negotiate(self):
+        supported = ("br", "gzip")
+        self.assertEqual(negotiate("gzip, deflate, br", supported), "br")
+        self.assertEqual(negotiate("br;q=0.5, gzip", supported), "gzip")
+        self.assertEqual(negotiate("br;q=0, *;q=0.1", supported), "gzip")
+        self.assertIsNone(negotiate("identity", supported))
+        self.assertIsNone(negotiate("", supported))
+
+    @override_settings(COMPRESSION_MIN_SIZE=1024)
+    def test_middleware_threshold(self):
+        request = RequestFactory().get("/", HTTP_ACCEPT_ENCODING="gzip")
+        body = b'{"name": "product"}' * 100
+
+        response = CompressionMiddleware(lambda r: HttpResponse(body, content_type="application/json"))(request)
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertIn("Accept-Encoding", response["Vary"])
+        self.assertLess(len(response.content), len(body))
+
+        response = CompressionMiddleware(lambda r: HttpResponse(body[:500], content_type="application/json"))(request)
+        self.assertFalse(response.has_header("Content-Encoding"))
+        response = CompressionMiddleware(lambda r: HttpResponse(body, content_type="image/webp"))(request)
+        self.assertFalse(response.has_header("Content-Encoding"))
+
+
+class OrderExportTests(TestCase):
+    def setUp(self):
+        self.staff = User.objects.create_user("staff", is_staff=True)
+        buyer = User.objects.create_user("buyer")
+        today = now().date()
+        self.orders = {}
+        for name, status, days_ago in [
+            ("old", "Completed", 10), ("recent", "Pending", 1), ("cancelled", "Cancelled", 1), ("today", "Pending", 0),
+        ]:
+            order = Order.objects.create(user=buyer, status=status)
+            noon = start_of_day(today - timedelta(days=days_ago)) + timedelta(hours=12)
+            Order.objects.filter(pk=order.pk).update(created_at=noon)
+            self.orders[name] = order.pk
+        self.client.force_login(self.staff)
+        self.url = reverse("export_orders_csv")
+
+    def export(self, **params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        return b"".join(response.streaming_content).decode().splitlines()
+
+    def test_header_and_filters(self):
+        lines = self.export()
+        self.assertEqual(lines[0], "ID,Customer,Date,Total,Status")
+        self.assertEqual([int(line.split(",")[0]) for line in lines[1:]], sorted(self.orders.values()))
+
+        day = (now().date() - timedelta(days=1)).isoformat()
+        lines = self.export(start=day, end=day)
+        self.assertEqual(
+            [int(line.split(",")[0]) for line in lines[1:]], sorted([self.orders["recent"], self.orders["cancelled"]])
+        )
+        self.assertTrue(all(line.split(",")[2] == day for line in lines[1:]))
+
+        lines = self.export(start=day, status="Pending")
+        self.assertEqual(
+            [int(line.split(",")[0]) for line in lines[1:]], sorted([self.orders["recent"], self.orders["today"]])
+        )
+        self.assertEqual(self.client.get(self.url, {"start": "yesterday"}).status_code, 400)
+
+    def test_compressed_when_accepted(self):
+        response = self.client.get(self.url, HTTP_ACCEPT_ENCODING="gzip")
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        lines = gzip.decompress(b"".join(response.streaming_content)).decode().splitlines()
+        self.assertEqual(lines[0], "ID,Customer,Date,Total,Status")
+        self.assertEqual(len(lines), 1 + len(self.orders))
+
+        # A .csv.gz download is already compressed.
+        response = self.client.get(self.url, {"gzip": "1"}, HTTP_ACCEPT_ENCODING="gzip")
+        self.assertFalse(response.has_header("Content-Encoding"))
+        lines = gzip.decompress(b"".join(response.streaming_content)).decode().splitlines()
+        self.assertEqual(lines[0], "ID,Customer,Date,Total,Status")
+
+
+class InstrumentationTests(TestCase):
+    def setUp(self):
+        metrics.reset()
+        self.addCleanup(metrics.reset)
+
+    def test_server_timing_and_metrics(self):
+        category = Category.objects.create(name="Audio")
+        Product.objects.create(name="Speaker", price=Decimal("40.00"), stock=1, category=category)
+        get_cache().clear()
+        response = self.client.get("/api/products/")
+        timing = response["Server-Timing"]
+        self.assertRegex(timing, r'db;dur=[\d.]+;desc="\d+ queries"')
+        self.assertIn("view;dur=", timing)
+
+        url = reverse("metrics")
+        self.assertEqual(self.client.get(url).status_code, 302)
+        self.client.force_login(User.objects.create_user("shopper"))
+        self.assertEqual(self.client.get(url).status_code, 302)
+        self.client.force_login(User.objects.create_user("staff", is_staff=True))
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        routes = response.json()["routes"]
+        self.assertEqual(routes["product-list"]["requests"], 1)
+        self.assertGreaterEqual(routes["product-list"]["queries"]["max"], 1)
+
+
+class DatabaseSettingsTests(SimpleTestCase):
+    def test_wal_is_opt_in(self):
+        # The journal mode is written into the database file, so it's only set on request.
+        pragmas = sqlite_settings(settings.BASE_DIR, {})["OPTIONS"]["init_command"]
+        self.assertNotIn("journal_mode", pragmas)
+        self.assertIn("synchronous=FULL", pragmas)
+
+        pragmas = sqlite_settings(settings.BASE_DIR, {"DB_SQLITE_JOURNAL_MODE": "wal"})["OPTIONS"]["init_command"]
+        self.assertIn("PRAGMA journal_mode=WAL", pragmas)
+        self.assertIn("synchronous=NORMAL", pragmas)
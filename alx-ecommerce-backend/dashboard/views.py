@@ -4,40 +4,63 @@ from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.forms import AuthenticationForm
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib.auth.models import User
-from django.utils.timezone import now, timedelta
+from django.utils.timezone import now, timedelta, make_aware
 from django.core.paginator import Paginator
-from django.http import HttpResponse, JsonResponse
+from django.http import JsonResponse, StreamingHttpResponse
+from django.utils.dateparse import parse_date
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_POST
-import csv
+import heapq
 import json
+from datetime import datetime, time
 
 # Models & Forms
-from orders.models import Order, OrderItem
+from orders.archive import tiered_orders
+from orders.models import Order
+from orders.rollups import sales_summary, update_orders_status
+from orders.services import CheckoutError, place_order
 from carts.models import Cart, CartItem
+from carts.services import add_item, clear, remove_item
+from inventory.services import OutOfStock
+from products.facets import product_facets
 from products.models import Product, Category
+from users.cache import user_cache
 from .forms import ProductForm, OrderForm, CustomUserCreationForm
+from config.db_router import read_alias, use_replica
+from .exports import stream_csv
+from .instrumentation import metrics
+
+
+def archived_param(request):
+    """The ``?archived=`` tier selection (see orders.archive.tiered_orders), or "" for live orders."""
+    archived = request.GET.get("archived", "")
+    return archived if archived in ("include", "only") else ""
+
+
+def start_of_day(day):
+    """Aware midnight of ``day``; range filters on it can use the created_at index, unlike ``__date``."""
+    return make_aware(datetime.combine(day, time.min))
 
 
 # ================= Cart Views =================
 @login_required
 def cart_page(request):
-    cart, _ = Cart.objects.get_or_create(user=request.user)
-    items = cart.items.select_related("product")
+    cart = Cart.objects.for_user(request.user)
+    items = cart.items.all()
     return render(request, "dashboard/cart.html", {"cart": cart, "items": items})
 
 
 @login_required
 def clear_cart(request):
     cart = get_object_or_404(Cart, user=request.user)
-    cart.items.all().delete()
+    clear(cart)
     return redirect("cart_page")
 
 
 @login_required
 def remove_from_cart(request, item_id):
     item = get_object_or_404(CartItem, id=item_id, cart__user=request.user)
-    item.delete()
+    remove_item(item.cart, item.product_id)
     return redirect("cart_page")
 
 
@@ -78,12 +101,18 @@ def signup_view(request):
 @login_required
 def shop_view(request):
     products = Product.objects.filter(stock__gt=0)
-    categories = Category.objects.all()
+    categories = list(Category.objects.all())
 
     # filters
     selected_category = request.GET.get("category", "all")
+    category_id = None
     if selected_category != "all":
         products = products.filter(category__name=selected_category)
+        category_id = next((c.pk for c in categories if c.name == selected_category), 0)
+
+    selected_brand = request.GET.get("brand") or None
+    if selected_brand:
+        products = products.filter(brand=selected_brand)
 
     max_price = request.GET.get("max_price")
     if max_price:
@@ -111,19 +140,27 @@ def shop_view(request):
         product_id = request.POST.get("product_id")
         quantity = int(request.POST.get("quantity", 1))
         product = get_object_or_404(Product, id=product_id)
-        if quantity > product.stock:
-            messages.error(request, f"Only {product.stock} items available for {product.name}.")
+        try:
+            # Holds the stock for the cart; the conditional UPDATE behind it can't oversell.
+            add_item(cart, product, quantity)
+        except (OutOfStock, ValueError) as e:
+            messages.error(request, str(e))
             return redirect("shop")
-        cart_item, created = CartItem.objects.get_or_create(cart=cart, product=product)
-        cart_item.quantity = cart_item.quantity + quantity if not created else quantity
-        cart_item.save()
         messages.success(request, f"🛒 Added {quantity} × {product.name} to your cart")
         return redirect("shop")
 
+    # Only the page render needs the facet counts.
+    facets = product_facets(category_id, selected_brand, max_price or None)
+    counts = {facet["id"]: facet["count"] for facet in facets["categories"]}
+    for category in categories:
+        category.product_count = counts.get(category.pk, 0)
+
     context = {
         "products": products,
         "categories": categories,
         "selected_category": selected_category,
+        "selected_brand": selected_brand,
+        "facets": facets,
         "max_price": max_price or 10000,
         "cart_items_count": cart_items_count,
     }
@@ -145,35 +182,42 @@ def admin_dashboard(request):
     elif period == "month":
         start_date = today.replace(day=1)
 
-    orders = Order.objects.all().order_by("-created_at")
+    orders = Order.objects.select_related("user").order_by("-created_at")
     if start_date:
-        orders = orders.filter(created_at__date__gte=start_date)
+        orders = orders.filter(created_at__gte=start_of_day(start_date))
 
-    total_sales = sum(
-        sum(item.price * item.quantity for item in order.items.all())
-        for order in orders
-    )
+    sales = sales_summary(start_date)
 
     context = {
         "users_count": User.objects.count(),
         "products_count": Product.objects.count(),
-        "orders_count": orders.count(),
-        "total_sales": total_sales,
+        "orders_count": sales["orders_count"],
+        "total_sales": sales["revenue"],
         "period": period,
         "recent_orders": orders[:5],
     }
     return render(request, "dashboard/admin_dashboard.html", context)
 
 
+@use_replica
 @login_required
 @user_passes_test(lambda u: u.is_staff)
 def reports_view(request):
-    orders = Order.objects.all().order_by("-created_at")
-    total_sales = sum(
-        sum(item.price * item.quantity for item in order.items.all())
-        for order in orders
-    )
-    return render(request, "dashboard/reports.html", {"orders": orders, "total_sales": total_sales})
+    archived = archived_param(request)
+    orders = tiered_orders(archived).select_related("user").order_by("-created_at")
+    # The rollup covers both tiers.
+    total_sales = sales_summary()["revenue"]
+    return render(request, "dashboard/reports.html", {"orders": orders, "total_sales": total_sales, "archived": archived})
+
+
+@login_required
+@user_passes_test(lambda u: u.is_staff)
+def metrics_view(request):
+    """Per-route latency / query percentiles and JWT user cache counters."""
+    if request.method == "POST" and request.POST.get("reset"):
+        metrics.reset()
+        user_cache.clear()
+    return JsonResponse({"routes": metrics.snapshot(), "auth_user_cache": user_cache.stats()})
 
 
 # ================= Products CRUD =================
@@ -252,7 +296,7 @@ def bulk_update_orders(request):
         if not ids or not status:
             return JsonResponse({"error": "Invalid data"}, status=400)
 
-        Order.objects.filter(id__in=ids).update(status=status)
+        update_orders_status(Order.objects.filter(id__in=ids), status)
         return JsonResponse({"message": "Orders updated successfully"})
     except Exception as e:
         return JsonResponse({"error": str(e)}, status=500)
@@ -277,10 +321,10 @@ def bulk_delete_orders(request):
 
 @login_required
 def orders_list(request):
-    if request.user.is_staff:
-        orders = Order.objects.all().order_by("-created_at")
-    else:
-        orders = Order.objects.filter(user=request.user).order_by("-created_at")
+    archived = archived_param(request)
+    orders = tiered_orders(archived).select_related("user").order_by("-created_at")
+    if not request.user.is_staff:
+        orders = orders.filter(user=request.user)
 
     paginator = Paginator(orders, 10)
     page_number = request.GET.get("page")
@@ -292,6 +336,7 @@ def orders_list(request):
         "completed": orders.filter(status="Completed").count(),
         "processing": orders.filter(status="Processing").count(),
         "pending": orders.filter(status="Pending").count(),
+        "archived": archived,
     }
     return render(request, "dashboard/orders.html", context)
 
@@ -332,36 +377,62 @@ def order_update(request, pk):
 @login_required
 def checkout(request):
     cart = get_object_or_404(Cart, user=request.user)
-    if not cart.items.exists():
+    try:
+        place_order(cart)
+    except CheckoutError as e:
+        messages.error(request, str(e))
         return redirect("cart_page")
-    order = Order.objects.create(user=request.user, status="Pending")
-    for item in cart.items.all():
-        OrderItem.objects.create(
-            order=order, product=item.product, quantity=item.quantity, price=item.product.price
-        )
-        item.product.stock -= item.quantity
-        item.product.save()
-    cart.items.all().delete()
     return redirect("orders_list")
 
 
+@use_replica
 @login_required
 @user_passes_test(lambda u: u.is_staff)
 def export_orders_csv(request):
-    response = HttpResponse(content_type="text/csv")
-    response["Content-Disposition"] = 'attachment; filename="orders.csv"'
-
-    writer = csv.writer(response)
-    writer.writerow(["ID", "Customer", "Date", "Total", "Status"])
-
-    for order in Order.objects.all():
-        writer.writerow([
-            order.id,
-            order.user.username if order.user else "Guest",
-            order.created_at.strftime("%Y-%m-%d"),
-            order.total_price if hasattr(order, "total_price") else sum(i.price * i.quantity for i in order.items.all()),
-            order.status,
-        ])
+    """
+    Stream orders as CSV (optionally gzipped).
+
+    Query params: start / end (YYYY-MM-DD, inclusive), status, user (id or
+    username), archived=include|only and gzip=1.
+    """
+    # Bound explicitly: the rows are streamed after the routing scope has closed.
+    orders = tiered_orders(archived_param(request)).using(read_alias()).order_by("id")
+
+    for param, lookup, offset in (("start", "created_at__gte", 0), ("end", "created_at__lt", 1)):
+        value = request.GET.get(param)
+        if value:
+            try:
+                day = parse_date(value)
+            except ValueError:
+                day = None
+            if day is None:
+                return JsonResponse({"error": f"Invalid {param} date"}, status=400)
+            orders = orders.filter(**{lookup: start_of_day(day + timedelta(days=offset))})
+
+    status = request.GET.get("status")
+    if status:
+        orders = orders.filter(status=status)
+
+    user = request.GET.get("user")
+    if user:
+        orders = orders.filter(user_id=user) if user.isdigit() else orders.filter(user__username=user)
+
+    # Each tier streams in id order; ids are unique across tiers, so merging keeps the file in id order.
+    rows = (
+        (order_id, username or "Guest", created_at.strftime("%Y-%m-%d"), total_price, order_status)
+        for order_id, username, created_at, total_price, order_status in heapq.merge(*(
+            tier.values_list("id", "user__username", "created_at", "total_price", "status").iterator(chunk_size=2000)
+            for tier in getattr(orders, "tiers", (orders,))
+        ))
+    )
+
+    compress = request.GET.get("gzip") in ("1", "true")
+    response = StreamingHttpResponse(
+        stream_csv(["ID", "Customer", "Date", "Total", "Status"], rows, compress=compress),
+        content_type="application/gzip" if compress else "text/csv",
+    )
+    filename = "orders.csv.gz" if compress else "orders.csv"
+    response["Content-Disposition"] = f'attachment; filename="{filename}"'
     return response
 
 
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from inventory.services import reconcile
+
+
+class Command(BaseCommand):
+    help = "Release expired cart reservations and fold stock shards back into Product.stock (run every minute or so)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--fold", action="store_true", help="Also unshard the products (end of a sale)")
+
+    def handle(self, *args, **options):
+        released, products = reconcile(fold_shards=options["fold"])
+        self.stdout.write(self.style.SUCCESS(
+            f"Released {released} reserved unit(s); reconciled {products} sharded product(s)."
+        ))
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+from inventory.services import fold, shard_stock
+from products.models import Product
+
+
+class Command(BaseCommand):
+    help = "Spread products' stock over sharded counters ahead of a flash sale, or fold it back"
+
+    def add_arguments(self, parser):
+        parser.add_argument("product_ids", nargs="+", type=int)
+        parser.add_argument("--shards", type=int, help="Shards per product (default: settings.INVENTORY_SHARDS)")
+        parser.add_argument("--fold", action="store_true", help="Fold the shards back into Product.stock")
+
+    def handle(self, *args, **options):
+        products = list(Product.objects.filter(pk__in=options["product_ids"]))
+        missing = set(options["product_ids"]) - {product.pk for product in products}
+        if missing:
+            raise CommandError(f"Unknown product id(s): {', '.join(map(str, sorted(missing)))}")
+        if options["shards"] is not None and options["shards"] < 1:
+            raise CommandError("--shards must be at least 1")
+
+        for product in products:
+            if options["fold"]:
+                total = fold(product)
+                self.stdout.write(f"{product}: folded {total} unit(s) into Product.stock")
+            else:
+                shard_stock(product, options["shards"])
+                self.stdout.write(f"{product}: sharded")
+        self.stdout.write(self.style.SUCCESS("Done."))
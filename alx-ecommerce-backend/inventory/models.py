@@ -0,0 +1,42 @@
+from django.db import models
+
+from products.models import Product
+
+
+class StockShard(models.Model):
+    """
+    One slice of a sharded product's stock.
+
+    Checkouts of a hot product decrement a random shard instead of the single
+    Product row, so they stop queueing on one row lock. Product.stock is kept
+    as the reconciled total for display and filtering (see inventory.services).
+    """
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="shards")
+    index = models.PositiveSmallIntegerField()
+    quantity = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["product", "index"], name="unique_stock_shard"),
+            models.CheckConstraint(condition=models.Q(quantity__gte=0), name="stock_shard_not_negative"),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id}#{self.index}: {self.quantity}"
+
+
+class StockReservation(models.Model):
+    """Stock taken off the shelf for a cart line until checkout or ``expires_at``."""
+    cart = models.ForeignKey("carts.Cart", on_delete=models.SET_NULL, null=True, related_name="reservations")
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="reservations")
+    # Shard the quantity came from, None when it came from Product.stock.
+    shard = models.PositiveSmallIntegerField(null=True, blank=True)
+    quantity = models.PositiveIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["cart", "product"], name="reservation_cart_product_idx")]
+
+    def __str__(self):
+        return f"{self.quantity} × {self.product_id} for cart {self.cart_id}"
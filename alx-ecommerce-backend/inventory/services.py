@@ -0,0 +1,387 @@
+"""
+Stock moves: sharded counters, cart reservations and reconciliation.
+
+Every decrement is a conditional UPDATE (``... WHERE quantity >= n``), so stock
+can never go negative however many checkouts race. A product normally keeps
+its stock in Product.stock. For flash sales ``shard_stock()`` spreads it over
+``INVENTORY_SHARDS`` StockShard rows; decrements then hit a random shard and
+only lock all of them when that shard runs short, so concurrent buyers stop
+serializing on one row. While sharded, Product.stock is a display total that
+``reconcile()`` refreshes from the shards; restock through ``restock()``.
+
+Adding to a cart reserves stock (``reserve()``) for CART_RESERVATION_SECONDS,
+extended on every cart change. Holds and releases only invalidate the catalog
+cache when a product sells out or comes back (``invalidate=STOCK_OUT``), so
+cart traffic doesn't keep emptying it; cached stock figures may lag meanwhile. Checkout consumes the cart's reservations and
+takes any shortfall from the shelf. Expired holds are given back by
+``release_expired()``: lazily when a reservation can't be served, and by the
+reconcile_inventory job.
+"""
+import random
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, OuterRef, Q, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from products.cache import bump_catalog_version_on_commit
+from products.models import Product
+from .models import StockReservation, StockShard
+
+
+# ``invalidate`` mode: bump the catalog version only when a product's stock crosses zero.
+STOCK_OUT = "stock-out"
+
+
+class OutOfStock(Exception):
+    """Not enough stock for ``products``; the message is user-facing."""
+
+    def __init__(self, products):
+        self.products = list(products)
+        super().__init__(f"Not enough stock for: {', '.join(p.name for p in self.products)}")
+
+
+def take(quantities, invalidate=True):
+    """
+    Take ``quantities`` ({product: qty}) off the shelf, all or nothing.
+
+    Returns the allocations as ``(product_id, shard, qty)`` triples (shard is
+    None for Product.stock) so they can be given back later. With
+    ``invalidate=False`` bumping the catalog cache is left to the caller, with
+    STOCK_OUT it is only bumped when a product sells out.
+    """
+    plain = {product: qty for product, qty in quantities.items() if not product.stock_shards}
+    sharded = {product: qty for product, qty in quantities.items() if product.stock_shards}
+    allocations = []
+    with transaction.atomic():
+        if plain:
+            _take_from_products(plain, invalidate)
+            allocations += [(product.pk, None, qty) for product, qty in plain.items()]
+        short = []
+        for product, qty in sharded.items():
+            taken = _take_from_shards(product, qty)
+            if taken is None:
+                short.append(product)
+            else:
+                allocations += taken
+        if short:
+            raise OutOfStock(short)
+    return allocations
+
+
+def _take_from_products(quantities, invalidate):
+    # One UPDATE for all lines, like the original checkout.
+    wanted = Case(
+        *[When(pk=product.pk, then=Value(qty)) for product, qty in quantities.items()],
+        output_field=IntegerField(),
+    )
+    updated = (
+        # stock_shards=0 guards against a product sharded since it was loaded.
+        Product.objects.filter(pk__in=[product.pk for product in quantities], stock_shards=0, stock__gte=wanted)
+        .update(stock=F("stock") - wanted)
+    )
+    if updated != len(quantities):
+        short = Product.objects.filter(pk__in=[product.pk for product in quantities], stock__lt=wanted)
+        raise OutOfStock(short)
+    if invalidate == STOCK_OUT:
+        invalidate = Product.objects.filter(pk__in=[product.pk for product in quantities], stock=0).exists()
+    if invalidate:
+        # Catalog payloads include stock, which the UPDATE above bypasses signals for.
+        bump_catalog_version_on_commit()
+
+
+def _take_from_shards(product, qty):
+    index = random.randrange(product.stock_shards)
+    # Fast path: one random shard covers the whole line, no other rows are touched.
+    if StockShard.objects.filter(product=product, index=index, quantity__gte=qty).update(
+        quantity=F("quantity") - qty
+    ):
+        return [(product.pk, index, qty)]
+
+    # Slow path: gather the line from several shards under a lock on all of them.
+    shards = list(
+        StockShard.objects.select_for_update().filter(product=product, quantity__gt=0).order_by("index")
+    )
+    if sum(shard.quantity for shard in shards) < qty:
+        return None
+    taken, remaining = [], qty
+    for shard in shards:
+        part = min(shard.quantity, remaining)
+        shard.quantity -= part
+        taken.append((product.pk, shard.index, part))
+        remaining -= part
+        if not remaining:
+            break
+    touched = {index for _, index, _ in taken}
+    StockShard.objects.bulk_update([shard for shard in shards if shard.index in touched], ["quantity"])
+    return taken
+
+
+def give_back(allocations, invalidate=True):
+    """Return ``(product_id, shard, qty)`` allocations to the shelf."""
+    totals = defaultdict(int)
+    for product_id, shard, qty in allocations:
+        totals[product_id, shard] += qty
+    to_products = defaultdict(int)
+    for (product_id, shard), qty in totals.items():
+        if shard is None:
+            to_products[product_id] += qty
+        elif not StockShard.objects.filter(product_id=product_id, index=shard).update(quantity=F("quantity") + qty):
+            # Folded since the stock was taken.
+            to_products[product_id] += qty
+    if not to_products:
+        return
+
+    returned = Case(
+        *[When(pk=product_id, then=Value(qty)) for product_id, qty in to_products.items()],
+        output_field=IntegerField(),
+    )
+    if invalidate == STOCK_OUT:
+        invalidate = Product.objects.filter(pk__in=to_products, stock_shards=0, stock=0).exists()
+    updated = Product.objects.filter(pk__in=to_products, stock_shards=0).update(stock=F("stock") + returned)
+    if updated and invalidate:
+        bump_catalog_version_on_commit()
+    if updated != len(to_products):
+        # Sharded since the stock was taken.
+        for product_id in Product.objects.filter(pk__in=to_products, stock_shards__gt=0).values_list("pk", flat=True):
+            StockShard.objects.filter(product_id=product_id, index=0).update(
+                quantity=F("quantity") + to_products[product_id]
+            )
+
+
+def reservation_expiry():
+    return timezone.now() + timedelta(seconds=settings.CART_RESERVATION_SECONDS)
+
+
+def reserve(cart, product, quantity):
+    """Hold ``quantity`` of ``product`` for ``cart``; raises OutOfStock."""
+    reserve_many(cart, {product: quantity})
+
+
+def reserve_many(cart, quantities):
+    """
+    Hold ``quantities`` ({product: qty}) for ``cart``, all or nothing; raises OutOfStock.
+
+    When the shelf is short, expired holds on the short products are released
+    first and the take is retried once.
+    """
+    # No savepoint: failures propagate and roll back the caller's transaction anyway.
+    with transaction.atomic(savepoint=False):
+        try:
+            allocations = take(quantities, invalidate=STOCK_OUT)
+        except OutOfStock as e:
+            if not release_expired(product_ids=[product.pk for product in e.products]):
+                raise
+            allocations = take(quantities, invalidate=STOCK_OUT)
+        expires_at = reservation_expiry()
+        StockReservation.objects.bulk_create(
+            StockReservation(cart=cart, product_id=product_id, shard=shard, quantity=qty, expires_at=expires_at)
+            for product_id, shard, qty in allocations
+        )
+        # Any cart activity keeps the whole cart on hold.
+        StockReservation.objects.filter(cart=cart).update(expires_at=expires_at)
+
+
+def release(cart, product_ids=None):
+    """Give back what ``cart`` holds (for ``product_ids`` only, if given)."""
+    with transaction.atomic(savepoint=False):
+        reservations = StockReservation.objects.select_for_update().filter(cart=cart)
+        if product_ids is not None:
+            reservations = reservations.filter(product_id__in=product_ids)
+        rows = list(reservations)
+        if rows:
+            StockReservation.objects.filter(pk__in=[row.pk for row in rows]).delete()
+            give_back(((row.product_id, row.shard, row.quantity) for row in rows), invalidate=STOCK_OUT)
+    return sum(row.quantity for row in rows)
+
+
+def release_expired(now=None, product_ids=None, batch_size=1000):
+    """Give back expired and orphaned (cart deleted) holds; returns the quantity released."""
+    expired = StockReservation.objects.filter(Q(expires_at__lte=now or timezone.now()) | Q(cart__isnull=True))
+    if product_ids is not None:
+        expired = expired.filter(product_id__in=product_ids)
+    released = 0
+    while True:
+        with transaction.atomic():
+            rows = list(expired.select_for_update(skip_locked=True).order_by("pk")[:batch_size])
+            if not rows:
+                return released
+            StockReservation.objects.filter(pk__in=[row.pk for row in rows]).delete()
+            give_back(((row.product_id, row.shard, row.quantity) for row in rows), invalidate=STOCK_OUT)
+        released += sum(row.quantity for row in rows)
+
+
+def consume(cart, quantities, invalidate=True):
+    """
+    Settle stock for checking out ``cart`` with ``quantities`` ({product: qty}).
+
+    The cart's holds are used first, whatever their expiry (unreleased stock is
+    still off the shelf); the shortfall is taken now, after releasing expired
+    holds if the shelf is short, and any surplus goes back.
+    Must run inside the checkout transaction: on OutOfStock the rollback
+    restores the holds.
+    """
+    rows = list(StockReservation.objects.select_for_update().filter(cart=cart).order_by("pk"))
+    if rows:
+        StockReservation.objects.filter(pk__in=[row.pk for row in rows]).delete()
+    held = defaultdict(list)
+    for row in rows:
+        held[row.product_id].append(row)
+
+    shortfall, surplus = {}, []
+    for product, qty in quantities.items():
+        for row in held.pop(product.pk, []):
+            used = min(row.quantity, qty)
+            qty -= used
+            if row.quantity > used:
+                surplus.append((row.product_id, row.shard, row.quantity - used))
+        if qty:
+            shortfall[product] = qty
+    for rows_left in held.values():
+        surplus += [(row.product_id, row.shard, row.quantity) for row in rows_left]
+
+    if shortfall:
+        try:
+            take(shortfall, invalidate)
+        except OutOfStock as e:
+            # As in reserve_many: abandoned carts' expired holds go back first.
+            if not release_expired(product_ids=[product.pk for product in e.products]):
+                raise
+            take(shortfall, invalidate)
+    give_back(surplus, invalidate)
+
+
+def shard_stock(product, shards=None):
+    """Spread ``product``'s stock over ``shards`` StockShard rows (e.g. before a flash sale)."""
+    shards = shards or settings.INVENTORY_SHARDS
+    with transaction.atomic():
+        product = Product.objects.select_for_update().get(pk=product.pk)
+        if product.stock_shards:
+            fold(product)
+            product.refresh_from_db()
+        stock = max(product.stock, 0)
+        StockShard.objects.bulk_create(
+            StockShard(product=product, index=index, quantity=stock // shards + (index < stock % shards))
+            for index in range(shards)
+        )
+        Product.objects.filter(pk=product.pk).update(stock_shards=shards)
+    bump_catalog_version_on_commit()
+
+
+def fold(product):
+    """Move a sharded product's stock back into Product.stock and drop its shards."""
+    with transaction.atomic():
+        Product.objects.select_for_update().filter(pk=product.pk).first()
+        shards = StockShard.objects.select_for_update().filter(product=product)
+        total = shards.aggregate(total=Coalesce(Sum("quantity"), 0))["total"]
+        shards.delete()
+        Product.objects.filter(pk=product.pk).update(stock=total, stock_shards=0)
+    bump_catalog_version_on_commit()
+    return total
+
+
+def restock(product, quantity):
+    """Add ``quantity`` to ``product``, spread evenly when it is sharded."""
+    if not product.stock_shards:
+        Product.objects.filter(pk=product.pk).update(stock=F("stock") + quantity)
+        bump_catalog_version_on_commit()
+        return
+    shards = product.stock_shards
+    StockShard.objects.filter(product=product).update(
+        quantity=F("quantity") + Case(
+            When(index__lt=quantity % shards, then=Value(quantity // shards + 1)),
+            default=Value(quantity // shards),
+            output_field=IntegerField(),
+        )
+    )
+
+
+def shelf_stock(product_ids):
+    """Stock on the shelf (not held by carts) per product id: Product.stock, or the shard total when sharded."""
+    rows = Product.objects.filter(pk__in=product_ids).values_list("pk", "stock", "stock_shards")
+    stock = {pk: quantity for pk, quantity, shards in rows}
+    sharded = [pk for pk, quantity, shards in rows if shards]
+    if sharded:
+        stock.update(
+            StockShard.objects.filter(product_id__in=sharded)
+            .values("product").annotate(total=Sum("quantity")).values_list("product", "total")
+        )
+    return stock
+
+
+def adjust_stock(product, quantity):
+    """
+    Add ``quantity`` of ``product`` to the shelf, or take it off when negative.
+
+    Taking is a conditional decrement like any other; raises OutOfStock when
+    the shelf no longer has that much (it was reserved or sold meanwhile).
+    """
+    if quantity > 0:
+        restock(product, quantity)
+    elif quantity < 0:
+        with transaction.atomic():
+            take({product: -quantity})
+
+
+def adjust_stocks(quantities, invalidate=True):
+    """
+    Add ``quantities`` ({product_id: qty}, negative to take off) to unsharded
+    products in one conditional UPDATE, all or nothing.
+
+    Raises OutOfStock with the products whose shelf no longer has that much,
+    or that were sharded meanwhile (use adjust_stock() for sharded products).
+    """
+    if not quantities:
+        return
+    change = Case(*[When(pk=pk, then=Value(qty)) for pk, qty in quantities.items()], output_field=IntegerField())
+    floor = Case(*[When(pk=pk, then=Value(-qty)) for pk, qty in quantities.items()], output_field=IntegerField())
+    with transaction.atomic():
+        updated = (
+            Product.objects.filter(pk__in=quantities, stock_shards=0, stock__gte=floor)
+            .update(stock=F("stock") + change)
+        )
+        if updated != len(quantities):
+            # Undo the rows that did fit, so the short ones can be found below.
+            transaction.set_rollback(True)
+    if updated != len(quantities):
+        raise OutOfStock(Product.objects.filter(Q(stock_shards__gt=0) | Q(stock__lt=floor), pk__in=quantities))
+    if invalidate:
+        bump_catalog_version_on_commit()
+
+
+def reconcile(fold_shards=False, product_ids=None):
+    """
+    Release expired holds and fold the shard totals back into Product.stock.
+
+    With ``fold_shards`` the products are unsharded as well (end of the sale).
+    ``product_ids`` limits the work to those products.
+    Returns ``(released quantity, products reconciled)``.
+    """
+    released = release_expired(product_ids=product_ids)
+    sharded = Product.objects.filter(stock_shards__gt=0)
+    if product_ids is not None:
+        sharded = sharded.filter(pk__in=product_ids)
+    if fold_shards:
+        count = 0
+        for product in sharded.only("pk"):
+            fold(product)
+            count += 1
+        return released, count
+    return released, refresh_totals(sharded)
+
+
+def refresh_totals(products, invalidate=True):
+    """Copy the shard totals of the sharded ``products`` (a queryset) into Product.stock. Returns how many."""
+    totals = (
+        StockShard.objects.filter(product=OuterRef("pk"))
+        .values("product")
+        .annotate(total=Sum("quantity"))
+        .values("total")
+    )
+    count = products.filter(stock_shards__gt=0).update(stock=Coalesce(Subquery(totals), 0))
+    if count and invalidate:
+        bump_catalog_version_on_commit()
+    return count
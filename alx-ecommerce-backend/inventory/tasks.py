@@ -0,0 +1,18 @@
+from celery import shared_task
+
+from config.celery import DB_RETRY
+from . import services
+
+
+@shared_task(**DB_RETRY)
+def reconcile_stock(product_ids):
+    """Checkout follow-up: refresh Product.stock of the sharded products just sold."""
+    released, reconciled = services.reconcile(product_ids=product_ids)
+    return {"released": released, "reconciled": reconciled}
+
+
+@shared_task(**DB_RETRY)
+def reconcile_inventory():
+    """Periodic (CELERY_BEAT_SCHEDULE): release expired holds, reconcile every sharded product."""
+    released, reconciled = services.reconcile()
+    return {"released": released, "reconciled": reconciled}
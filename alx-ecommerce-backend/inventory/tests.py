@@ -0,0 +1,163 @@
+import random
+import threading
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.db import OperationalError, connections
+from django.db.models import Sum
+from django.test import TestCase, TransactionTestCase
+from django.utils import timezone
+
+from carts.models import Cart, CartItem
+from carts.services import add_item, remove_item
+from orders.models import OrderItem
+from orders.services import CheckoutError, place_order
+from products.cache import get_catalog_version
+from products.models import Category, Product
+from .models import StockReservation, StockShard
+from .services import OutOfStock, reconcile, release_expired, shard_stock
+
+
+def make_product(stock):
+    category, _ = Category.objects.get_or_create(name="Flash")
+    return Product.objects.create(name="Console", price=Decimal("299.00"), stock=stock, category=category)
+
+
+class ReservationTests(TestCase):
+    def setUp(self):
+        self.product = make_product(stock=5)
+        self.cart = Cart.objects.create(user=User.objects.create_user("buyer"))
+
+    def stock(self):
+        self.product.refresh_from_db()
+        return self.product.stock
+
+    def test_holds_only_invalidate_the_catalog_when_selling_out(self):
+        version = get_catalog_version()
+        with self.captureOnCommitCallbacks(execute=True):
+            add_item(self.cart, self.product, 2)
+            remove_item(self.cart, self.product.pk)
+        self.assertEqual(get_catalog_version(), version)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            add_item(self.cart, self.product, 5)
+        self.assertNotEqual(get_catalog_version(), version)
+        version = get_catalog_version()
+        with self.captureOnCommitCallbacks(execute=True):
+            remove_item(self.cart, self.product.pk)
+        self.assertNotEqual(get_catalog_version(), version)
+
+    def test_checkout_releases_expired_holds_when_short(self):
+        abandoned = Cart.objects.create(user=User.objects.create_user("abandoned"))
+        add_item(abandoned, self.product, 5)
+        StockReservation.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+        # Added before the other cart took the stock, so it holds nothing itself.
+        CartItem.objects.create(cart=self.cart, product=self.product, quantity=2)
+
+        order = place_order(self.cart)
+        self.assertEqual(order.items_count, 2)
+        self.assertEqual(self.stock(), 3)
+        self.assertFalse(StockReservation.objects.exists())
+
+    def test_cart_holds_stock_until_removed(self):
+        add_item(self.cart, self.product, 3)
+        self.assertEqual(self.stock(), 2)
+        with self.assertRaises(OutOfStock):
+            add_item(self.cart, self.product, 3)
+        remove_item(self.cart, self.product.pk)
+        self.assertEqual(self.stock(), 5)
+        self.assertFalse(StockReservation.objects.exists())
+
+    def test_expired_holds_are_released_for_other_shoppers(self):
+        add_item(self.cart, self.product, 5)
+        StockReservation.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+        other = Cart.objects.create(user=User.objects.create_user("late"))
+        add_item(other, self.product, 4)
+        self.assertEqual(self.stock(), 1)
+        # The first cart's hold is gone, so its checkout takes from the shelf and comes up short.
+        with self.assertRaises(CheckoutError):
+            place_order(self.cart)
+
+    def test_checkout_consumes_holds(self):
+        add_item(self.cart, self.product, 2)
+        place_order(self.cart)
+        self.assertEqual(self.stock(), 3)
+        self.assertFalse(StockReservation.objects.exists())
+
+    def test_sharded_stock_reconciles(self):
+        shard_stock(self.product, shards=4)
+        self.assertEqual(list(StockShard.objects.order_by("index").values_list("quantity", flat=True)), [2, 1, 1, 1])
+        self.product.refresh_from_db()
+        add_item(self.cart, self.product, 4)
+        place_order(self.cart)
+        self.assertEqual(StockShard.objects.aggregate(total=Sum("quantity"))["total"], 1)
+        self.assertEqual(self.stock(), 5)  # display total until reconciled
+        reconcile()
+        self.assertEqual(self.stock(), 1)
+        reconcile(fold_shards=True)
+        self.product.refresh_from_db()
+        self.assertEqual((self.product.stock, self.product.stock_shards), (1, 0))
+        self.assertFalse(StockShard.objects.exists())
+
+
+class CheckoutStressTests(TransactionTestCase):
+    """Many threads racing to buy the same product must sell exactly the stock, never more."""
+
+    STOCK = 30
+    BUYERS = 12
+    ATTEMPTS = 5
+
+    def race(self, sharded):
+        product = make_product(stock=self.STOCK)
+        if sharded:
+            shard_stock(product, shards=8)
+            product.refresh_from_db()
+        carts = [Cart.objects.create(user=User.objects.create_user(f"buyer-{i}")) for i in range(self.BUYERS)]
+        start = threading.Barrier(self.BUYERS)
+
+        deadline = time.monotonic() + 60
+        errors = []
+
+        def retry(step):
+            # SQLite reports write contention as "database is locked"; retry like a client would.
+            while time.monotonic() < deadline:
+                try:
+                    return step()
+                except OperationalError:
+                    time.sleep(random.uniform(0, 0.01))
+            raise AssertionError("lock contention did not clear")
+
+        def buyer(cart):
+            start.wait()
+            try:
+                for _ in range(self.ATTEMPTS):
+                    retry(lambda: add_item(cart, product, 1))
+                    retry(lambda: place_order(cart))
+            except (OutOfStock, CheckoutError):
+                pass  # sold out
+            except Exception as e:
+                errors.append(e)
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=buyer, args=(cart,)) for cart in carts]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+
+        sold = OrderItem.objects.filter(product=product).aggregate(total=Sum("quantity"))["total"]
+        release_expired(now=timezone.now() + timedelta(days=1))
+        reconcile(fold_shards=True)
+        product.refresh_from_db()
+        self.assertEqual(sold, self.STOCK)
+        self.assertEqual(product.stock, 0)
+
+    def test_plain_stock_never_oversells(self):
+        self.race(sharded=False)
+
+    def test_sharded_stock_never_oversells(self):
+        self.race(sharded=True)
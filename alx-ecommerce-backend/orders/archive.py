@@ -0,0 +1,202 @@
+"""
+Hot/cold tiers for orders.
+
+Completed and Cancelled orders placed more than ORDER_ARCHIVE_AFTER_DAYS ago
+are moved, with their items, from the live tables into ArchivedOrder /
+ArchivedOrderItem. They keep their primary keys, so every list, count and
+status filter on the live tables only sees recent orders. Orders move in
+batches, and each batch is one transaction: an interrupted run loses at most
+the batch in flight, and the next run picks up the orders that are left.
+
+Moving an order changes neither its sales nor the DailySales rollup (see
+orders.rollups), so the rows are copied and deleted without model signals.
+
+Reads stay on the live tier unless asked otherwise. tiered_orders() takes the
+``?archived=`` value used by the API and dashboard: "include" reads both
+tiers through TieredOrders, "only" reads just the archive.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import router, transaction
+from django.utils import timezone
+
+from .models import ArchivedOrder, ArchivedOrderItem, Order, OrderItem
+
+ARCHIVABLE_STATUSES = ("Completed", "Cancelled")
+
+# Columns copied between the tiers (the archive only adds archived_at).
+ORDER_COLUMNS = [field.attname for field in Order._meta.concrete_fields]
+ITEM_COLUMNS = [field.attname for field in OrderItem._meta.concrete_fields]
+
+
+def archive_cutoff(days=None):
+    if days is None:
+        days = settings.ORDER_ARCHIVE_AFTER_DAYS
+    return timezone.now() - timedelta(days=days)
+
+
+def archivable_orders(cutoff):
+    """
+    Live orders placed before ``cutoff`` that are finished and counted in the
+    rollup. updated_at is ignored: status and rollup bookkeeping touch old
+    orders too, which must not keep them live forever.
+    """
+    return Order.objects.filter(
+        status__in=ARCHIVABLE_STATUSES,
+        created_at__lt=cutoff,
+        finalized_at__isnull=False,
+    )
+
+
+def _move(ids, source, source_items, target, target_items):
+    using = router.db_for_write(source)
+    orders = list(source.objects.filter(pk__in=ids).values(*ORDER_COLUMNS))
+    items = list(source_items.objects.filter(order_id__in=ids).values(*ITEM_COLUMNS))
+    created = target.objects.bulk_create([target(**row) for row in orders])
+    target_items.objects.bulk_create([target_items(**row) for row in items])
+    if target is Order:
+        # bulk_create stamps auto_now(_add) fields with the current time.
+        target.objects.bulk_update([target(**row) for row in orders], ["created_at", "updated_at"])
+    # One DELETE per table; the collector would load every row and fire the
+    # delete signals, which would take the orders out of the sales rollup.
+    source_items.objects.filter(order_id__in=ids)._raw_delete(using)
+    source.objects.filter(pk__in=ids)._raw_delete(using)
+    return [order.pk for order in created]
+
+
+def archive_batch(cutoff, batch_size=500, after=0):
+    """
+    Move up to ``batch_size`` archivable orders with a primary key above
+    ``after`` into the archive, in one transaction. Returns their ids, in order.
+    """
+    with transaction.atomic():
+        ids = list(
+            archivable_orders(cutoff)
+            .filter(pk__gt=after)
+            .select_for_update()
+            .order_by("pk")
+            .values_list("pk", flat=True)[:batch_size]
+        )
+        if ids:
+            _move(ids, Order, OrderItem, ArchivedOrder, ArchivedOrderItem)
+    return ids
+
+
+def restore_orders(ids, batch_size=500):
+    """Move archived orders (and their items) back to the live tables. Returns how many were restored."""
+    ids = sorted(set(ids))
+    restored = 0
+    for start in range(0, len(ids), batch_size):
+        with transaction.atomic():
+            batch = list(
+                ArchivedOrder.objects.filter(pk__in=ids[start:start + batch_size])
+                .select_for_update()
+                .values_list("pk", flat=True)
+            )
+            if batch:
+                restored += len(_move(batch, ArchivedOrder, ArchivedOrderItem, Order, OrderItem))
+    return restored
+
+
+def tiered_orders(archived=None):
+    """
+    Orders for an ``?archived=`` value: "include" both tiers, "only" the
+    archive, anything else the live table.
+    """
+    if archived == "include":
+        return TieredOrders(Order.objects.all(), ArchivedOrder.objects.all())
+    if archived == "only":
+        return ArchivedOrder.objects.all()
+    return Order.objects.all()
+
+
+class TieredOrders:
+    """
+    Read-only view over the live and archived order querysets.
+
+    Supports what the list views, Paginator and KeysetPagination need:
+    chained filter / exclude / order_by / related loading, count(), get() and
+    slicing. A slice [start:stop] fetches ``stop`` rows from each tier and
+    merges them by the current ordering, so it is meant for ordered,
+    paginated reads. Results are Order and ArchivedOrder instances.
+    """
+
+    def __init__(self, hot, cold):
+        self.hot = hot
+        self.cold = cold
+
+    def _chain(self, method, *args, **kwargs):
+        return TieredOrders(getattr(self.hot, method)(*args, **kwargs), getattr(self.cold, method)(*args, **kwargs))
+
+    def filter(self, *args, **kwargs):
+        return self._chain("filter", *args, **kwargs)
+
+    def exclude(self, *args, **kwargs):
+        return self._chain("exclude", *args, **kwargs)
+
+    def order_by(self, *fields):
+        return self._chain("order_by", *fields)
+
+    def select_related(self, *fields):
+        return self._chain("select_related", *fields)
+
+    def prefetch_related(self, *lookups):
+        return self._chain("prefetch_related", *lookups)
+
+    def using(self, alias):
+        return self._chain("using", alias)
+
+    def all(self):
+        return self._chain("all")
+
+    @property
+    def tiers(self):
+        return self.hot, self.cold
+
+    @property
+    def model(self):
+        return self.hot.model
+
+    @property
+    def query(self):
+        # KeysetPagination reads the ordering from here; both tiers share it.
+        return self.hot.query
+
+    @property
+    def ordered(self):
+        return self.hot.ordered
+
+    def count(self):
+        return self.hot.count() + self.cold.count()
+
+    def exists(self):
+        return self.hot.exists() or self.cold.exists()
+
+    def get(self, *args, **kwargs):
+        try:
+            return self.hot.get(*args, **kwargs)
+        except Order.DoesNotExist:
+            pass
+        try:
+            return self.cold.get(*args, **kwargs)
+        except ArchivedOrder.DoesNotExist:
+            raise Order.DoesNotExist("No order matches the given query.")
+
+    def _merge(self, hot, cold):
+        rows = list(hot) + list(cold)
+        # Stable sorts, least significant field first, handle mixed directions.
+        for field in reversed([field for field in self.hot.query.order_by if isinstance(field, str)]):
+            name = field.lstrip("-")
+            rows.sort(key=lambda row: getattr(row, name), reverse=field.startswith("-"))
+        return rows
+
+    def __getitem__(self, key):
+        if isinstance(key, int):
+            return self[key:key + 1][0]
+        if key.step is not None or (key.start or 0) < 0 or key.stop is None:
+            raise ValueError("TieredOrders only supports forward slices with an end")
+        return self._merge(self.hot[:key.stop], self.cold[:key.stop])[key.start:key.stop]
+
+    def __iter__(self):
+        return iter(self._merge(self.hot, self.cold))
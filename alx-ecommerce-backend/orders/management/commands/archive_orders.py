@@ -0,0 +1,55 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_datetime
+from django.utils.timezone import is_naive, make_aware
+
+from orders.archive import archivable_orders, archive_batch, archive_cutoff
+
+
+class Command(BaseCommand):
+    help = (
+        "Move Completed / Cancelled orders older than ORDER_ARCHIVE_AFTER_DAYS into the archive tables. "
+        "Each batch commits on its own, so an interrupted run can simply be started again."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, help="Archive orders placed more than this many days ago (default: ORDER_ARCHIVE_AFTER_DAYS)")
+        parser.add_argument("--before", help="Fixed cutoff (ISO datetime) instead of --days, e.g. to resume a run with its cutoff")
+        parser.add_argument("--batch-size", type=int, default=500, help="Orders moved per transaction")
+        parser.add_argument("--max-rate", type=float, default=1000, help="Orders moved per second at most, 0 for no limit")
+        parser.add_argument("--limit", type=int, help="Stop after this many orders")
+        parser.add_argument("--dry-run", action="store_true", help="Only count the orders that would move")
+
+    def handle(self, *args, **options):
+        cutoff = archive_cutoff(options["days"])
+        if options["before"]:
+            cutoff = parse_datetime(options["before"])
+            if cutoff is None:
+                raise CommandError("--before must be an ISO datetime")
+            if is_naive(cutoff):
+                cutoff = make_aware(cutoff)
+
+        if options["dry_run"]:
+            count = archivable_orders(cutoff).count()
+            self.stdout.write(f"{count} orders placed before {cutoff.isoformat()} would be archived.")
+            return
+
+        self.stdout.write(f"Archiving orders placed before {cutoff.isoformat()}...")
+        batch_size, max_rate, limit = options["batch_size"], options["max_rate"], options["limit"]
+        moved, last_id, started = 0, 0, time.monotonic()
+        while limit is None or moved < limit:
+            size = batch_size if limit is None else min(batch_size, limit - moved)
+            ids = archive_batch(cutoff, size, after=last_id)
+            if not ids:
+                break
+            moved += len(ids)
+            last_id = ids[-1]
+            self.stdout.write(f"  {moved} orders archived (last id {last_id})")
+            if max_rate:
+                # Spread the writes out so locks and replication lag stay short.
+                delay = moved / max_rate - (time.monotonic() - started)
+                if delay > 0:
+                    time.sleep(delay)
+
+        self.stdout.write(self.style.SUCCESS(f"Archived {moved} orders."))
@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand
+from decimal import Decimal
+
+from django.db.models import OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from orders.models import Order, OrderItem
+from orders.rollups import rebuild
+
+
+class Command(BaseCommand):
+    help = "Backfill the stored Order.total_price and Order.items_count from order items"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000, help="Orders updated per UPDATE statement")
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        self.stdout.write("Backfilling order totals...")
+
+        totals = (
+            OrderItem.objects.filter(order=OuterRef("pk"))
+            .order_by()
+            .values("order")
+            .annotate(**OrderItem.totals_aggregates())
+        )
+
+        updated = 0
+        last_pk = 0
+        while True:
+            pks = list(
+                Order.objects.filter(pk__gt=last_pk).order_by("pk").values_list("pk", flat=True)[:batch_size]
+            )
+            if not pks:
+                break
+            updated += Order.objects.filter(pk__in=pks).update(
+                # Orders without items have no matching group, hence the outer Coalesce.
+                total_price=Coalesce(Subquery(totals.values("total_price")), Decimal("0.00")),
+                items_count=Coalesce(Subquery(totals.values("items_count")), 0),
+            )
+            last_pk = pks[-1]
+
+        # Totals changed behind the rollup's back, so recompute it as well.
+        rebuild()
+        self.stdout.write(self.style.SUCCESS(f"Backfilled totals for {updated} orders."))
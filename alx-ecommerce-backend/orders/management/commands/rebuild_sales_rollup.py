@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+from orders.rollups import rebuild
+
+
+class Command(BaseCommand):
+    help = "Rebuild the DailySales rollup table from all orders"
+
+    def handle(self, *args, **options):
+        self.stdout.write("Rebuilding daily sales rollup...")
+        rows = rebuild()
+        self.stdout.write(self.style.SUCCESS(f"Rollup rebuilt with {rows} rows."))
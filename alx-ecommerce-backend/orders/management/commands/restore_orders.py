@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from orders.archive import restore_orders
+from orders.models import ArchivedOrder
+
+
+class Command(BaseCommand):
+    help = "Move archived orders back into the live order tables"
+
+    def add_arguments(self, parser):
+        parser.add_argument("ids", nargs="*", type=int, help="Archived order ids")
+        parser.add_argument("--user", type=int, help="Restore every archived order of this user id")
+        parser.add_argument("--since", help="With --user: only orders created on or after this date (YYYY-MM-DD)")
+        parser.add_argument("--batch-size", type=int, default=500, help="Orders moved per transaction")
+
+    def handle(self, *args, **options):
+        ids = list(options["ids"])
+        if options["user"] is not None:
+            orders = ArchivedOrder.objects.filter(user_id=options["user"])
+            if options["since"]:
+                since = parse_date(options["since"])
+                if since is None:
+                    raise CommandError("--since must be a date (YYYY-MM-DD)")
+                orders = orders.filter(created_at__date__gte=since)
+            ids += orders.values_list("pk", flat=True)
+        if not ids:
+            raise CommandError("Give archived order ids or --user")
+
+        restored = restore_orders(ids, batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Restored {restored} of {len(set(ids))} orders."))
@@ -0,0 +1,44 @@
+# Generated by Django 5.2.4 on 2026-10-18 05:36
+
+from decimal import Decimal
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+
+
+def build_rollup(apps, schema_editor):
+    Order = apps.get_model('orders', 'Order')
+    DailySales = apps.get_model('orders', 'DailySales')
+    rows = (
+        Order.objects.annotate(date=TruncDate('created_at'))
+        .values('date', 'status')
+        .annotate(revenue=Sum('total_price'), orders_count=Count('id'), units=Sum('items_count'))
+        .order_by()
+    )
+    DailySales.objects.bulk_create([DailySales(**row) for row in rows], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0004_order_total_price_items_count'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailySales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('status', models.CharField(choices=[('Pending', 'Pending'), ('Processing', 'Processing'), ('Completed', 'Completed'), ('Cancelled', 'Cancelled')], max_length=20)),
+                ('revenue', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14)),
+                ('orders_count', models.IntegerField(default=0)),
+                ('units', models.IntegerField(default=0)),
+            ],
+            options={
+                'verbose_name_plural': 'daily sales',
+                'constraints': [models.UniqueConstraint(fields=('date', 'status'), name='unique_daily_sales_date_status')],
+            },
+        ),
+        migrations.RunPython(build_rollup, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.4 on 2026-10-18 06:06
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0006_order_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='finalized_at',
+            field=models.DateTimeField(blank=True, default=django.utils.timezone.now, help_text='When the order was counted in the sales rollup; empty while checkout follow-up work is queued', null=True),
+        ),
+    ]
@@ -1,9 +1,19 @@
-from django.db import models
+from decimal import Decimal
+
+from django.db import models, transaction
+from django.db.models import DecimalField, F, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
 from django.contrib.auth.models import User
 from products.models import Product
 
 
-class Order(models.Model):
+# Order fields that feed the DailySales rollup (only finalized orders are counted).
+ROLLUP_FIELDS = ("created_at", "status", "total_price", "items_count", "finalized_at")
+
+
+class BaseOrder(models.Model):
+    """Fields shared by live orders and their archived copies (see orders.archive)."""
     STATUS_CHOICES = [
         ("Pending", "Pending"),
         ("Processing", "Processing"),
@@ -12,17 +22,21 @@ class Order(models.Model):
     ]
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="Pending")
-    created_at = models.DateTimeField(auto_now_add=True)
-    updated_at = models.DateTimeField(auto_now=True)
 
-    @property
-    def total_price(self):
-        """Return total price for all items in this order."""
-        return sum(item.total_price for item in self.items.all())
+    # Denormalised from the order's items, see Order.recalculate_totals().
+    total_price = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal("0.00"), db_index=True)
+    items_count = models.PositiveIntegerField(default=0, help_text="Total quantity across all items")
+    finalized_at = models.DateTimeField(
+        null=True, blank=True, default=timezone.now,
+        help_text="When the order was counted in the sales rollup; empty while checkout follow-up work is queued",
+    )
+
+    class Meta:
+        abstract = True
 
     @property
     def total_amount(self):
-        return sum(item.price * item.quantity for item in self.items.all())
+        return self.total_price
 
     @property
     def status_color(self):
@@ -35,13 +49,130 @@ class Order(models.Model):
         }.get(self.status, 'secondary')
 
 
-class OrderItem(models.Model):
-    order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name="items")
+class Order(BaseOrder):
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # Dashboard / reports: newest first, optionally since a date.
+            models.Index(fields=["-created_at"], name="order_created_idx"),
+            # orders_list status counters.
+            models.Index(fields=["status", "-created_at"], name="order_status_created_idx"),
+            # A customer's own orders, newest first.
+            models.Index(fields=["user", "-created_at"], name="order_user_created_idx"),
+        ]
+
+    def recalculate_totals(self, save=True):
+        """Recompute the stored totals from the items with a single aggregate query."""
+        if not save:
+            totals = self.items.aggregate(**OrderItem.totals_aggregates())
+            self.total_price = totals["total_price"]
+            self.items_count = totals["items_count"]
+            return self.total_price
+
+        from .rollups import apply_order_change
+
+        with transaction.atomic():
+            previous = (
+                Order.objects.select_for_update()
+                .filter(pk=self.pk)
+                .values(*ROLLUP_FIELDS)
+                .first()
+            )
+            totals = self.items.aggregate(**OrderItem.totals_aggregates())
+            self.total_price = totals["total_price"]
+            self.items_count = totals["items_count"]
+            if previous is None:
+                return self.total_price
+            Order.objects.filter(pk=self.pk).update(
+                total_price=self.total_price, items_count=self.items_count
+            )
+            apply_order_change(previous, {**previous, **totals})
+        return self.total_price
+
+
+class BaseOrderItem(models.Model):
     product = models.ForeignKey(Product, on_delete=models.CASCADE)
     quantity = models.PositiveIntegerField(default=1)
     price = models.DecimalField(max_digits=10, decimal_places=2)
 
+    class Meta:
+        abstract = True
+
     @property
     def total_price(self):
         """Return total price for this item."""
         return self.price * self.quantity
+
+
+class OrderItem(BaseOrderItem):
+    order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name="items")
+
+    @staticmethod
+    def totals_aggregates():
+        """Aggregate expressions for an order's total price and item count."""
+        return {
+            "total_price": Coalesce(
+                Sum(F("price") * F("quantity"), output_field=DecimalField(max_digits=12, decimal_places=2)),
+                Decimal("0.00"),
+                output_field=DecimalField(max_digits=12, decimal_places=2),
+            ),
+            "items_count": Coalesce(Sum("quantity"), 0),
+        }
+
+
+class ArchivedOrder(BaseOrder):
+    """
+    A finished order moved out of the live table by orders.archive.
+
+    Keeps the original primary key, so ids stay unique across both tiers and
+    a restored order comes back under its old id. Read-only apart from
+    archive / restore.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    archived_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["-created_at"], name="archived_order_created_idx"),
+            models.Index(fields=["user", "-created_at"], name="archived_order_user_idx"),
+        ]
+
+
+class ArchivedOrderItem(BaseOrderItem):
+    id = models.BigIntegerField(primary_key=True)
+    order = models.ForeignKey(ArchivedOrder, on_delete=models.CASCADE, related_name="items")
+
+
+class DailySales(models.Model):
+    """Per-day, per-status sales rollup maintained incrementally by orders.rollups."""
+    date = models.DateField()
+    status = models.CharField(max_length=20, choices=Order.STATUS_CHOICES)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal("0.00"))
+    orders_count = models.IntegerField(default=0)
+    units = models.IntegerField(default=0)
+
+    class Meta:
+        verbose_name_plural = "daily sales"
+        constraints = [
+            models.UniqueConstraint(fields=["date", "status"], name="unique_daily_sales_date_status"),
+        ]
+
+    def __str__(self):
+        return f"{self.date} {self.status}: {self.revenue}"
+
+
+class OrderTask(models.Model):
+    """A background task queued for an order, so TaskStatusView only answers the order's owner."""
+    task_id = models.CharField(max_length=255, unique=True)
+    name = models.CharField(max_length=100)
+    # Not a foreign key: the order may move to the archive while the row is kept.
+    order_id = models.BigIntegerField()
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.name} for order {self.order_id}"
@@ -0,0 +1,127 @@
+"""
+Incremental maintenance of the DailySales rollup.
+
+Every finalized order contributes (1 order, total_price revenue, items_count
+units) to the row for its creation day and current status; orders placed at
+checkout are counted once their finalize_order task has run (see
+orders.services.finalize_order). Archived orders stay counted (see
+orders.archive). Writers call apply_order_change()
+with the order's rollup fields before and after the change so only the delta is
+applied; rebuild() recomputes the whole table from the orders.
+"""
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import ROLLUP_FIELDS, ArchivedOrder, DailySales, Order
+
+
+def _bucket(values):
+    return timezone.localdate(values["created_at"]), values["status"]
+
+
+def _apply(date, status, revenue=Decimal("0.00"), orders_count=0, units=0):
+    if not (revenue or orders_count or units):
+        return
+    deltas = {
+        "revenue": F("revenue") + revenue,
+        "orders_count": F("orders_count") + orders_count,
+        "units": F("units") + units,
+    }
+    if DailySales.objects.filter(date=date, status=status).update(**deltas):
+        return
+    try:
+        with transaction.atomic():
+            DailySales.objects.create(
+                date=date, status=status, revenue=revenue, orders_count=orders_count, units=units
+            )
+    except IntegrityError:
+        # Another writer created the row first.
+        DailySales.objects.filter(date=date, status=status).update(**deltas)
+
+
+def apply_order_change(previous, current):
+    """
+    Move an order's contribution from ``previous`` to ``current``.
+
+    Both are dicts of ROLLUP_FIELDS (or None for a created / deleted order);
+    unfinalized values count as None.
+    """
+    if previous is not None and previous["finalized_at"] is None:
+        previous = None
+    if current is not None and current["finalized_at"] is None:
+        current = None
+    if previous is not None and current is not None and _bucket(previous) == _bucket(current):
+        _apply(
+            *_bucket(current),
+            revenue=current["total_price"] - previous["total_price"],
+            units=current["items_count"] - previous["items_count"],
+        )
+        return
+    if previous is not None:
+        _apply(*_bucket(previous), -previous["total_price"], -1, -previous["items_count"])
+    if current is not None:
+        _apply(*_bucket(current), current["total_price"], 1, current["items_count"])
+
+
+def rollup_values(order):
+    return {field: getattr(order, field) for field in ROLLUP_FIELDS}
+
+
+def update_orders_status(queryset, status):
+    """Queryset ``update(status=...)`` that keeps the rollup in sync."""
+    with transaction.atomic():
+        queryset = queryset.select_for_update()
+        moved = list(
+            queryset.exclude(status=status)
+            .filter(finalized_at__isnull=False)
+            .annotate(date=TruncDate("created_at"))
+            .values("date", "status")
+            .annotate(revenue=Sum("total_price"), orders_count=Count("id"), units=Sum("items_count"))
+            .order_by()
+        )
+        updated = queryset.update(status=status)
+        for row in moved:
+            _apply(row["date"], row["status"], -row["revenue"], -row["orders_count"], -row["units"])
+            _apply(row["date"], status, row["revenue"], row["orders_count"], row["units"])
+    return updated
+
+
+def rebuild(batch_size=1000):
+    """Recompute the rollup from scratch with a grouped aggregate over each order tier."""
+    totals = {}
+    for model in (Order, ArchivedOrder):
+        rows = (
+            model.objects.filter(finalized_at__isnull=False)
+            .annotate(date=TruncDate("created_at"))
+            .values("date", "status")
+            .annotate(revenue=Sum("total_price"), orders_count=Count("id"), units=Sum("items_count"))
+            .order_by()
+        )
+        for row in rows:
+            key = row["date"], row["status"]
+            if key in totals:
+                for field in ("revenue", "orders_count", "units"):
+                    totals[key][field] += row[field]
+            else:
+                totals[key] = row
+    with transaction.atomic():
+        DailySales.objects.all().delete()
+        DailySales.objects.bulk_create([DailySales(**row) for row in totals.values()], batch_size=batch_size)
+    return DailySales.objects.count()
+
+
+def sales_summary(start_date=None):
+    """Revenue, order count and units since ``start_date`` (inclusive), answered from the rollup."""
+    rows = DailySales.objects.all()
+    if start_date:
+        rows = rows.filter(date__gte=start_date)
+    summary = rows.aggregate(revenue=Sum("revenue"), orders_count=Sum("orders_count"), units=Sum("units"))
+    return {
+        "revenue": summary["revenue"] or Decimal("0.00"),
+        "orders_count": summary["orders_count"] or 0,
+        "units": summary["units"] or 0,
+    }
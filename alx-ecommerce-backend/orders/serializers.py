@@ -4,30 +4,45 @@ from decimal import Decimal
 from .models import Order, OrderItem
 from carts.models import Cart, CartItem
 from products.serializers import ProductSerializer
+class DynamicFieldsMixin:
+    """Takes an optional ``fields`` kwarg and only serializes those fields (sparse fieldsets)."""
+
+    def __init__(self, *args, **kwargs):
+        fields = kwargs.pop('fields', None)
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+
 class OrderItemSerializer(serializers.ModelSerializer):
     class Meta:
         model = OrderItem
         fields = ['id', 'product', 'quantity', 'price']
 
-class OrderSerializer(serializers.ModelSerializer):
+class OrderSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     items = OrderItemSerializer(many=True)
     total_price = serializers.SerializerMethodField()
+    archived_at = serializers.SerializerMethodField()
 
     class Meta:
         model = Order
-        fields = ['id', 'user', 'status', 'created_at', 'updated_at', 'items', 'total_price']
-        read_only_fields = ['user']
+        fields = ['id', 'user', 'status', 'created_at', 'updated_at', 'items', 'total_price', 'items_count', 'archived_at']
+        read_only_fields = ['user', 'items_count']
 
     def get_total_price(self, obj):
-        total = sum(item.price * item.quantity for item in obj.items.all())
-        return Decimal(total).quantize(Decimal("0.01"))
+        return Decimal(obj.total_price).quantize(Decimal("0.01"))
+
+    def get_archived_at(self, obj):
+        # Also serializes ArchivedOrder rows read with ?archived=; null for live orders.
+        return serializers.DateTimeField().to_representation(getattr(obj, 'archived_at', None))
 
     def create(self, validated_data):
         items_data = validated_data.pop('items', [])
         user = self.context['request'].user
         order = Order.objects.create(user=user, **validated_data)
-        for item_data in items_data:
-            OrderItem.objects.create(order=order, **item_data)
+        OrderItem.objects.bulk_create(OrderItem(order=order, **item_data) for item_data in items_data)
+        order.recalculate_totals()
         return order
 
     def update(self, instance, validated_data):
@@ -38,8 +53,8 @@ class OrderSerializer(serializers.ModelSerializer):
 
         if items_data is not None:
             instance.items.all().delete()
-            for item_data in items_data:
-                OrderItem.objects.create(order=instance, **item_data)
+            OrderItem.objects.bulk_create(OrderItem(order=instance, **item_data) for item_data in items_data)
+            instance.recalculate_totals()
         return instance
 class CartItemSerializer(serializers.ModelSerializer):
     product = ProductSerializer(read_only=True)
@@ -0,0 +1,103 @@
+from collections import Counter
+from decimal import Decimal
+
+from django.db import transaction
+from django.utils import timezone
+
+from inventory.services import OutOfStock, consume
+from .models import ROLLUP_FIELDS, Order, OrderItem, OrderTask
+from .rollups import apply_order_change
+
+
+class CheckoutError(Exception):
+    """Raised when a cart cannot be turned into an order; the message is user-facing."""
+
+
+def place_order(cart):
+    """
+    Turn ``cart`` into a Pending order in a single transaction.
+
+    Stock comes from the cart's reservations, topped up with conditional
+    UPDATEs (see inventory.services), so concurrent checkouts can never
+    oversell. Order items are inserted with one bulk_create. Everything else
+    (sales rollup, stock reconciliation, catalog cache) is queued as Celery
+    tasks sent on commit; their ids are in ``order.followup_tasks``.
+    """
+    with transaction.atomic():
+        items = list(cart.items.select_related("product"))
+        if not items:
+            raise CheckoutError("Cart has no items")
+
+        quantities = Counter()
+        for item in items:
+            quantities[item.product] += item.quantity
+        try:
+            consume(cart, quantities, invalidate=False)
+        except OutOfStock as e:
+            raise CheckoutError(str(e))
+
+        order_items = [
+            OrderItem(product=item.product, quantity=item.quantity, price=item.product.price)
+            for item in items
+        ]
+        order = Order.objects.create(
+            user_id=cart.user_id,
+            status="Pending",
+            total_price=sum((item.total_price for item in order_items), Decimal("0.00")),
+            items_count=sum(item.quantity for item in order_items),
+            finalized_at=None,
+        )
+        for order_item in order_items:
+            order_item.order = order
+        OrderItem.objects.bulk_create(order_items)
+
+        cart.items.all().delete()
+        order.followup_tasks = queue_checkout_followups(order, quantities)
+    return order
+
+
+def queue_checkout_followups(order, products):
+    """
+    Send the bookkeeping a checkout leaves behind once the transaction commits.
+
+    Task ids are assigned up front so they can be returned to the client, and
+    recorded as OrderTask rows so only the order's owner can poll them.
+    """
+    from inventory.tasks import reconcile_stock
+    from products.tasks import invalidate_catalog
+    from .tasks import finalize_order
+
+    signatures = {"finalize_order": finalize_order.si(order.pk)}
+    sharded = [product.pk for product in products if product.stock_shards]
+    if sharded:
+        signatures["reconcile_stock"] = reconcile_stock.si(sharded)
+    if len(sharded) < len(products):
+        # Product.stock changed; reconciling sharded products invalidates by itself.
+        signatures["invalidate_catalog"] = invalidate_catalog.si()
+
+    task_ids = {}
+    for name, signature in signatures.items():
+        task_ids[name] = signature.freeze().id
+        # robust: a broker hiccup must not turn a committed order into an error.
+        transaction.on_commit(signature.apply_async, robust=True)
+    OrderTask.objects.bulk_create(
+        OrderTask(task_id=task_id, name=name, order_id=order.pk, user_id=order.user_id)
+        for name, task_id in task_ids.items()
+    )
+    return task_ids
+
+
+def finalize_order(order_id):
+    """
+    Count a checkout order in the sales rollup and re-derive its totals.
+
+    Idempotent: the order is claimed by setting finalized_at, so a retried or
+    redelivered task finds nothing left to do and returns False.
+    """
+    with transaction.atomic():
+        if not Order.objects.filter(pk=order_id, finalized_at__isnull=True).update(finalized_at=timezone.now()):
+            return False
+        apply_order_change(None, Order.objects.filter(pk=order_id).values(*ROLLUP_FIELDS).get())
+        Order(pk=order_id).recalculate_totals()
+    return True
+
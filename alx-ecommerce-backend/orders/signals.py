@@ -0,0 +1,82 @@
+import threading
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from .models import ROLLUP_FIELDS, ArchivedOrder, Order, OrderItem
+from .rollups import apply_order_change, rollup_values
+
+
+@receiver(post_save, sender=OrderItem)
+def update_order_totals(sender, instance, **kwargs):
+    """Keep Order.total_price / items_count in sync with single item edits."""
+    Order(pk=instance.order_id).recalculate_totals()
+
+
+class PendingTotals:
+    """Orders whose items one delete operation removed, recalculated once it commits."""
+
+    def __init__(self, origin):
+        self.origin = origin
+        self.items = set()
+        self.order_ids = set()
+
+    def drain(self):
+        if getattr(_pending, "totals", None) is self:
+            _pending.totals = None
+        # Orders deleted later in the same transaction are skipped.
+        for pk in Order.objects.filter(pk__in=self.order_ids).order_by("pk").values_list("pk", flat=True):
+            Order(pk=pk).recalculate_totals()
+
+
+_pending = threading.local()
+
+
+@receiver(post_delete, sender=OrderItem)
+def update_order_totals_on_delete(sender, instance, origin=None, **kwargs):
+    """
+    Recalculate the order's totals once the transaction commits.
+
+    Items removed by one delete (a queryset, a cascade) are collected so each
+    order is recalculated once, by a single on_commit callback.
+    """
+    if isinstance(origin, Order) or getattr(origin, "model", None) is Order:
+        # The order itself is being deleted.
+        return
+    pending = getattr(_pending, "totals", None)
+    # Seeing an item twice means the same delete was retried after a rollback.
+    if pending is None or origin is None or pending.origin is not origin or instance.pk in pending.items:
+        pending = _pending.totals = PendingTotals(origin)
+        transaction.on_commit(pending.drain)
+    pending.items.add(instance.pk)
+    pending.order_ids.add(instance.order_id)
+
+
+@receiver(pre_save, sender=Order)
+def remember_order_rollup_values(sender, instance, **kwargs):
+    instance._rollup_previous = None
+    if instance.pk is not None:
+        instance._rollup_previous = Order.objects.filter(pk=instance.pk).values(*ROLLUP_FIELDS).first()
+
+
+@receiver(post_save, sender=Order)
+def update_sales_rollup(sender, instance, **kwargs):
+    apply_order_change(getattr(instance, "_rollup_previous", None), rollup_values(instance))
+
+
+@receiver(pre_delete, sender=Order)
+def remember_deleted_order_rollup_values(sender, instance, **kwargs):
+    # The in-memory instance may be stale (e.g. after a queryset status update).
+    instance._rollup_previous = Order.objects.filter(pk=instance.pk).values(*ROLLUP_FIELDS).first()
+
+
+@receiver(post_delete, sender=Order)
+def remove_from_sales_rollup(sender, instance, **kwargs):
+    apply_order_change(getattr(instance, "_rollup_previous", None), None)
+
+
+@receiver(post_delete, sender=ArchivedOrder)
+def remove_archived_from_sales_rollup(sender, instance, **kwargs):
+    # Archived rows are never edited, so the deleted instance is current.
+    apply_order_change(rollup_values(instance), None)
@@ -0,0 +1,10 @@
+from celery import shared_task
+
+from config.celery import DB_RETRY
+from . import services
+
+
+@shared_task(**DB_RETRY)
+def finalize_order(order_id):
+    """Checkout follow-up: totals and sales rollup, see services.finalize_order."""
+    return {"order_id": order_id, "finalized": services.finalize_order(order_id)}
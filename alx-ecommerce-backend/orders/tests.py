@@ -1,3 +1,292 @@
-from django.test import TestCase
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
 
-# Create your tests here.
+from celery.contrib.testing.worker import start_worker
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from carts.models import Cart
+from carts.services import add_item
+from config.celery import app as celery_app
+from products.models import Category, Product
+from .archive import archive_batch, archive_cutoff, restore_orders
+from .models import ArchivedOrder, ArchivedOrderItem, DailySales, Order, OrderItem
+from .rollups import rebuild, sales_summary
+from .services import finalize_order
+
+
+class CheckoutFollowupMixin:
+    def checkout(self):
+        user = User.objects.create_user("buyer")
+        category = Category.objects.create(name="Audio")
+        product = Product.objects.create(name="Speaker", price=Decimal("40.00"), stock=10, category=category)
+        add_item(Cart.objects.create(user=user), product, 3)
+        client = APIClient()
+        client.force_authenticate(user)
+        response = client.post("/api/checkout/")
+        self.assertEqual(response.status_code, 201)
+        return client, response.json()
+
+
+class CheckoutQueryCountTests(TestCase):
+    def checkout(self, lines):
+        user = User.objects.create_user(f"buyer{lines}")
+        cart = Cart.objects.create(user=user)
+        category = Category.objects.create(name=f"Category {lines}")
+        for i in range(lines):
+            product = Product.objects.create(name=f"Item {i}", price=Decimal("4.00"), stock=10, category=category)
+            add_item(cart, product, 2)
+        client = APIClient()
+        client.force_authenticate(user)
+        return client
+
+    def test_query_count_does_not_grow_with_lines(self):
+        client = self.checkout(1)
+        with CaptureQueriesContext(connection) as single:
+            self.assertEqual(client.post("/api/checkout/").status_code, 201)
+
+        client = self.checkout(10)
+        with self.assertNumQueries(len(single)):
+            response = client.post("/api/checkout/")
+        self.assertEqual(response.json()["items_count"], 20)
+        self.assertEqual(Decimal(str(response.json()["total_price"])), Decimal("80.00"))
+
+
+class EagerCheckoutFollowupTests(CheckoutFollowupMixin, TestCase):
+    def test_followups_run_on_commit_and_are_idempotent(self):
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            client, payload = self.checkout()
+        # Committed but not yet finalized: not counted in the rollup.
+        self.assertIsNone(Order.objects.get(pk=payload["id"]).finalized_at)
+        self.assertFalse(DailySales.objects.exists())
+
+        for callback in callbacks:
+            callback()
+        self.assertEqual(sales_summary(), {"revenue": Decimal("120.00"), "orders_count": 1, "units": 3})
+        self.assertFalse(finalize_order(payload["id"]))
+        self.assertEqual(sales_summary()["orders_count"], 1)
+
+        status = client.get(f"/api/tasks/{payload['tasks']['finalize_order']}/").json()
+        self.assertEqual(status["state"], "SUCCESS")
+        self.assertEqual(status["result"], {"order_id": payload["id"], "finalized": True})
+
+    def test_task_status_is_private(self):
+        client, payload = self.checkout()
+        url = f"/api/tasks/{payload['tasks']['finalize_order']}/"
+        other = APIClient()
+        other.force_authenticate(User.objects.create_user("other"))
+        self.assertEqual(other.get(url).status_code, 404)
+        self.assertEqual(client.get("/api/tasks/not-a-task/").status_code, 404)
+        other.force_authenticate(User.objects.create_user("admin", is_staff=True))
+        self.assertEqual(other.get(url).status_code, 200)
+
+
+class QueuedCheckoutFollowupTests(CheckoutFollowupMixin, TransactionTestCase):
+    """Tasks go through the in-memory broker to a worker thread, no external services."""
+
+    def setUp(self):
+        celery_app.conf.task_always_eager = False
+        self.addCleanup(setattr, celery_app.conf, "task_always_eager", True)
+
+    def test_worker_finalizes_order(self):
+        with start_worker(celery_app, perform_ping_check=False, shutdown_timeout=10):
+            _, payload = self.checkout()
+            result = celery_app.AsyncResult(payload["tasks"]["finalize_order"])
+            self.assertEqual(result.get(timeout=10), {"order_id": payload["id"], "finalized": True})
+        self.assertIsNotNone(Order.objects.get(pk=payload["id"]).finalized_at)
+        self.assertEqual(sales_summary()["revenue"], Decimal("120.00"))
+
+
+class SalesRollupTests(CheckoutFollowupMixin, TestCase):
+    def day(self, status):
+        row = DailySales.objects.filter(date=timezone.localdate(), status=status).first()
+        return (row.orders_count, row.revenue, row.units) if row else (0, Decimal("0.00"), 0)
+
+    def test_order_changes_update_the_day(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            client, payload = self.checkout()
+        order = Order.objects.get(pk=payload["id"])
+        self.assertEqual(self.day(order.status), (1, Decimal("120.00"), 3))
+
+        placed = order.status
+        order.status = "Cancelled"
+        order.save()
+        self.assertEqual(self.day(placed), (0, Decimal("0.00"), 0))
+        self.assertEqual(self.day("Cancelled"), (1, Decimal("120.00"), 3))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            order.items.get().delete()
+        self.assertEqual(self.day("Cancelled"), (1, Decimal("0.00"), 0))
+        Order.objects.get(pk=order.pk).delete()
+        self.assertEqual(self.day("Cancelled"), (0, Decimal("0.00"), 0))
+        self.assertEqual(sales_summary()["orders_count"], 0)
+
+    def test_backfill_is_idempotent(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            client, payload = self.checkout()
+        # Stored totals drifted behind the signals' back.
+        Order.objects.filter(pk=payload["id"]).update(total_price=Decimal("1.00"), items_count=9)
+        DailySales.objects.update(revenue=Decimal("1.00"))
+
+        rollup = []
+        for _ in range(2):
+            call_command("backfill_order_totals", stdout=StringIO())
+            order = Order.objects.get(pk=payload["id"])
+            self.assertEqual((order.total_price, order.items_count), (Decimal("120.00"), 3))
+            rollup.append(list(
+                DailySales.objects.order_by("date", "status").values("date", "status", "revenue", "orders_count", "units")
+            ))
+        self.assertEqual(rollup[0], rollup[1])
+        self.assertEqual(self.day(order.status), (1, Decimal("120.00"), 3))
+
+
+class ArchivalTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("buyer")
+        category = Category.objects.create(name="Audio")
+        self.product = Product.objects.create(name="Speaker", price=Decimal("40.00"), stock=10, category=category)
+        self.old, self.older, self.cancelled, self.pending = (
+            self.create_order(status, days)
+            for status, days in (("Completed", 90), ("Completed", 120), ("Cancelled", 60), ("Pending", 100))
+        )
+        self.recent = self.create_order("Completed", 1)
+        # Bookkeeping touches old orders as well; it must not keep them live.
+        Order.objects.filter(pk=self.older.pk).update(updated_at=timezone.now())
+
+    def create_order(self, status, days_ago):
+        order = Order.objects.create(user=self.user, status=status)
+        OrderItem.objects.create(order=order, product=self.product, quantity=2, price=Decimal("40.00"))
+        then = timezone.now() - timedelta(days=days_ago)
+        Order.objects.filter(pk=order.pk).update(created_at=then, updated_at=then)
+        order.refresh_from_db()
+        return order
+
+    def ids(self, response):
+        self.assertEqual(response.status_code, 200)
+        return [order["id"] for order in response.json()["results"]]
+
+    def test_archive_and_restore_keep_orders_and_sales(self):
+        sales = sales_summary()
+        archived = archive_batch(archive_cutoff(30), batch_size=2)
+        archived += archive_batch(archive_cutoff(30), batch_size=2, after=archived[-1])
+        self.assertEqual(archived, sorted([self.old.pk, self.older.pk, self.cancelled.pk]))
+        self.assertEqual(set(Order.objects.values_list("pk", flat=True)), {self.pending.pk, self.recent.pk})
+        self.assertEqual(ArchivedOrderItem.objects.count(), 3)
+        self.assertEqual(sales_summary(), sales)
+        rebuild()
+        self.assertEqual(sales_summary(), sales)
+        self.assertEqual(archive_batch(archive_cutoff(30)), [])
+
+        self.assertEqual(restore_orders([self.old.pk, 999]), 1)
+        restored = Order.objects.get(pk=self.old.pk)
+        self.assertEqual((restored.created_at, restored.updated_at), (self.old.created_at, self.old.updated_at))
+        self.assertEqual(restored.items.get().quantity, 2)
+        self.assertEqual(sales_summary(), sales)
+
+        ArchivedOrder.objects.filter(pk=self.older.pk).delete()
+        self.assertEqual(sales_summary()["orders_count"], sales["orders_count"] - 1)
+
+    def test_api_reads_requested_tiers(self):
+        call_command("archive_orders", days=30, batch_size=1, max_rate=0, stdout=StringIO())
+        client = APIClient()
+        client.force_authenticate(self.user)
+        newest_first = [self.recent.pk, self.cancelled.pk, self.old.pk, self.pending.pk, self.older.pk]
+
+        self.assertEqual(self.ids(client.get("/api/orders/")), [self.recent.pk, self.pending.pk])
+        self.assertEqual(self.ids(client.get("/api/orders/?archived=only")), [self.cancelled.pk, self.old.pk, self.older.pk])
+
+        # Keyset pages over both tiers, merged by the view's ordering.
+        seen, url = [], "/api/orders/?archived=include&page_size=2"
+        while url:
+            response = client.get(url)
+            seen += self.ids(response)
+            url = response.json()["next"]
+        self.assertEqual(seen, newest_first)
+        ordered = self.ids(client.get("/api/orders/?archived=include&ordering=created_at&page_size=10"))
+        self.assertEqual(ordered, newest_first[::-1])
+
+        self.assertEqual(client.get(f"/api/orders/{self.old.pk}/").status_code, 404)
+        detail = client.get(f"/api/orders/{self.old.pk}/?archived=include").json()
+        self.assertEqual(detail["total_price"], 80.0)
+        self.assertEqual(len(detail["items"]), 1)
+        self.assertIsNotNone(detail["archived_at"])
+
+
+class OrderApiTests(TestCase):
+    def setUp(self):
+        self.alice, self.bob = User.objects.create_user("alice"), User.objects.create_user("bob")
+        product = Product.objects.create(
+            name="Speaker", price=Decimal("40.00"), stock=10, category=Category.objects.create(name="Audio")
+        )
+        self.orders = [Order.objects.create(user=user) for user in (self.alice, self.alice, self.bob)]
+        for order in self.orders:
+            OrderItem.objects.create(order=order, product=product, quantity=1, price=Decimal("40.00"))
+        self.client = APIClient()
+
+    def ids(self, response):
+        self.assertEqual(response.status_code, 200)
+        return sorted(order["id"] for order in response.json()["results"])
+
+    def test_users_only_reach_their_own_orders(self):
+        alices = sorted(order.pk for order in self.orders[:2])
+        self.client.force_authenticate(self.bob)
+        self.assertEqual(self.ids(self.client.get("/api/orders/")), [self.orders[2].pk])
+        self.assertEqual(self.client.get(f"/api/orders/{alices[0]}/").status_code, 404)
+        self.assertEqual(self.client.patch(f"/api/orders/{alices[0]}/", {"status": "Cancelled"}).status_code, 404)
+
+        self.client.force_authenticate(self.alice)
+        self.assertEqual(self.ids(self.client.get("/api/orders/")), alices)
+        self.assertEqual(self.client.get(f"/api/orders/{alices[0]}/").status_code, 200)
+
+        self.client.force_authenticate(User.objects.create_user("staff", is_staff=True))
+        self.assertEqual(self.ids(self.client.get("/api/orders/")), sorted(order.pk for order in self.orders))
+        self.assertEqual(self.client.get(f"/api/orders/{alices[0]}/").status_code, 200)
+
+    def test_sparse_fields_skip_the_items(self):
+        self.client.force_authenticate(self.alice)
+        with self.assertNumQueries(1):
+            response = self.client.get("/api/orders/?fields=id,status")
+        self.assertEqual([set(order) for order in response.json()["results"]], [{"id", "status"}] * 2)
+        with self.assertNumQueries(2):
+            response = self.client.get("/api/orders/")
+        self.assertEqual(len(response.json()["results"][0]["items"]), 1)
+
+
+class OrderTotalsTests(TestCase):
+    def test_item_deletes_recalculate_each_order_once(self):
+        user = User.objects.create_user("buyer")
+        category = Category.objects.create(name="Audio")
+        product = Product.objects.create(name="Speaker", price=Decimal("40.00"), stock=10, category=category)
+        orders = [Order.objects.create(user=user, status="Completed") for _ in range(2)]
+        for order in orders:
+            OrderItem.objects.bulk_create(
+                OrderItem(order=order, product=product, quantity=1, price=Decimal("40.00")) for _ in range(3)
+            )
+            order.recalculate_totals()
+
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            OrderItem.objects.filter(order__in=orders).exclude(pk=orders[0].items.first().pk).delete()
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual(
+            list(Order.objects.order_by("pk").values_list("items_count", "total_price")),
+            [(1, Decimal("40.00")), (0, Decimal("0.00"))],
+        )
+
+        # Orders deleted after their items in the same transaction are skipped.
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            orders[0].items.all().delete()
+            orders[0].delete()
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual(list(Order.objects.values_list("pk", flat=True)), [orders[1].pk])
+
+        # Deleting an order cascades to its items without recalculating it.
+        OrderItem.objects.create(order=orders[1], product=product, quantity=1, price=Decimal("40.00"))
+        with self.captureOnCommitCallbacks() as callbacks:
+            orders[1].delete()
+        self.assertEqual(callbacks, [])
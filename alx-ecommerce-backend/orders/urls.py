@@ -1,6 +1,6 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import OrderViewSet, OrderItemViewSet, CheckoutView
+from .views import OrderViewSet, OrderItemViewSet, CheckoutView, TaskStatusView
 from django.urls import path
 router = DefaultRouter()
 router.register(r'orders', OrderViewSet)
@@ -8,6 +8,7 @@ router.register(r'order-items', OrderItemViewSet)
 
 urlpatterns = [
     path('checkout/', CheckoutView.as_view(), name='checkout'),
+    path('tasks/<str:task_id>/', TaskStatusView.as_view(), name='task-status'),
     path('', include(router.urls)),
     
 ]
@@ -1,20 +1,78 @@
+from celery.result import AsyncResult
 from rest_framework import viewsets, status
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAuthenticated, SAFE_METHODS
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from .models import Order, OrderItem
+from .archive import tiered_orders
+from .models import Order, OrderItem, OrderTask
 from .serializers import OrderSerializer, OrderItemSerializer
+from .services import CheckoutError, place_order
 from carts.models import Cart
+from config.pagination import KeysetPagination
 
 class OrderViewSet(viewsets.ModelViewSet):
+    """
+    Orders of the requesting user (staff see all orders).
+
+    Reads accept ``?fields=id,status,total_price`` for a sparse payload,
+    ``?expand_items=false`` to leave out the nested items and
+    ``?archived=include`` / ``?archived=only`` to read archived orders too /
+    instead (see orders.archive). Writes only reach live orders.
+    """
     queryset = Order.objects.all()
     serializer_class = OrderSerializer
     permission_classes = [IsAuthenticated]
+    ordering_fields = ['created_at', 'total_price']
+    ordering = ['-created_at']
+    pagination_class = KeysetPagination
+
+    def get_queryset(self):
+        if getattr(self, 'swagger_fake_view', False):
+            return Order.objects.none()
+        queryset = Order.objects.all()
+        if self.request.method in SAFE_METHODS:
+            queryset = tiered_orders(self.request.query_params.get('archived'))
+        if not self.request.user.is_staff:
+            queryset = queryset.filter(user=self.request.user)
+        fields = self.get_requested_fields()
+        if fields is None or 'items' in fields:
+            queryset = queryset.prefetch_related('items')
+        return queryset
+
+    def get_requested_fields(self):
+        """Field names to serialize for this read, or None for the full representation."""
+        if self.request.method not in SAFE_METHODS:
+            return None
+        params = self.request.query_params
+        expand_items = params.get('expand_items', 'true').lower() not in ('0', 'false', 'no')
+        if 'fields' not in params and expand_items:
+            return None
+        fields = [name.strip() for name in params.get('fields', '').split(',') if name.strip()]
+        fields = fields or list(OrderSerializer.Meta.fields)
+        if not expand_items:
+            fields = [name for name in fields if name != 'items']
+        return fields
+
+    def get_serializer(self, *args, **kwargs):
+        fields = self.get_requested_fields()
+        if fields is not None:
+            kwargs.setdefault('fields', fields)
+        return super().get_serializer(*args, **kwargs)
 
 class OrderItemViewSet(viewsets.ModelViewSet):
     queryset = OrderItem.objects.all()
     serializer_class = OrderItemSerializer
     permission_classes = [IsAuthenticated]
+    ordering_fields = ['price', 'quantity']
+    ordering = ['id']
+    pagination_class = KeysetPagination
+
+    def get_queryset(self):
+        if getattr(self, 'swagger_fake_view', False):
+            return OrderItem.objects.none()
+        if self.request.user.is_staff:
+            return OrderItem.objects.all()
+        return OrderItem.objects.filter(order__user=self.request.user)
 
 class CheckoutView(APIView):
     permission_classes = [IsAuthenticated]
@@ -27,24 +85,39 @@ class CheckoutView(APIView):
         except Cart.DoesNotExist:
             return Response({"error": "Cart is empty"}, status=status.HTTP_400_BAD_REQUEST)
 
-        if not cart.items.exists():
-            return Response({"error": "Cart has no items"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            order = place_order(cart)
+        except CheckoutError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
-        # Create Order
-        order = Order.objects.create(user=user, status="Pending")
+        serializer = OrderSerializer(order)
+        # Follow-up bookkeeping runs in the background, poll TaskStatusView with these ids.
+        return Response({**serializer.data, "tasks": order.followup_tasks}, status=status.HTTP_201_CREATED)
 
-        # Create OrderItems from CartItems
-        for item in cart.items.all():
-            OrderItem.objects.create(
-                order=order,
-                product=item.product,
-                quantity=item.quantity,
-                price=item.product.price
-            )
 
-        # Clear the cart
-        cart.items.all().delete()
+class TaskStatusView(APIView):
+    """
+    State of a background task (e.g. a checkout follow-up), from the Celery
+    result backend. Only tasks queued for the user's own orders are answered
+    (staff see all); any other id is a 404.
+    """
+    permission_classes = [IsAuthenticated]
+    # Results are written by workers, not this client, so pinning wouldn't help.
+    db_routing = "primary"
 
-        serializer = OrderSerializer(order)
-        return Response(serializer.data, status=status.HTTP_201_CREATED)
+    def get(self, request, task_id):
+        tasks = OrderTask.objects.filter(task_id=task_id)
+        if not request.user.is_staff:
+            tasks = tasks.filter(user=request.user)
+        if not tasks.exists():
+            return Response({"error": "Task not found"}, status=status.HTTP_404_NOT_FOUND)
+        result = AsyncResult(task_id)
+        data = {"id": task_id, "state": result.state, "ready": result.ready()}
+        if result.successful():
+            data["result"] = result.result
+        elif result.failed():
+            data["error"] = repr(result.result)
+        if result.date_done:
+            data["date_done"] = result.date_done
+        return Response(data)
 
@@ -0,0 +1,87 @@
+"""
+Versioned response cache for the catalog API.
+
+Cached list/detail payloads are keyed on a catalog version that is bumped
+whenever a Product or Category changes (see products.signals), so stale entries
+are never read again and simply age out through the cache's own eviction
+(TIMEOUT / MAX_ENTRIES). The cache alias is configured in settings.CACHES; the
+default local-memory backend is per process, so multi-process deployments
+should point it at a shared backend (e.g. Redis or Memcached).
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from rest_framework.response import Response
+
+VERSION_KEY = "catalog:version"
+
+
+def get_cache():
+    return caches[getattr(settings, "CATALOG_CACHE_ALIAS", "catalog")]
+
+
+def get_catalog_version():
+    cache = get_cache()
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        # Seed with a timestamp so a lost/evicted version never revives old entries.
+        cache.add(VERSION_KEY, time.time_ns(), timeout=None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def bump_catalog_version():
+    cache = get_cache()
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.set(VERSION_KEY, time.time_ns(), timeout=None)
+
+
+def bump_catalog_version_on_commit():
+    """
+    Bump now and again once the current transaction commits.
+
+    The second bump stops concurrent readers from keeping pre-commit data
+    cached under the first new version.
+    """
+    bump_catalog_version()
+    transaction.on_commit(bump_catalog_version)
+
+
+def catalog_cache_key(*parts):
+    raw = ":".join(str(part) for part in parts)
+    return f"catalog:{get_catalog_version()}:{hashlib.md5(raw.encode()).hexdigest()}"
+
+
+class CatalogCacheMixin:
+    """Cache ``list`` / ``retrieve`` payloads of a catalog viewset per catalog version."""
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(super().retrieve, request, *args, **kwargs)
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        # Serialized data (not the rendered body) is cached, so every renderer can reuse it.
+        # It holds absolute URLs (images, pagination links), hence the scheme and host.
+        params = sorted(request.query_params.lists())
+        key = catalog_cache_key(
+            request.scheme, request.get_host(), self.basename, self.action, sorted(kwargs.items()), params
+        )
+        cache = get_cache()
+        data = cache.get(key)
+        if data is not None:
+            response = Response(data)
+            response["X-Catalog-Cache"] = "hit"
+            return response
+
+        response = handler(request, *args, **kwargs)
+        if response.status_code == 200:
+            cache.set(key, response.data, timeout=getattr(settings, "CATALOG_CACHE_TIMEOUT", 300))
+        response["X-Catalog-Cache"] = "miss"
+        return response
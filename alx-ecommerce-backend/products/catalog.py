@@ -0,0 +1,268 @@
+"""
+Bulk catalog import / export keyed on Product.sku.
+
+Feeds (CSV with a header row, or JSON Lines) are read as a stream and applied
+in chunks: each chunk is validated, its categories are created on demand, and
+the rows are diffed against the existing products so only new or changed rows
+are written, with one upsert (``bulk_create(update_conflicts=True)``) per chunk,
+or ``bulk_create`` + ``bulk_update`` on databases without ON CONFLICT support.
+Per-row problems are collected in the report instead of aborting the import.
+
+The feed's stock is the quantity on the shelf. It is written as is for new
+products only; for existing ones the difference is applied through
+inventory.services (sharded stock and cart holds stay intact): one conditional
+UPDATE per chunk for unsharded products, one adjustment per sharded product.
+A row whose stock can no longer be lowered that far is reported as an error.
+The catalog cache is invalidated once, at the end of the import.
+"""
+import csv
+import json
+from decimal import Decimal, InvalidOperation
+
+from django.db import connections, transaction
+
+from dashboard.exports import stream_csv, stream_lines
+from inventory.services import OutOfStock, adjust_stock, adjust_stocks, refresh_totals, shelf_stock
+from .cache import bump_catalog_version
+from .models import Category, Product
+
+FIELDS = ["sku", "name", "description", "price", "stock", "category", "brand", "weight", "is_active"]
+# Stock is not overwritten in place, see CatalogImporter.apply().
+UPDATE_FIELDS = ["name", "description", "price", "category_id", "brand", "weight", "is_active"]
+MAX_REPORTED_ERRORS = 1000
+
+
+class ImportReport:
+    def __init__(self):
+        self.created = 0
+        self.updated = 0
+        self.unchanged = 0
+        self.failed = 0
+        self.errors = []
+
+    def error(self, line, message):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"line": line, "error": message})
+
+    def as_dict(self):
+        return {
+            "created": self.created,
+            "updated": self.updated,
+            "unchanged": self.unchanged,
+            "failed": self.failed,
+            "errors": self.errors,
+        }
+
+
+def read_rows(stream, file_format):
+    """Yield ``(line_number, dict)`` from a text stream in ``csv`` or ``jsonl`` format."""
+    if file_format == "csv":
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row
+    elif file_format == "jsonl":
+        for line_number, line in enumerate(stream, start=1):
+            if line.strip():
+                try:
+                    yield line_number, json.loads(line)
+                except ValueError as e:
+                    yield line_number, e
+    else:
+        raise ValueError(f"Unsupported format: {file_format}")
+
+
+def _blank(value):
+    return value is None or (isinstance(value, str) and not value.strip())
+
+
+def parse_row(raw):
+    """Validate one feed row into Product field values (plus ``category`` as a name)."""
+    if isinstance(raw, Exception):
+        raise ValueError(f"invalid JSON: {raw}")
+    if not isinstance(raw, dict):
+        raise ValueError("row must be an object")
+    for field in ("sku", "name", "price", "category"):
+        if _blank(raw.get(field)):
+            raise ValueError(f"{field} is required")
+    try:
+        price = Decimal(str(raw["price"])).quantize(Decimal("0.01"))
+        weight = None if _blank(raw.get("weight")) else Decimal(str(raw["weight"])).quantize(Decimal("0.01"))
+    except InvalidOperation:
+        raise ValueError("price and weight must be numbers")
+    if not 0 <= price < 10 ** 8 or (weight is not None and not 0 <= weight < 10 ** 4):
+        raise ValueError("price or weight out of range")
+    try:
+        stock = 0 if _blank(raw.get("stock")) else int(raw["stock"])
+    except (TypeError, ValueError):
+        raise ValueError("stock must be an integer")
+    if stock < 0:
+        raise ValueError("stock must not be negative")
+    is_active = raw.get("is_active", True)
+    if isinstance(is_active, str):
+        is_active = is_active.strip().lower() not in ("0", "false", "no", "")
+    return {
+        "sku": str(raw["sku"]).strip()[:64],
+        "name": str(raw["name"]).strip()[:200],
+        "description": None if _blank(raw.get("description")) else str(raw["description"]),
+        "price": price,
+        "stock": stock,
+        "category": str(raw["category"]).strip()[:100],
+        "brand": None if _blank(raw.get("brand")) else str(raw["brand"]).strip()[:100],
+        "weight": weight,
+        "is_active": bool(is_active),
+    }
+
+
+class CatalogImporter:
+    def __init__(self, chunk_size=2000, dry_run=False, using="default"):
+        self.chunk_size = chunk_size
+        self.dry_run = dry_run
+        self.using = using
+        self.category_ids = {}
+        self.report = ImportReport()
+
+    def run(self, rows):
+        chunk = {}
+        for line, raw in rows:
+            try:
+                values = parse_row(raw)
+            except ValueError as e:
+                self.report.error(line, str(e))
+                continue
+            if values["sku"] in chunk:
+                self.report.error(chunk[values["sku"]][0], f"duplicate sku {values['sku']}, superseded by line {line}")
+            chunk[values["sku"]] = (line, values)
+            if len(chunk) >= self.chunk_size:
+                self.apply(chunk)
+                chunk = {}
+        if chunk:
+            self.apply(chunk)
+        if not self.dry_run and (self.report.created or self.report.updated):
+            # Bulk writes bypass the model signals that usually invalidate the catalog cache.
+            bump_catalog_version()
+        return self.report
+
+    def resolve_categories(self, names):
+        missing = set(names) - set(self.category_ids)
+        if not missing:
+            return
+        if not self.dry_run:
+            Category.objects.using(self.using).bulk_create(
+                [Category(name=name) for name in missing], ignore_conflicts=True
+            )
+        self.category_ids.update(
+            Category.objects.using(self.using).filter(name__in=missing).values_list("name", "id")
+        )
+
+    def apply(self, chunk):
+        with transaction.atomic(using=self.using):
+            self.resolve_categories(values["category"] for _, values in chunk.values())
+            existing = {
+                product["sku"]: product
+                for product in Product.objects.using(self.using)
+                .filter(sku__in=chunk.keys())
+                .values("id", "sku", "stock_shards", *UPDATE_FIELDS)
+            }
+            shelf = shelf_stock([product["id"] for product in existing.values()])
+            new, updates, deltas, sharded = [], [], {}, []
+            for sku, (line, values) in chunk.items():
+                category_name = values.pop("category")
+                values["category_id"] = self.category_ids.get(category_name)
+                current = existing.get(sku)
+                if current is None:
+                    new.append(Product(**values))
+                    continue
+                delta = values.pop("stock") - shelf[current["id"]]
+                if delta and current["stock_shards"]:
+                    product = Product(pk=current["id"], name=current["name"], stock_shards=current["stock_shards"])
+                    sharded.append((line, product, delta))
+                elif delta:
+                    deltas[current["id"]] = (line, delta)
+                updates.append((line, current, values, delta))
+
+            short = set() if self.dry_run else self.adjust_stock(deltas, sharded)
+            changed = []
+            for line, current, values, delta in updates:
+                if current["id"] in short:
+                    continue
+                if any(current[field] != values[field] for field in UPDATE_FIELDS):
+                    changed.append(Product(id=current["id"], **values))
+                elif delta:
+                    self.report.updated += 1
+                else:
+                    self.report.unchanged += 1
+            if not self.dry_run:
+                self.write(new, changed)
+            self.report.created += len(new)
+            self.report.updated += len(changed)
+
+    def adjust_stock(self, deltas, sharded):
+        """
+        Apply the chunk's stock changes: one conditional UPDATE for the unsharded
+        products, then the sharded ones one by one. Reports the products whose
+        stock can't be lowered that far and returns their ids.
+        """
+        short = {}
+        while deltas:
+            try:
+                adjust_stocks({pk: delta for pk, (line, delta) in deltas.items()}, invalidate=False)
+                break
+            except OutOfStock as e:
+                if not e.products:
+                    raise
+                short.update((product.pk, deltas.pop(product.pk)[0]) for product in e.products)
+        for line, product, delta in sharded:
+            try:
+                adjust_stock(product, delta)
+            except OutOfStock:
+                short[product.pk] = line
+        if sharded:
+            # Refresh the display totals of the sharded products.
+            refresh_totals(Product.objects.filter(pk__in=[product.pk for _, product, _ in sharded]), invalidate=False)
+        for line in sorted(short.values()):
+            self.report.error(line, "stock can't be lowered that far, it is reserved or sold")
+        return set(short)
+
+    def write(self, new, changed):
+        manager = Product.objects.using(self.using)
+        if connections[self.using].features.supports_update_conflicts_with_target:
+            # One INSERT ... ON CONFLICT (sku) DO UPDATE for new and changed rows alike.
+            for product in changed:
+                product.id = None
+            manager.bulk_create(
+                new + changed, update_conflicts=True, unique_fields=["sku"], update_fields=UPDATE_FIELDS
+            )
+        else:
+            manager.bulk_create(new)
+            manager.bulk_update(changed, UPDATE_FIELDS)
+
+
+def import_catalog(stream, file_format, chunk_size=2000, dry_run=False):
+    return CatalogImporter(chunk_size=chunk_size, dry_run=dry_run).run(read_rows(stream, file_format))
+
+
+def export_rows(using=None):
+    return (
+        Product.objects.using(using).order_by("id")
+        .values_list("sku", "name", "description", "price", "stock", "category__name", "brand", "weight", "is_active")
+        .iterator(chunk_size=2000)
+    )
+
+
+def export_catalog(file_format, compress=False, using=None):
+    """Yield the whole catalog as CSV or JSON Lines in the import format, chunk by chunk."""
+    if file_format == "csv":
+        return stream_csv(FIELDS, export_rows(using), compress=compress)
+    if file_format == "jsonl":
+        return stream_lines(_jsonl_lines(export_rows(using)), compress=compress)
+    raise ValueError(f"Unsupported format: {file_format}")
+
+
+def _jsonl_lines(rows):
+    for row in rows:
+        record = dict(zip(FIELDS, row))
+        for field in ("price", "weight"):
+            if record[field] is not None:
+                record[field] = str(record[field])
+        yield json.dumps(record) + "\n"
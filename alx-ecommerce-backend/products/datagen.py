@@ -0,0 +1,189 @@
+"""
+Deterministic, high-volume fake data for load tests and benchmarks.
+
+Everything is drawn from one ``random.Random(seed)`` so a given seed always
+yields the same dataset on an empty database. Rows go in with chunked
+``bulk_create`` calls, one transaction per chunk, bypassing model signals; the
+derived data (order totals, the sales rollup, the catalog cache version) is
+written or rebuilt explicitly instead.
+"""
+import bisect
+import itertools
+import math
+import random
+from contextlib import contextmanager
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.utils import timezone
+
+from carts.models import Cart, CartItem
+from orders.models import Order, OrderItem
+from orders.rollups import rebuild
+from .cache import bump_catalog_version
+from .models import Category, Product
+
+BRANDS = [f"Brand {name}" for name in (
+    "Acme", "Globex", "Initech", "Umbrella", "Hooli", "Stark", "Wayne", "Wonka", "Tyrell", "Cyberdyne",
+    "Soylent", "Aperture", "Vandelay", "Pied Piper", "Oscorp", "Gringotts", "Monarch", "Nakatomi",
+)]
+ADJECTIVES = ["Classic", "Smart", "Portable", "Wireless", "Premium", "Eco", "Compact", "Ultra", "Pro", "Mini"]
+NOUNS = ["Laptop", "Headphones", "T-Shirt", "Novel", "Backpack", "Lamp", "Kettle", "Sneakers", "Watch", "Camera"]
+
+
+class ZipfSampler:
+    """Draws items with probability proportional to 1 / rank**exponent (a few items are very popular)."""
+
+    def __init__(self, items, rng, exponent=1.1):
+        self.items = list(items)
+        rng.shuffle(self.items)
+        self.cum_weights = list(itertools.accumulate(1 / (rank ** exponent) for rank in range(1, len(self.items) + 1)))
+        self.rng = rng
+
+    def sample(self, k=1):
+        total = self.cum_weights[-1]
+        return [
+            self.items[bisect.bisect(self.cum_weights, self.rng.random() * total)]
+            for _ in range(k)
+        ]
+
+
+@contextmanager
+def explicit_created_at(model):
+    """Let bulk_create keep our generated ``created_at`` instead of auto_now_add's now()."""
+    field = model._meta.get_field("created_at")
+    field.auto_now_add = False
+    try:
+        yield
+    finally:
+        field.auto_now_add = True
+
+
+class DatasetGenerator:
+    def __init__(self, seed=42, batch_size=5000, days=365, log=None):
+        self.rng = random.Random(seed)
+        self.batch_size = batch_size
+        self.days = days
+        self.now = timezone.now()
+        self.log = log or (lambda message: None)
+
+    def chunks(self, count):
+        for start in range(0, count, self.batch_size):
+            yield range(start, min(count, start + self.batch_size))
+
+    def generate(self, categories=0, products=0, users=0, carts=0, orders=0):
+        category_rows = self.categories(categories) if categories else list(Category.objects.all())
+        product_ids = self.products(products, category_rows) if products else list(
+            Product.objects.values_list("id", flat=True)
+        )
+        user_ids = self.users(users) if users else list(User.objects.values_list("id", flat=True))
+        if carts:
+            self.carts(carts, user_ids, product_ids)
+        if orders:
+            self.orders(orders, user_ids, product_ids)
+            rebuild()
+        bump_catalog_version()
+
+    def categories(self, count):
+        names = [f"Category {i}" for i in range(count)]
+        Category.objects.bulk_create(
+            (Category(name=name, description=f"Generated {name.lower()}") for name in names),
+            batch_size=self.batch_size, ignore_conflicts=True,
+        )
+        self.log(f"{count} categories")
+        return list(Category.objects.filter(name__in=names))
+
+    def products(self, count, categories):
+        category_sampler = ZipfSampler(categories, self.rng, exponent=0.8)
+        ids = []
+        for chunk in self.chunks(count):
+            rows = []
+            for i in chunk:
+                # Log-normal prices around $30, 10% of the catalogue out of stock.
+                price = Decimal(min(99999, round(math.exp(self.rng.gauss(3.4, 1.0)), 2))).quantize(Decimal("0.01"))
+                rows.append(Product(
+                    name=f"{self.rng.choice(ADJECTIVES)} {self.rng.choice(NOUNS)} {i}",
+                    description=f"{self.rng.choice(ADJECTIVES)} product from the generated catalogue",
+                    price=max(price, Decimal("0.99")),
+                    stock=0 if self.rng.random() < 0.1 else self.rng.randint(1, 500),
+                    category=category_sampler.sample()[0],
+                    brand=self.rng.choice(BRANDS),
+                    weight=Decimal(self.rng.randint(5, 5000)) / 100,
+                ))
+            with transaction.atomic():
+                ids.extend(product.pk for product in Product.objects.bulk_create(rows))
+            self.log(f"{len(ids)}/{count} products")
+        return ids
+
+    def users(self, count):
+        password = make_password("password")  # hashing once keeps this fast; every user can log in
+        usernames = [f"customer{i}" for i in range(count)]
+        for chunk in self.chunks(count):
+            with transaction.atomic():
+                User.objects.bulk_create(
+                    (User(username=usernames[i], email=f"{usernames[i]}@example.com", password=password) for i in chunk),
+                    ignore_conflicts=True,
+                )
+        self.log(f"{count} users")
+        ids = []
+        for chunk in self.chunks(count):
+            ids.extend(User.objects.filter(username__in=usernames[chunk.start:chunk.stop]).values_list("id", flat=True))
+        return ids
+
+    def carts(self, count, user_ids, product_ids):
+        product_sampler = ZipfSampler(product_ids, self.rng)
+        owners = self.rng.sample(user_ids, min(count, len(user_ids)))
+        for chunk in self.chunks(len(owners)):
+            with transaction.atomic():
+                carts = Cart.objects.bulk_create(Cart(user_id=owners[i]) for i in chunk)
+                CartItem.objects.bulk_create(
+                    CartItem(cart=cart, product_id=product_id, quantity=self.rng.randint(1, 3))
+                    for cart in carts
+                    for product_id in set(product_sampler.sample(self.rng.randint(1, 5)))
+                )
+        self.log(f"{len(owners)} carts")
+
+    def order_status(self, days_ago):
+        roll = self.rng.random()
+        if days_ago < 2:
+            return "Pending" if roll < 0.5 else "Processing" if roll < 0.9 else "Cancelled"
+        if days_ago < 14:
+            return "Pending" if roll < 0.05 else "Processing" if roll < 0.35 else "Completed" if roll < 0.9 else "Cancelled"
+        return "Completed" if roll < 0.88 else "Cancelled"
+
+    def orders(self, count, user_ids, product_ids):
+        product_sampler = ZipfSampler(product_ids, self.rng)
+        user_sampler = ZipfSampler(user_ids, self.rng, exponent=0.7)
+        prices = dict(Product.objects.filter(pk__in=product_ids).values_list("id", "price"))
+        done = 0
+        for chunk in self.chunks(count):
+            orders, lines = [], []
+            for _ in chunk:
+                # Skewed towards recent days, like a growing shop.
+                days_ago = self.days * self.rng.random() ** 2
+                order = Order(
+                    user_id=user_sampler.sample()[0],
+                    status=self.order_status(days_ago),
+                    created_at=self.now - timedelta(days=days_ago),
+                )
+                size = 1 + min(9, int(self.rng.expovariate(0.7)))
+                order_lines = []
+                for product_id in set(product_sampler.sample(size)):
+                    quantity = 1 if self.rng.random() < 0.8 else self.rng.randint(2, 3)
+                    order_lines.append((product_id, quantity, prices[product_id]))
+                order.total_price = sum((price * quantity for _, quantity, price in order_lines), Decimal("0.00"))
+                order.items_count = sum(quantity for _, quantity, _ in order_lines)
+                orders.append(order)
+                lines.append(order_lines)
+            with transaction.atomic(), explicit_created_at(Order):
+                Order.objects.bulk_create(orders)
+                OrderItem.objects.bulk_create(
+                    OrderItem(order=order, product_id=product_id, quantity=quantity, price=price)
+                    for order, order_lines in zip(orders, lines)
+                    for product_id, quantity, price in order_lines
+                )
+            done += len(orders)
+            self.log(f"{done}/{count} orders")
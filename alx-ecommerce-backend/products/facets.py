@@ -0,0 +1,89 @@
+"""
+Facet counts for the shop: per category, per brand and a price histogram.
+
+All three come from one GROUP BY over in-stock products. Each facet ignores
+its own filter (picking a category still shows the other categories' counts),
+so the category, brand and "within max price" flags are part of the grouping
+key and the rows are folded per facet in Python. The grouped rows number at
+most categories x brands x price buckets, however many products match.
+
+Results are cached per catalog version (products.cache), which every product,
+category and stock change bumps.
+"""
+from collections import Counter
+
+from django.conf import settings
+from django.db.models import BooleanField, Case, Count, IntegerField, Q, Value, When
+
+from .cache import catalog_cache_key, get_cache
+from .models import Product
+
+# Lower bounds of the histogram buckets; the last one is open-ended.
+PRICE_BUCKETS = (0, 10, 25, 50, 100, 250, 500, 1000)
+
+
+def price_bucket():
+    return Case(
+        *[When(price__gte=bound, then=Value(index)) for index, bound in reversed(list(enumerate(PRICE_BUCKETS)))],
+        default=Value(0),
+        output_field=IntegerField(),
+    )
+
+
+def flag(condition):
+    if condition is None:
+        return Value(True)
+    return Case(When(condition, then=Value(True)), default=Value(False), output_field=BooleanField())
+
+
+def compute_facets(category_id=None, brand=None, max_price=None):
+    rows = (
+        Product.objects.filter(stock__gt=0)
+        .annotate(
+            bucket=price_bucket(),
+            in_category=flag(Q(category_id=category_id) if category_id is not None else None),
+            in_brand=flag(Q(brand=brand) if brand else None),
+            in_price=flag(Q(price__lte=max_price) if max_price is not None else None),
+        )
+        .values("category_id", "category__name", "brand", "bucket", "in_category", "in_brand", "in_price")
+        .annotate(count=Count("pk"))
+        .order_by()
+    )
+    categories, category_names, brands, buckets = Counter(), {}, Counter(), Counter()
+    total = 0
+    for row in rows:
+        count = row["count"]
+        category_names[row["category_id"]] = row["category__name"]
+        if row["in_brand"] and row["in_price"]:
+            categories[row["category_id"]] += count
+        if row["in_category"] and row["in_price"] and row["brand"]:
+            brands[row["brand"]] += count
+        if row["in_category"] and row["in_brand"]:
+            buckets[row["bucket"]] += count
+        if row["in_category"] and row["in_brand"] and row["in_price"]:
+            total += count
+
+    bounds = list(PRICE_BUCKETS) + [None]
+    return {
+        "total": total,
+        "categories": sorted(
+            ({"id": pk, "name": category_names[pk], "count": count} for pk, count in categories.items()),
+            key=lambda facet: facet["name"],
+        ),
+        "brands": [{"name": name, "count": count} for name, count in sorted(brands.items())],
+        "price_histogram": [
+            {"min": bounds[index], "max": bounds[index + 1], "count": buckets[index]}
+            for index in range(len(PRICE_BUCKETS))
+        ],
+    }
+
+
+def product_facets(category_id=None, brand=None, max_price=None):
+    """Facets for in-stock products matching the filters, cached per catalog version."""
+    key = catalog_cache_key("facets", category_id, brand, max_price)
+    cache = get_cache()
+    facets = cache.get(key)
+    if facets is None:
+        facets = compute_facets(category_id, brand, max_price)
+        cache.set(key, facets, timeout=getattr(settings, "CATALOG_CACHE_TIMEOUT", 300))
+    return facets
@@ -0,0 +1,125 @@
+"""
+Pre-sized copies ("derivatives") of product images.
+
+Uploads through the dashboard form or the API queue
+``products.tasks.generate_image_derivatives`` once the save commits (see
+products.signals). The task writes one copy per PRODUCT_IMAGE_SIZES entry, in
+PRODUCT_IMAGE_FORMAT, next to the originals and records them in
+Product.image_derivatives together with the source name, so a replaced image
+is detected as stale. All copies keep the original's aspect ratio and are
+never upscaled, so they can share one ``srcset``. Existing images are
+backfilled with ``manage.py generate_image_derivatives``.
+"""
+import io
+import posixpath
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db.models import Q
+from PIL import Image, ImageOps
+
+from .cache import bump_catalog_version_on_commit
+from .models import Product
+
+DERIVATIVES_DIR = "products/derivatives"
+
+
+def image_sizes():
+    """``{name: max width/height}``, smallest first."""
+    sizes = getattr(settings, "PRODUCT_IMAGE_SIZES", {"thumbnail": 160, "card": 480, "detail": 1200})
+    return dict(sorted(sizes.items(), key=lambda item: item[1]))
+
+
+def image_format():
+    return getattr(settings, "PRODUCT_IMAGE_FORMAT", "WEBP").upper()
+
+
+def is_current(product):
+    """Whether ``product``'s derivatives match its image (none needed without one)."""
+    if not product.image:
+        return not product.image_derivatives
+    derivatives = product.image_derivatives or {}
+    return (
+        derivatives.get("source") == product.image.name
+        and derivatives.get("format") == image_format()
+        and set(derivatives.get("sizes", {})) == set(image_sizes())
+    )
+
+
+def render(original, box):
+    image = original.copy()
+    image.thumbnail((box, box), Image.Resampling.LANCZOS)
+    if image_format() == "JPEG" or image.mode not in ("RGB", "RGBA"):
+        # Keep transparency where the format has it.
+        keep_alpha = image_format() != "JPEG" and image.mode in ("LA", "P", "PA")
+        image = image.convert("RGBA" if keep_alpha else "RGB")
+    buffer = io.BytesIO()
+    image.save(buffer, image_format(), quality=getattr(settings, "PRODUCT_IMAGE_QUALITY", 80))
+    return buffer.getvalue(), image.size
+
+
+def generate_derivatives(product, force=False):
+    """
+    Write ``product``'s derivatives and record them; returns the new
+    ``image_derivatives`` or None if the image changed meanwhile.
+    """
+    if not force and is_current(product):
+        return product.image_derivatives
+    previous = {entry["name"] for entry in (product.image_derivatives or {}).get("sizes", {}).values()}
+    derivatives = {}
+    if product.image:
+        source = product.image.name
+        extension = image_format().lower()
+        stem = posixpath.splitext(posixpath.basename(source))[0]
+        sizes = {}
+        with product.image.open("rb") as file, Image.open(file) as original:
+            original = ImageOps.exif_transpose(original)
+            for name, box in image_sizes().items():
+                content, (width, height) = render(original, box)
+                path = f"{DERIVATIVES_DIR}/{stem}-{name}.{extension}"
+                default_storage.delete(path)
+                sizes[name] = {"name": default_storage.save(path, ContentFile(content)), "width": width, "height": height}
+        derivatives = {"source": source, "format": image_format(), "sizes": sizes}
+
+    # Conditional on the image still being the one rendered; update() skips the save signals.
+    same_image = Q(image=product.image.name) if product.image else Q(image="") | Q(image__isnull=True)
+    if not Product.objects.filter(same_image, pk=product.pk).update(image_derivatives=derivatives):
+        for entry in derivatives.get("sizes", {}).values():
+            default_storage.delete(entry["name"])
+        return None
+    for name in previous - {entry["name"] for entry in derivatives.get("sizes", {}).values()}:
+        default_storage.delete(name)
+    product.image_derivatives = derivatives
+    bump_catalog_version_on_commit()
+    return derivatives
+
+
+def derivative_url(product, name):
+    """URL of the ``name`` derivative, falling back to the original while it is pending."""
+    if not product.image:
+        return ""
+    entry = (product.image_derivatives or {}).get("sizes", {}).get(name)
+    if entry and is_current(product):
+        return default_storage.url(entry["name"])
+    return product.image.url
+
+
+def srcset(product, build_url=str):
+    """``srcset`` value over the derivatives, e.g. ``a.webp 160w, b.webp 480w``."""
+    if not product.image or not is_current(product):
+        return ""
+    candidates = {}
+    for entry in product.image_derivatives["sizes"].values():
+        candidates.setdefault(entry["width"], build_url(default_storage.url(entry["name"])))
+    return ", ".join(f"{url} {width}w" for width, url in sorted(candidates.items()))
+
+
+def image_urls(product, build_url=str):
+    """The API representation: original, each derivative and the srcset."""
+    if not product.image:
+        return None
+    urls = {"original": build_url(product.image.url)}
+    urls.update((name, build_url(derivative_url(product, name))) for name in image_sizes())
+    urls["srcset"] = srcset(product, build_url)
+    return urls
@@ -0,0 +1,24 @@
+import sys
+
+from django.core.management.base import BaseCommand
+from products.catalog import export_catalog
+
+
+class Command(BaseCommand):
+    help = "Stream the product catalog as CSV or JSON Lines in the import format"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--format", choices=["csv", "jsonl"], default="csv")
+        parser.add_argument("--output", help="File to write (default: stdout)")
+        parser.add_argument("--gzip", action="store_true", help="Gzip the output")
+
+    def handle(self, *args, **options):
+        chunks = export_catalog(options["format"], compress=options["gzip"])
+        if options["output"]:
+            with open(options["output"], "wb") as output:
+                for chunk in chunks:
+                    output.write(chunk)
+        else:
+            for chunk in chunks:
+                sys.stdout.buffer.write(chunk)
+            sys.stdout.buffer.flush()
@@ -0,0 +1,57 @@
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.models import Q
+
+from products import images
+from products.models import Product
+from products.tasks import generate_image_derivatives
+
+
+def generate(product_id, force):
+    try:
+        product = Product.objects.filter(pk=product_id).first()
+        return product is not None and images.generate_derivatives(product, force=force) is not None
+    except Exception as e:  # a broken upload must not stop the backfill
+        return e
+    finally:
+        # Each pool thread has its own connection.
+        connection.close()
+
+
+class Command(BaseCommand):
+    help = "Generate missing or stale product image derivatives (products.images)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=4, help="Images rendered in parallel (Pillow releases the GIL)")
+        parser.add_argument("--force", action="store_true", help="Regenerate current derivatives too")
+        parser.add_argument("--queue", action="store_true", help="Queue Celery tasks instead of rendering here")
+
+    def handle(self, *args, **options):
+        force = options["force"]
+        products = Product.objects.filter(~Q(image="") & Q(image__isnull=False) | ~Q(image_derivatives={}))
+        pending = [
+            product.pk
+            for product in products.only("pk", "image", "image_derivatives").iterator(chunk_size=2000)
+            if force or not images.is_current(product)
+        ]
+
+        if options["queue"]:
+            for product_id in pending:
+                generate_image_derivatives.delay(product_id, force=force)
+            self.stdout.write(self.style.SUCCESS(json.dumps({"queued": len(pending)})))
+            return
+
+        generated = skipped = failed = 0
+        with ThreadPoolExecutor(max_workers=max(options["workers"], 1)) as pool:
+            for product_id, result in zip(pending, pool.map(generate, pending, [force] * len(pending))):
+                if isinstance(result, Exception):
+                    failed += 1
+                    self.stderr.write(f"product {product_id}: {result}")
+                elif result:
+                    generated += 1
+                else:
+                    skipped += 1
+        self.stdout.write(self.style.SUCCESS(json.dumps({"generated": generated, "skipped": skipped, "failed": failed})))
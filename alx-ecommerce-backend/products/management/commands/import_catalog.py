@@ -0,0 +1,29 @@
+import json
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from products.catalog import import_catalog
+
+
+class Command(BaseCommand):
+    help = "Upsert products from a CSV or JSON Lines feed keyed on sku"
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Feed file")
+        parser.add_argument("--format", choices=["csv", "jsonl"], help="Feed format (default: from the file extension)")
+        parser.add_argument("--chunk-size", type=int, default=2000, help="Rows validated and written per batch")
+        parser.add_argument("--dry-run", action="store_true", help="Validate and diff without writing")
+
+    def handle(self, *args, **options):
+        path = Path(options["path"])
+        if not path.exists():
+            raise CommandError(f"{path} does not exist")
+        file_format = options["format"] or ("jsonl" if path.suffix in (".jsonl", ".ndjson") else "csv")
+
+        with path.open(newline="", encoding="utf-8") as stream:
+            report = import_catalog(stream, file_format, chunk_size=options["chunk_size"], dry_run=options["dry_run"])
+
+        for error in report.errors:
+            self.stderr.write(f"line {error['line']}: {error['error']}")
+        summary = {key: value for key, value in report.as_dict().items() if key != "errors"}
+        self.stdout.write(self.style.SUCCESS(json.dumps(summary)))
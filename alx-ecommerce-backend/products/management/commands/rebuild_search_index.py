@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from products.search import rebuild_search_index
+
+
+class Command(BaseCommand):
+    help = "Create (if needed) and rebuild the product full-text search index"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--database", default="default", help="Database alias to rebuild")
+
+    def handle(self, *args, **options):
+        self.stdout.write("Rebuilding product search index...")
+        rebuild_search_index(options["database"])
+        self.stdout.write(self.style.SUCCESS("Search index rebuilt."))
@@ -1,12 +1,52 @@
-from django.core.management.base import BaseCommand
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from products.datagen import DatasetGenerator
 from products.models import Category, Product
 
 class Command(BaseCommand):
-    help = "Seed the database with initial categories and products"
+    help = (
+        "Seed the database with initial categories and products, and optionally "
+        "a large reproducible load-test dataset (see --orders etc.)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--categories", type=int, default=0, help="Generated categories")
+        parser.add_argument("--products", type=int, default=0, help="Generated products")
+        parser.add_argument("--users", type=int, default=0, help="Generated customers")
+        parser.add_argument("--carts", type=int, default=0, help="Generated carts (one per customer at most)")
+        parser.add_argument("--orders", type=int, default=0, help="Generated orders")
+        parser.add_argument("--days", type=int, default=365, help="Spread generated orders over this many days")
+        parser.add_argument("--seed", type=int, default=42, help="Random seed; the same seed yields the same data")
+        parser.add_argument("--batch-size", type=int, default=5000, help="Rows per bulk insert / transaction")
 
     def handle(self, *args, **kwargs):
         self.stdout.write("Seeding database...")
+        self.seed_basics()
+
+        sizes = {name: kwargs[name] for name in ("categories", "products", "users", "carts", "orders")}
+        if any(sizes.values()):
+            self.generate(sizes, kwargs)
+
+        self.stdout.write(self.style.SUCCESS("Seeding finished."))
 
+    def generate(self, sizes, options):
+        if (sizes["orders"] or sizes["carts"]) and not (sizes["products"] or Product.objects.exists()):
+            raise CommandError("Generating orders or carts needs products (use --products).")
+        if (sizes["orders"] or sizes["carts"]) and not (sizes["users"] or User.objects.exists()):
+            raise CommandError("Generating orders or carts needs customers (use --users).")
+
+        start = time.monotonic()
+        generator = DatasetGenerator(
+            seed=options["seed"],
+            batch_size=options["batch_size"],
+            days=options["days"],
+            log=lambda message: self.stdout.write(f"  {message} ({time.monotonic() - start:.1f}s)"),
+        )
+        generator.generate(**sizes)
+
+    def seed_basics(self):
         electronics, _ = Category.objects.get_or_create(
             name="Electronics",
             defaults={"description": "Electronic devices and accessories"}
@@ -61,5 +101,3 @@ class Command(BaseCommand):
                 "category": books
             }
         )
-
-        self.stdout.write(self.style.SUCCESS("Seeding finished."))
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-18 05:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0003_product_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='sku',
+            field=models.CharField(blank=True, help_text='Stock keeping unit, the key used by catalog imports', max_length=64, null=True, unique=True),
+        ),
+    ]
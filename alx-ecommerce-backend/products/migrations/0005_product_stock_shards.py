@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-18 05:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0004_product_sku'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='stock_shards',
+            field=models.PositiveSmallIntegerField(default=0, help_text='Number of inventory shards holding the stock, 0 when it lives in this row'),
+        ),
+    ]
@@ -9,10 +9,14 @@ class Category(models.Model):
 
 
 class Product(models.Model):
+    sku = models.CharField(max_length=64, unique=True, blank=True, null=True, help_text="Stock keeping unit, the key used by catalog imports")
     name = models.CharField(max_length=200)
     description = models.TextField(blank=True, null=True)
     price = models.DecimalField(max_digits=10, decimal_places=2)
     stock = models.IntegerField(default=0)
+    stock_shards = models.PositiveSmallIntegerField(
+        default=0, help_text="Number of inventory shards holding the stock, 0 when it lives in this row"
+    )
     category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name="products")
 
     
@@ -20,6 +24,19 @@ class Product(models.Model):
     weight = models.DecimalField(max_digits=6, decimal_places=2, blank=True, null=True, help_text="Weight in KG")
     is_active = models.BooleanField(default=True)
     image = models.ImageField(upload_to="products/", blank=True, null=True)
+    image_derivatives = models.JSONField(
+        default=dict, blank=True, editable=False, help_text="Pre-sized copies of image, see products.images"
+    )
+
+    class Meta:
+        indexes = [
+            # shop_view: in-stock products, optionally by category, sorted by price or name.
+            models.Index(fields=["category", "price"], condition=models.Q(stock__gt=0), name="product_instock_cat_price_idx"),
+            models.Index(fields=["price"], condition=models.Q(stock__gt=0), name="product_instock_price_idx"),
+            models.Index(fields=["name"], condition=models.Q(stock__gt=0), name="product_instock_name_idx"),
+            # products_list stock level counters.
+            models.Index(fields=["stock"], name="product_stock_idx"),
+        ]
 
     def __str__(self):
         return f"{self.name} ({self.brand})" if self.brand else self.name
@@ -0,0 +1,133 @@
+"""
+Indexed full-text search over product name and description.
+
+SQLite uses an external-content FTS5 table kept in sync by triggers; PostgreSQL
+uses a GIN expression index on the tsvector. Both are maintained by the
+database itself, so bulk writes and queryset updates stay indexed too.
+install_search_index() is idempotent and runs after every migrate (a table
+rebuild on SQLite drops the triggers); the rebuild_search_index command
+repopulates the index from scratch.
+"""
+import re
+
+from django.db import connections
+from django.db.models import BooleanField, FloatField, Q
+from django.db.models.expressions import RawSQL
+from rest_framework.filters import SearchFilter
+from rest_framework.settings import api_settings
+
+from .models import Product
+
+TABLE = Product._meta.db_table
+FTS_TABLE = f"{TABLE}_fts"
+PG_INDEX = f"{TABLE}_search_idx"
+PG_VECTOR = "to_tsvector('english', coalesce(name, '') || ' ' || coalesce(description, ''))"
+
+SQLITE_SCHEMA = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        name, description, content='{TABLE}', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON {TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, name, description) VALUES (new.id, new.name, new.description);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON {TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, description)
+        VALUES ('delete', old.id, old.name, old.description);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF name, description ON {TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, description)
+        VALUES ('delete', old.id, old.name, old.description);
+        INSERT INTO {FTS_TABLE}(rowid, name, description) VALUES (new.id, new.name, new.description);
+    END""",
+]
+
+
+def install_search_index(using="default"):
+    """Create the search structures if missing; returns True if they had to be (re)built."""
+    connection = connections[using]
+    with connection.cursor() as cursor:
+        if connection.vendor == "sqlite":
+            cursor.execute(
+                "SELECT count(*) FROM sqlite_master WHERE type = 'trigger' AND name LIKE %s",
+                [f"{FTS_TABLE}_a%"],
+            )
+            if cursor.fetchone()[0] == 3:
+                return False
+            for statement in SQLITE_SCHEMA:
+                cursor.execute(statement)
+            cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+            return True
+        if connection.vendor == "postgresql":
+            cursor.execute("SELECT to_regclass(%s)", [PG_INDEX])
+            if cursor.fetchone()[0]:
+                return False
+            cursor.execute(f"CREATE INDEX IF NOT EXISTS {PG_INDEX} ON {TABLE} USING GIN ({PG_VECTOR})")
+            return True
+    return False
+
+
+def rebuild_search_index(using="default"):
+    connection = connections[using]
+    if install_search_index(using):
+        return
+    with connection.cursor() as cursor:
+        if connection.vendor == "sqlite":
+            cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+        elif connection.vendor == "postgresql":
+            cursor.execute(f"REINDEX INDEX {PG_INDEX}")
+
+
+def search_products(queryset, text, order_by_rank=True):
+    """
+    Filter ``queryset`` to products matching every word of ``text`` (each as a prefix).
+
+    Matches are annotated with ``search_rank`` (higher is better).
+    """
+    terms = re.findall(r"\w+", text or "")
+    if not terms:
+        return queryset
+
+    vendor = connections[queryset.db].vendor
+    if vendor == "sqlite":
+        match = " AND ".join(f'"{term}"*' for term in terms)
+        queryset = queryset.filter(
+            id__in=RawSQL(f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s", [match])
+        ).annotate(
+            # FTS5's rank is bm25, where lower is better.
+            search_rank=RawSQL(
+                f"SELECT -rank FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s AND rowid = {TABLE}.id",
+                [match],
+                output_field=FloatField(),
+            )
+        )
+    elif vendor == "postgresql":
+        tsquery = " & ".join(f"{term}:*" for term in terms)
+        queryset = queryset.filter(
+            RawSQL(f"{PG_VECTOR} @@ to_tsquery('english', %s)", [tsquery], output_field=BooleanField())
+        ).annotate(
+            search_rank=RawSQL(
+                f"ts_rank({PG_VECTOR}, to_tsquery('english', %s))", [tsquery], output_field=FloatField()
+            )
+        )
+    else:
+        for term in terms:
+            queryset = queryset.filter(Q(name__icontains=term) | Q(description__icontains=term))
+        return queryset
+
+    if order_by_rank:
+        queryset = queryset.order_by("-search_rank", "pk")
+    return queryset
+
+
+class FullTextSearchFilter(SearchFilter):
+    """
+    SearchFilter (same ``search`` param and schema) backed by the full-text index.
+
+    Results are ranked by relevance unless the client asks for an explicit ordering.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        text = request.query_params.get(self.search_param, "")
+        ordered = bool(request.query_params.get(api_settings.ORDERING_PARAM))
+        return search_products(queryset, text, order_by_rank=not ordered)
@@ -1,4 +1,5 @@
 from rest_framework import serializers
+from .images import image_urls
 from .models import Category, Product
 
 class CategorySerializer(serializers.ModelSerializer):
@@ -8,6 +9,16 @@ class CategorySerializer(serializers.ModelSerializer):
 
 
 class ProductSerializer(serializers.ModelSerializer):
+    images = serializers.SerializerMethodField()
+
     class Meta:
         model = Product
-        fields = '__all__'
+        exclude = ['image_derivatives']
+        # Stock only changes through inventory.services (the ``stock`` action);
+        # a plain write would overwrite concurrent holds and sales.
+        read_only_fields = ['sku', 'stock', 'stock_shards']
+
+    def get_images(self, obj):
+        """Original and pre-sized image URLs plus a ``srcset`` (originals until they are generated)."""
+        request = self.context.get("request")
+        return image_urls(obj, request.build_absolute_uri if request else str)
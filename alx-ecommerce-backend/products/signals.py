@@ -0,0 +1,24 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .cache import bump_catalog_version_on_commit
+from .images import is_current
+from .models import Category, Product
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_catalog_cache(sender, **kwargs):
+    bump_catalog_version_on_commit()
+
+
+@receiver(post_save, sender=Product)
+def queue_image_derivatives(sender, instance, **kwargs):
+    # New or replaced (or removed) image: render the derivatives off the request path.
+    if not is_current(instance):
+        from .tasks import generate_image_derivatives
+
+        transaction.on_commit(lambda: generate_image_derivatives.delay(instance.pk), robust=True)
@@ -0,0 +1,22 @@
+from celery import shared_task
+
+from config.celery import DB_RETRY
+from . import images
+from .cache import bump_catalog_version
+from .models import Product
+
+
+@shared_task
+def invalidate_catalog():
+    """Drop cached catalog responses, e.g. after checkout changed stock."""
+    bump_catalog_version()
+
+
+@shared_task(**DB_RETRY)
+def generate_image_derivatives(product_id, force=False):
+    """Pre-size a product's image (routed to the "images" queue), see products.images."""
+    product = Product.objects.filter(pk=product_id).first()
+    if product is None:
+        return {"product_id": product_id, "generated": False}
+    generated = images.generate_derivatives(product, force=force)
+    return {"product_id": product_id, "generated": bool(generated)}
@@ -1,3 +1,347 @@
-from django.test import TestCase
+import io
+import shutil
+import tempfile
+from unittest import mock
+from decimal import Decimal
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from PIL import Image
+from rest_framework.test import APIClient
+
+from carts.models import Cart
+from inventory.models import StockReservation, StockShard
+from inventory.services import reserve, shard_stock
+from . import images
+from .cache import get_cache, get_catalog_version
+from .catalog import export_catalog, import_catalog
+from .facets import product_facets
+from .models import Category, Product
+from .search import FTS_TABLE, PG_INDEX, search_products
+
+
+FEED = """sku,name,description,price,stock,category,brand,weight,is_active
+A-1,Kettle,,19.99,5,Kitchen,Acme,1.20,true
+A-2,Toaster,,29.50,0,Kitchen,,,false
+A-3,Broken,,not-a-price,1,Kitchen,,,true
+"""
+
+
+class CatalogImportTests(TestCase):
+    def test_import_creates_then_diffs(self):
+        report = import_catalog(io.StringIO(FEED), "csv", chunk_size=2)
+        self.assertEqual((report.created, report.updated, report.failed), (2, 0, 1))
+        self.assertEqual(report.errors[0]["line"], 4)
+        self.assertEqual(Category.objects.filter(name="Kitchen").count(), 1)
+        self.assertFalse(Product.objects.get(sku="A-2").is_active)
+
+        changed = FEED.replace("19.99", "17.00")
+        report = import_catalog(io.StringIO(changed), "csv")
+        self.assertEqual((report.created, report.updated, report.unchanged), (0, 1, 1))
+        self.assertEqual(Product.objects.get(sku="A-1").price, Decimal("17.00"))
+
+    def test_stock_goes_through_inventory(self):
+        import_catalog(io.StringIO(FEED), "csv")
+        kettle = Product.objects.get(sku="A-1")
+        reserve(Cart.objects.create(user=User.objects.create_user("buyer")), kettle, 2)
+
+        # The feed's stock is the shelf: the cart keeps its hold.
+        report = import_catalog(io.StringIO(FEED.replace(",19.99,5,", ",19.99,8,")), "csv")
+        self.assertEqual((report.updated, report.unchanged), (1, 1))
+        kettle.refresh_from_db()
+        self.assertEqual(kettle.stock, 8)
+        self.assertEqual(StockReservation.objects.get().quantity, 2)
+
+        shard_stock(kettle, shards=4)
+        report = import_catalog(io.StringIO(FEED.replace(",19.99,5,", ",19.99,3,")), "csv")
+        self.assertEqual(report.updated, 1)
+        kettle.refresh_from_db()
+        self.assertEqual((kettle.stock, kettle.stock_shards), (3, 4))
+        self.assertEqual(sum(StockShard.objects.values_list("quantity", flat=True)), 3)
+
+        report = import_catalog(io.StringIO(FEED.replace(",19.99,5,", ",19.99,-1,")), "csv")
+        self.assertEqual(report.errors[0], {"line": 2, "error": "stock must not be negative"})
+
+    def test_stock_changes_are_batched(self):
+        def feed(count, stock):
+            rows = "".join(f"B-{i},Item {i},,5.00,{stock},Bulk,,,true\n" for i in range(count))
+            return io.StringIO("sku,name,description,price,stock,category,brand,weight,is_active\n" + rows)
+
+        import_catalog(feed(10, 5), "csv")
+        queries = []
+        for count in (2, 10):
+            version = get_catalog_version()
+            with CaptureQueriesContext(connection) as captured:
+                report = import_catalog(feed(count, 7 + count), "csv")
+            self.assertEqual(report.updated, count)
+            self.assertEqual(get_catalog_version(), version + 1)
+            queries.append(len(captured))
+        self.assertEqual(queries[0], queries[1])
+
+        # All three are at 17; B-1 sells 10 between the shelf read and the write.
+        held = Product.objects.get(sku="B-1")
+        reserve(Cart.objects.create(user=User.objects.create_user("buyer")), held, 10)
+        with mock.patch("products.catalog.shelf_stock", lambda ids: {pk: 17 for pk in ids}):
+            report = import_catalog(io.StringIO(feed(3, 3).getvalue().replace("5.00", "6.00")), "csv")
+        self.assertEqual((report.updated, report.failed), (2, 1))
+        self.assertEqual(report.errors, [{"line": 3, "error": "stock can't be lowered that far, it is reserved or sold"}])
+        held.refresh_from_db()
+        self.assertEqual((held.stock, held.price), (7, Decimal("5.00")))
+        self.assertEqual(list(Product.objects.filter(sku__in=["B-0", "B-2"]).values_list("stock", flat=True)), [3, 3])
+
+    def test_export_round_trips(self):
+        import_catalog(io.StringIO(FEED), "csv")
+        for file_format in ("csv", "jsonl"):
+            exported = b"".join(export_catalog(file_format)).decode()
+            report = import_catalog(io.StringIO(exported), file_format)
+            self.assertEqual((report.created, report.updated, report.unchanged), (0, 0, 2))
+
+
+class CatalogCacheTests(TestCase):
+    @override_settings(ALLOWED_HOSTS=["testserver", "shop.example"])
+    def test_responses_are_cached_per_host_and_scheme(self):
+        get_cache().clear()
+        category = Category.objects.create(name="Audio")
+        Product.objects.create(name="Speaker", price=Decimal("40.00"), stock=1, category=category)
+        client = APIClient()
+        self.assertEqual(client.get("/api/products/")["X-Catalog-Cache"], "miss")
+        self.assertEqual(client.get("/api/products/")["X-Catalog-Cache"], "hit")
+        self.assertEqual(client.get("/api/products/", secure=True)["X-Catalog-Cache"], "miss")
+        self.assertEqual(client.get("/api/products/", HTTP_HOST="shop.example")["X-Catalog-Cache"], "miss")
+
+
+class ProductStockApiTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user("staff", is_staff=True))
+        self.product = Product.objects.create(
+            name="Lamp", sku="L-1", price=Decimal("25.00"), stock=5, category=Category.objects.create(name="Home")
+        )
+        self.url = f"/api/products/{self.product.pk}/stock/"
+
+    def test_stock_is_read_only_on_the_product(self):
+        response = self.client.patch(
+            f"/api/products/{self.product.pk}/", {"stock": 50, "stock_shards": 4, "sku": "X", "price": "20.00"}, format="json"
+        )
+        self.assertEqual(response.status_code, 200)
+        self.product.refresh_from_db()
+        self.assertEqual((self.product.stock, self.product.stock_shards, self.product.sku), (5, 0, "L-1"))
+        self.assertEqual(self.product.price, Decimal("20.00"))
+
+    def test_stock_action_goes_through_inventory(self):
+        reserve(Cart.objects.create(user=User.objects.create_user("buyer")), self.product, 2)
+
+        response = self.client.post(self.url, {"quantity": 4}, format="json")
+        self.assertEqual(response.json(), {"stock": 7, "stock_shards": 0})
+        response = self.client.post(self.url, {"quantity": -8}, format="json")
+        self.assertEqual(response.status_code, 409)
+
+        response = self.client.post(self.url, {"quantity": -1, "shards": 3}, format="json")
+        self.assertEqual(response.json(), {"stock": 6, "stock_shards": 3})
+        response = self.client.post(self.url, {"shards": 0}, format="json")
+        self.assertEqual(response.json(), {"stock": 6, "stock_shards": 0})
+        self.assertEqual(StockReservation.objects.get().quantity, 2)
+
+        self.assertEqual(self.client.post(self.url, {"quantity": "some"}, format="json").status_code, 400)
+        self.client.force_authenticate(User.objects.get(username="buyer"))
+        self.assertEqual(self.client.post(self.url, {"quantity": 1}, format="json").status_code, 403)
+
+
+class KeysetPaginationTests(TestCase):
+    def setUp(self):
+        get_cache().clear()
+        category = Category.objects.create(name="Stationery")
+        prices = ["5.00"] * 10 + ["2.00", "9.00", "5.50"]
+        self.products = [
+            Product.objects.create(name=f"Pen {i}", price=Decimal(price), stock=1, category=category)
+            for i, price in enumerate(prices)
+        ]
+
+    def walk(self, url, link="next"):
+        names = []
+        while url:
+            body = self.client.get(url).json()
+            names += [product["name"] for product in body["results"]]
+            url = body[link]
+        return names
+
+    def test_tied_values_have_no_duplicates_or_gaps(self):
+        expected = [p.name for p in sorted(self.products, key=lambda p: (p.price, p.pk))]
+        self.assertEqual(self.walk("/api/products/?ordering=price&page_size=3"), expected)
+        expected = [p.name for p in sorted(self.products, key=lambda p: (-p.price, -p.pk))]
+        self.assertEqual(self.walk("/api/products/?ordering=-price&page_size=3"), expected)
+
+        # Walking back from the last page gives the same rows in reverse.
+        url = "/api/products/?ordering=price&page_size=3"
+        while True:
+            body = self.client.get(url).json()
+            if not body["next"]:
+                break
+            url = body["next"]
+        backwards = [p["name"] for p in body["results"]] + self.walk(body["previous"], "previous")[::-1]
+        self.assertEqual(sorted(backwards), sorted(p.name for p in self.products))
+
+    def test_deep_pages_are_stable_and_offset_free(self):
+        first = self.client.get("/api/products/?ordering=price&page_size=3").json()
+        second_url = first["next"]
+        # Rows added before the cursor don't shift the following pages.
+        Product.objects.create(name="Pen new", price=Decimal("1.00"), stock=1, category=self.products[0].category)
+        get_cache().clear()
+        rest = self.walk(second_url)
+        self.assertNotIn("Pen new", rest)
+        self.assertEqual(len(first["results"]) + len(rest), len(self.products))
+
+        get_cache().clear()
+        with CaptureQueriesContext(connection) as captured:
+            self.client.get(second_url)
+        self.assertNotIn("OFFSET", captured[-1]["sql"])
+
+        self.assertEqual(self.client.get("/api/products/?cursor=bad").status_code, 404)
+
+
+class SearchTests(TestCase):
+    def setUp(self):
+        get_cache().clear()
+        category = Category.objects.create(name="Computers")
+        self.laptop = Product.objects.create(
+            name="Laptop", description="Light laptop, laptop bag included", price=Decimal("900.00"), stock=1, category=category
+        )
+        self.sleeve = Product.objects.create(
+            name="Sleeve", description="Padded sleeve that fits a 13 inch laptop and most tablets", price=Decimal("20.00"), stock=1, category=category
+        )
+        self.mouse = Product.objects.create(name="Mouse", price=Decimal("15.00"), stock=1, category=category)
+
+    def search(self, text):
+        return list(search_products(Product.objects.all(), text).values_list("name", flat=True))
+
+    def test_prefix_search_ordered_by_rank(self):
+        self.assertEqual(self.search("lap"), ["Laptop", "Sleeve"])
+        self.assertEqual(self.search("laptop padded"), ["Sleeve"])
+        self.assertEqual(self.search("keyboard"), [])
+
+        response = self.client.get("/api/products/", {"search": "lap", "page_size": 1})
+        body = response.json()
+        self.assertEqual([p["name"] for p in body["results"]], ["Laptop"])
+        self.assertEqual([p["name"] for p in self.client.get(body["next"]).json()["results"]], ["Sleeve"])
+
+    def test_index_follows_inserts_updates_and_deletes(self):
+        keyboard = Product.objects.create(name="Keyboard", price=Decimal("40.00"), stock=1, category=self.mouse.category)
+        self.assertEqual(self.search("key"), ["Keyboard"])
+
+        keyboard.name = "Trackpad"
+        keyboard.save()
+        self.assertEqual(self.search("key"), [])
+        self.assertEqual(self.search("track"), ["Trackpad"])
+        Product.objects.filter(pk=self.mouse.pk).update(description="Wireless trackball")
+        self.assertEqual(self.search("track"), ["Trackpad", "Mouse"])
+
+        keyboard.delete()
+        Product.objects.filter(pk=self.mouse.pk).delete()
+        self.assertEqual(self.search("track"), [])
+
+    def test_rebuild_repopulates_an_emptied_index(self):
+        with connection.cursor() as cursor:
+            if connection.vendor == "postgresql":
+                # The GIN index is optional to the query, dropping it is the closest thing.
+                cursor.execute(f"DROP INDEX {PG_INDEX}")
+            else:
+                cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('delete-all')")
+                self.assertEqual(self.search("lap"), [])
+        call_command("rebuild_search_index", stdout=io.StringIO())
+        self.assertEqual(self.search("lap"), ["Laptop", "Sleeve"])
+
+
+class FacetTests(TestCase):
+    def setUp(self):
+        get_cache().clear()
+        books, games = Category.objects.create(name="Books"), Category.objects.create(name="Games")
+        self.books, self.games = books, games
+        for name, category, brand, price, stock in [
+            ("Novel", books, "Acme", "8.00", 3),
+            ("Atlas", books, "Acme", "30.00", 1),
+            ("Diary", books, "Other", "60.00", 2),
+            ("Chess", games, "Acme", "15.00", 4),
+            ("Sold out", games, "Acme", "15.00", 0),
+        ]:
+            Product.objects.create(name=name, category=category, brand=brand, price=Decimal(price), stock=stock)
+
+    def test_each_facet_ignores_its_own_filter(self):
+        with self.assertNumQueries(1):
+            facets = product_facets(category_id=self.books.pk, max_price=Decimal("40"))
+        self.assertEqual(facets["total"], 2)
+        self.assertEqual([(c["name"], c["count"]) for c in facets["categories"]], [("Books", 2), ("Games", 1)])
+        self.assertEqual(facets["brands"], [{"name": "Acme", "count": 2}])
+        self.assertEqual([b["count"] for b in facets["price_histogram"]], [1, 0, 1, 1, 0, 0, 0, 0])
+
+        with self.assertNumQueries(0):
+            product_facets(category_id=self.books.pk, max_price=Decimal("40"))
+        Product.objects.filter(name="Atlas").update(stock=0)
+        Product.objects.get(name="Diary").save()  # bumps the catalog version
+        self.assertEqual(product_facets(category_id=self.books.pk, max_price=Decimal("40"))["total"], 1)
+
+    def test_api_endpoint(self):
+        response = self.client.get("/api/products/facets/", {"brand": "Acme"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["total"], 3)
+        self.assertEqual(self.client.get("/api/products/facets/", {"max_price": "cheap"}).status_code, 400)
+
+
+def png(size):
+    buffer = io.BytesIO()
+    Image.new("RGB", size, "teal").save(buffer, "PNG")
+    return SimpleUploadedFile("photo.png", buffer.getvalue(), content_type="image/png")
+
+
+class TempMediaMixin:
+    def setUp(self):
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media)
+        settings_override = override_settings(MEDIA_ROOT=media)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.category = Category.objects.create(name="Photos")
+
+
+class ImageDerivativeTests(TempMediaMixin, TestCase):
+    def test_upload_queues_derivatives_for_the_api(self):
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user("admin", is_staff=True))
+        with self.captureOnCommitCallbacks(execute=True):
+            response = client.post(
+                "/api/products/",
+                {"name": "Poster", "price": "9.00", "stock": 1, "category": self.category.pk, "image": png((2000, 1000))},
+                format="multipart",
+            )
+        self.assertEqual(response.status_code, 201)
+
+        product = client.get(f"/api/products/{response.data['id']}/").data
+        self.assertNotIn("image_derivatives", product)
+        self.assertTrue(product["images"]["card"].endswith("-card.webp"))
+        self.assertRegex(product["images"]["srcset"], r"^http://testserver/media/\S+-thumbnail\.webp 160w, .+ 480w, .+ 1200w$")
+        sizes = Product.objects.get(pk=product["id"]).image_derivatives["sizes"]
+        self.assertEqual((sizes["detail"]["width"], sizes["detail"]["height"]), (1200, 600))
+
+
+
+class ImageBackfillTests(TempMediaMixin, TransactionTestCase):
+    """The backfill renders in pool threads, which only see committed rows."""
+
+    def test_backfill_renders_existing_images_without_upscaling(self):
+        product = Product.objects.create(name="Stamp", price=Decimal("1.00"), category=self.category)
+        product.image.save("stamp.png", png((300, 200)), save=False)
+        Product.objects.filter(pk=product.pk).update(image=product.image.name)  # as before the pipeline existed
+
+        out = io.StringIO()
+        call_command("generate_image_derivatives", "--workers", "2", stdout=out)
+        self.assertIn('"generated": 1', out.getvalue())
+        product.refresh_from_db()
+        self.assertEqual({name: entry["width"] for name, entry in product.image_derivatives["sizes"].items()},
+                         {"thumbnail": 160, "card": 300, "detail": 300})
+        self.assertEqual(images.srcset(product).count("w,"), 1)  # 300w listed once
+
+        call_command("generate_image_derivatives", stdout=out)
+        self.assertIn('"generated": 0', out.getvalue())
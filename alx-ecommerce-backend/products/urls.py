@@ -1,13 +1,15 @@
 from . import views
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import CategoryViewSet, ProductViewSet
+from .views import CatalogExportView, CatalogImportView, CategoryViewSet, ProductViewSet
 
 router = DefaultRouter()
 router.register(r'categories', CategoryViewSet)   
 router.register(r'products', ProductViewSet)
 
 urlpatterns = [
+    path('catalog/import/', CatalogImportView.as_view(), name='catalog-import'),
+    path('catalog/export/', CatalogExportView.as_view(), name='catalog-export'),
     path('', include(router.urls)),
     path("ajax/add-category/", views.ajax_add_category, name="ajax_add_category"),
 ]
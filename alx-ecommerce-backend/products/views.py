@@ -1,8 +1,26 @@
-from rest_framework import viewsets, filters
+import io
+
+from decimal import Decimal, InvalidOperation
+
+from django.contrib.auth.decorators import login_required
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import viewsets, filters, permissions, status
+from rest_framework.decorators import action
+from rest_framework.parsers import MultiPartParser
+from rest_framework.response import Response
+from rest_framework.views import APIView
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.permissions import BasePermission, SAFE_METHODS
+from config.pagination import KeysetPagination
 from .models import Category, Product
 from .serializers import CategorySerializer, ProductSerializer
+from config.db_router import read_alias
+from .cache import CatalogCacheMixin
+from .search import FullTextSearchFilter
+from .catalog import export_catalog, import_catalog
+from .facets import product_facets
+from inventory.services import OutOfStock, adjust_stock, fold, shard_stock, shelf_stock
 
 class IsAdminOrReadOnly(BasePermission):
     def has_permission(self, request, view):
@@ -10,27 +28,99 @@ class IsAdminOrReadOnly(BasePermission):
             return True
         return request.user and request.user.is_staff
 
-class CategoryViewSet(viewsets.ModelViewSet):
+class CategoryViewSet(CatalogCacheMixin, viewsets.ModelViewSet):
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
     permission_classes = [IsAdminOrReadOnly]  
 
-class ProductViewSet(viewsets.ModelViewSet):
+class ProductViewSet(CatalogCacheMixin, viewsets.ModelViewSet):
     queryset = Product.objects.all()
     serializer_class = ProductSerializer
     filter_backends = [
         DjangoFilterBackend,
         filters.OrderingFilter,
-        filters.SearchFilter
+        FullTextSearchFilter
     ]
     filterset_fields = ['category', 'price']
     ordering_fields = ['price', 'stock']
-    search_fields = ['name', 'description']
+    ordering = ['id']
+    pagination_class = KeysetPagination
     permission_classes = [IsAdminOrReadOnly]  
-from django.http import JsonResponse
-from django.views.decorators.csrf import csrf_exempt
-from django.contrib.auth.decorators import login_required
-from .models import Category
+
+    @action(detail=False)
+    def facets(self, request):
+        """Category / brand counts and a price histogram for in-stock products (``?category=&brand=&max_price=``)."""
+        params = request.query_params
+        try:
+            category_id = int(params["category"]) if params.get("category") else None
+            max_price = Decimal(params["max_price"]) if params.get("max_price") else None
+        except (ValueError, InvalidOperation):
+            return Response({"error": "category must be an id and max_price a number"}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(product_facets(category_id, params.get("brand") or None, max_price))
+
+    @action(detail=True, methods=["post"])
+    def stock(self, request, pk=None):
+        """
+        Change stock through the inventory services: ``quantity`` is added to the
+        shelf (negative takes it off), then ``shards`` re-spreads it (0 folds it back).
+        """
+        try:
+            quantity = int(request.data.get("quantity") or 0)
+            shards = request.data.get("shards")
+            shards = int(shards) if shards not in (None, "") else None
+        except (TypeError, ValueError):
+            return Response({"error": "quantity and shards must be integers"}, status=status.HTTP_400_BAD_REQUEST)
+        if shards is not None and shards < 0:
+            return Response({"error": "shards must not be negative"}, status=status.HTTP_400_BAD_REQUEST)
+
+        product = self.get_object()
+        try:
+            adjust_stock(product, quantity)
+        except OutOfStock as e:
+            return Response({"error": str(e)}, status=status.HTTP_409_CONFLICT)
+        if shards:
+            shard_stock(product, shards)
+        elif shards == 0 and product.stock_shards:
+            fold(product)
+        product.refresh_from_db()
+        return Response({"stock": shelf_stock([product.pk])[product.pk], "stock_shards": product.stock_shards})
+
+class CatalogImportView(APIView):
+    """Upload a CSV or JSON Lines feed (multipart field ``file``) and upsert it by sku."""
+    permission_classes = [permissions.IsAdminUser]
+    parser_classes = [MultiPartParser]
+
+    def post(self, request):
+        upload = request.FILES.get("file")
+        if upload is None:
+            return Response({"error": "file is required"}, status=status.HTTP_400_BAD_REQUEST)
+        file_format = request.data.get("file_format") or ("jsonl" if upload.name.endswith((".jsonl", ".ndjson")) else "csv")
+        if file_format not in ("csv", "jsonl"):
+            return Response({"error": "file_format must be csv or jsonl"}, status=status.HTTP_400_BAD_REQUEST)
+        stream = io.TextIOWrapper(upload.file, encoding="utf-8", newline="")
+        report = import_catalog(stream, file_format, dry_run=request.data.get("dry_run") in ("1", "true"))
+        return Response(report.as_dict())
+
+
+class CatalogExportView(APIView):
+    """Stream the catalog in the import format (``?file_format=csv|jsonl&gzip=1``)."""
+    permission_classes = [permissions.IsAdminUser]
+    db_routing = "replica"
+
+    def get(self, request):
+        file_format = request.query_params.get("file_format", "csv")
+        if file_format not in ("csv", "jsonl"):
+            return Response({"error": "file_format must be csv or jsonl"}, status=status.HTTP_400_BAD_REQUEST)
+        compress = request.query_params.get("gzip") == "1"
+        response = StreamingHttpResponse(
+            # Bound explicitly: the rows are streamed after the routing scope has closed.
+            export_catalog(file_format, compress=compress, using=read_alias()),
+            content_type="application/gzip" if compress else ("text/csv" if file_format == "csv" else "application/x-ndjson"),
+        )
+        filename = f"catalog.{file_format}" + (".gz" if compress else "")
+        response["Content-Disposition"] = f'attachment; filename="{filename}"'
+        return response
+
 
 @login_required
 @csrf_exempt
@@ -0,0 +1,69 @@
+from asgiref.sync import sync_to_async
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from .cache import user_cache
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication that resolves the token's user from ``users.cache``.
+
+    A hit skips the user query; misses load the user as usual and cache it.
+    The token-dependent checks (active user, revoked token) still run on
+    every request.
+    """
+
+    def get_user(self, validated_token):
+        user = user_cache.get(self.get_user_id(validated_token))
+        if user is None:
+            return self.load_user(validated_token)
+        return self.check_user(user, validated_token)
+
+    def get_user_id(self, validated_token):
+        try:
+            return validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError as e:
+            raise InvalidToken(_("Token contained no recognizable user identification")) from e
+
+    def load_user(self, validated_token):
+        user = super().get_user(validated_token)
+        user_cache.set(self.get_user_id(validated_token), user)
+        return user
+
+    def check_user(self, user, validated_token):
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        if api_settings.CHECK_REVOKE_TOKEN and validated_token.get(
+            api_settings.REVOKE_TOKEN_CLAIM
+        ) != get_md5_hash_password(user.password):
+            raise AuthenticationFailed(_("The user's password has been changed."), code="password_changed")
+        return user
+
+
+class AsyncJWTAuthentication(CachedJWTAuthentication):
+    """
+    CachedJWTAuthentication for plain async Django views.
+
+    Token decoding and signature checks are CPU-only and run inline, as does
+    the in-process cache lookup; only a cache miss touches the shared cache or
+    the database and is awaited, so the event loop is never blocked. Raises the
+    same InvalidToken / AuthenticationFailed errors.
+    """
+
+    async def aauthenticate(self, request):
+        header = self.get_header(request)
+        if header is None:
+            return None
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+        validated_token = self.get_validated_token(raw_token)
+        user = user_cache.get_local(self.get_user_id(validated_token))
+        if user is not None:
+            return self.check_user(user, validated_token), validated_token
+        user = await sync_to_async(self.get_user)(validated_token)
+        return user, validated_token
@@ -0,0 +1,127 @@
+"""
+User cache for JWT authentication (users.authentication).
+
+Resolving a token's user is a primary key lookup on every authenticated API
+call. ``user_cache`` keeps resolved users in a bounded, per-process LRU whose
+entries expire after AUTH_USER_CACHE_TTL seconds. With AUTH_USER_CACHE_ALIAS
+set, misses fall through to that (shared) cache before the database, so a
+fresh worker doesn't start cold.
+
+Saving or deleting a user drops its entries (users.signals). That reaches this
+process's LRU and the shared tier; other processes' LRUs keep the old copy
+until it expires, so the TTL bounds how long e.g. a revoked staff role lingers
+there.
+"""
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+KEY_PREFIX = "auth:user:"
+
+
+class UserCache:
+    def __init__(self, max_entries, ttl, alias=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.alias = alias
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = self.shared_hits = self.misses = 0
+
+    @property
+    def shared(self):
+        return caches[self.alias] if self.alias else None
+
+    def get_local(self, user_id):
+        """The cached user from this process only, or None (no I/O, safe on the event loop)."""
+        key = str(user_id)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or entry[0] <= time.monotonic():
+                if entry is not None:
+                    del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+        # A copy, so attributes set on request.user don't leak into other requests.
+        return copy.copy(entry[1])
+
+    def get(self, user_id):
+        """The cached user, looking in the shared tier on a local miss, or None."""
+        user = self.get_local(user_id)
+        if user is not None or self.shared is None:
+            if user is None:
+                self.count_miss()
+            return user
+        user = self.shared.get(KEY_PREFIX + str(user_id))
+        if user is None:
+            self.count_miss()
+            return None
+        with self.lock:
+            self.shared_hits += 1
+        self.store_local(user_id, user)
+        return copy.copy(user)
+
+    def count_miss(self):
+        with self.lock:
+            self.misses += 1
+
+    def set(self, user_id, user):
+        self.store_local(user_id, user)
+        if self.shared is not None:
+            self.shared.set(KEY_PREFIX + str(user_id), user, timeout=self.ttl)
+
+    def store_local(self, user_id, user):
+        key = str(user_id)
+        with self.lock:
+            self.entries[key] = (time.monotonic() + self.ttl, user)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def invalidate(self, user_id):
+        with self.lock:
+            self.entries.pop(str(user_id), None)
+        if self.shared is not None:
+            self.shared.delete(KEY_PREFIX + str(user_id))
+
+    def invalidate_on_commit(self, user_id):
+        """
+        Invalidate now and again once the current transaction commits.
+
+        The second pass drops a copy another request may have cached from the
+        pre-commit row in between.
+        """
+        self.invalidate(user_id)
+        transaction.on_commit(lambda: self.invalidate(user_id))
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.hits = self.shared_hits = self.misses = 0
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.shared_hits + self.misses
+            return {
+                "size": len(self.entries),
+                "max_entries": self.max_entries,
+                "ttl": self.ttl,
+                "shared": self.alias,
+                "hits": self.hits,
+                "shared_hits": self.shared_hits,
+                "misses": self.misses,
+                "hit_rate": round((self.hits + self.shared_hits) / lookups, 4) if lookups else None,
+            }
+
+
+user_cache = UserCache(
+    max_entries=getattr(settings, "AUTH_USER_CACHE_SIZE", 10000),
+    ttl=getattr(settings, "AUTH_USER_CACHE_TTL", 60),
+    alias=getattr(settings, "AUTH_USER_CACHE_ALIAS", None),
+)
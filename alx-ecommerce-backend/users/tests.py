@@ -1,3 +1,64 @@
+from unittest import mock
+
+from django.contrib.auth.models import User
 from django.test import TestCase
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from carts.models import Cart
+from .cache import UserCache, user_cache
+
+
+class CachedJWTAuthenticationTests(TestCase):
+    def setUp(self):
+        user_cache.clear()
+        self.user = User.objects.create_user("shopper")
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {RefreshToken.for_user(self.user).access_token}")
+
+    def test_user_query_is_skipped_on_hit(self):
+        Cart.objects.create(user=self.user)
+        with self.assertNumQueries(3):  # user, cart, cart items
+            self.client.get("/api/cart/")
+        with self.assertNumQueries(2):
+            response = self.client.get("/api/cart/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((user_cache.stats()["hits"], user_cache.stats()["misses"]), (1, 1))
+
+    def test_role_change_is_seen_immediately(self):
+        self.assertEqual(self.client.get("/api/catalog/export/").status_code, 403)
+        admin = User.objects.create_user("admin", is_staff=True)
+        dashboard = APIClient()
+        dashboard.force_login(admin)
+        dashboard.post(f"/dashboard/users/{self.user.pk}/role/", {"role": "admin"})
+        self.assertEqual(self.client.get("/api/catalog/export/").status_code, 200)
+
+    def test_deleted_and_deactivated_users_are_rejected(self):
+        self.client.get("/api/cart/")
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.client.get("/api/cart/").status_code, 401)
+        self.user.delete()
+        self.assertEqual(self.client.get("/api/cart/").status_code, 401)
+
+
+class UserCacheTests(TestCase):
+    def test_entries_are_bounded_and_expire(self):
+        cache = UserCache(max_entries=2, ttl=30)
+        for pk in (1, 2, 3):
+            cache.set(pk, User(pk=pk))
+        self.assertIsNone(cache.get(1))
+        self.assertEqual(cache.get(3).pk, 3)
+        with mock.patch("users.cache.time.monotonic", return_value=10 ** 9):
+            self.assertIsNone(cache.get(3))
+        self.assertEqual(cache.stats()["size"], 1)
 
-# Create your tests here.
+    def test_shared_tier_fills_local_misses(self):
+        with self.settings(CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}):
+            first, second = UserCache(10, 30, alias="default"), UserCache(10, 30, alias="default")
+            first.set(7, User(pk=7, username="shared"))
+            self.assertEqual(second.get(7).username, "shared")
+            self.assertEqual(second.stats()["shared_hits"], 1)
+            first.invalidate(7)
+            second.entries.clear()
+            self.assertIsNone(second.get(7))